@@ -0,0 +1,145 @@
+# Import packages
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import scrapy
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from inputs import custom_scrapy_settings
+
+# Crawls a local stub of the Zyte API (plus a few direct requests, as the JSON requests of the api_first fetch mode) through the downloader middlewares
+# of the project, and checks that AdaptiveConcurrencyMiddleware tunes the downloader slots the requests are actually downloaded through, starting at ADAPTIVE_CONCURRENCY_START
+
+## Stub server
+class StubZyteApiHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        # A Zyte API extract request: the target URL is in the JSON body
+        zyte_request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.serve(body=json.dumps({
+            "url": zyte_request["url"],
+            "statusCode": 200,
+            "httpResponseBody": base64.b64encode(b"<html><body>ok</body></html>").decode("ascii"),
+            "httpResponseHeaders": [{"name": "Content-Type", "value": "text/html"}]
+        }).encode("utf-8"))
+
+    def do_GET(self):
+        # A direct request, sent without Zyte API
+        self.serve(body=b"<html><body>ok</body></html>")
+
+    def serve(self, body: bytes):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep the benchmark quiet
+
+def start_stub_server(latency: float) -> ThreadingHTTPServer:
+    """
+    A function to start the stub server in a background thread on a free port.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubZyteApiHandler)
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+## Benchmark spider
+class AdaptiveConcurrencyCheckSpider(scrapy.Spider):
+    name = "adaptive_concurrency_check"
+
+    def __init__(self, stub_port: int, num_requests: int, **kwargs):
+        super().__init__(**kwargs)
+        self.stub_port = stub_port
+        self.num_requests = num_requests
+        self.slot_concurrencies = {} # The concurrency of every downloader slot when its first request reached it
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.request_reached_downloader, signal=signals.request_reached_downloader)
+        return spider
+
+    async def start(self):
+        for start_request in self.start_requests():
+            yield start_request
+
+    def start_requests(self):
+        for idx in range(self.num_requests):
+            # The pages are rendered through Zyte API, the JSON requests of the api_first fetch mode are sent directly
+            yield scrapy.Request(url=f"https://gmgn.ai/sol/address/wallet{idx}", callback=self.parse, dont_filter=True)
+            yield scrapy.Request(url=f"http://127.0.0.1:{self.stub_port}/defi/wallet{idx}", callback=self.parse, meta={"zyte_api_automap": False}, dont_filter=True)
+
+    def request_reached_downloader(self, request, spider):
+        slot_key = self.crawler.engine.downloader.get_slot_key(request)
+        self.slot_concurrencies.setdefault(slot_key, self.crawler.engine.downloader.slots[slot_key].concurrency)
+
+    def parse(self, response):
+        yield {"url": response.url}
+
+## Benchmark runner
+if __name__ == "__main__":
+    # Usage: python benchmarks/bench_adaptive_concurrency.py [number of requests per domain] [path of a JSON file to write the results to]
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    stub_server = start_stub_server(latency=0.2)
+    settings = dict(custom_scrapy_settings)
+    settings.update({
+        "ZYTE_API_KEY": "dummy",
+        "ZYTE_API_URL": f"http://127.0.0.1:{stub_server.server_address[1]}/",
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8, # The Scrapy default, which a slot created behind the back of the controller would start at
+        "ADAPTIVE_CONCURRENCY_INTERVAL": 3600, # No adjustment during the check, so the slots must stay at their start concurrency
+        "LOG_LEVEL": "WARNING",
+        "WALLET_CACHE_ENABLED": False,
+        "METRICS_ENABLED": False,
+        "PARQUET_EXPORT_ENABLED": False,
+        "TIMESERIES_STORE_ENABLED": False
+    })
+
+    process = CrawlerProcess(settings=settings)
+    crawler = process.create_crawler(AdaptiveConcurrencyCheckSpider)
+    process.crawl(crawler, stub_port=stub_server.server_address[1], num_requests=num_requests)
+    start_time = time.perf_counter()
+    process.start()
+    elapsed_secs = time.perf_counter() - start_time
+    stub_server.shutdown()
+
+    # The slots the controller tuned must be the ones the requests were downloaded through, and they must have started at ADAPTIVE_CONCURRENCY_START
+    # instead of CONCURRENT_REQUESTS_PER_DOMAIN
+    start_concurrency = settings["ADAPTIVE_CONCURRENCY_START"]
+    tuned_slots = sorted(key.split("/")[1] for key in crawler.stats.get_stats() if key.startswith("adaptive_concurrency/") and key.endswith("/concurrency"))
+    slot_concurrencies = crawler.spider.slot_concurrencies
+    checks = {
+        "tuned_slots_are_downloaded_slots": tuned_slots == sorted(slot_concurrencies),
+        "slots_start_at_adaptive_concurrency_start": all(concurrency == start_concurrency for concurrency in slot_concurrencies.values())
+    }
+
+    result = {
+        "num_requests": 2 * num_requests,
+        "elapsed_secs": round(elapsed_secs, 2),
+        "tuned_slots": tuned_slots,
+        "slot_concurrencies": slot_concurrencies,
+        "checks": checks
+    }
+    print(f"{2 * num_requests} requests in {elapsed_secs:.2f} s. Slots tuned: {tuned_slots}. Concurrency of the slots downloaded through: {slot_concurrencies}.")
+    print(f"ADAPTIVE_CONCURRENCY_START = {start_concurrency}, CONCURRENT_REQUESTS_PER_DOMAIN = {settings['CONCURRENT_REQUESTS_PER_DOMAIN']}")
+    for name, passed in checks.items():
+        print(f"    {name}: {'ok' if passed else 'FAILED'}")
+
+    # Keep the results to compare them with the next run
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    sys.exit(0 if all(checks.values()) else 1)
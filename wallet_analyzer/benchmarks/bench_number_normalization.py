@@ -0,0 +1,86 @@
+# Import packages
+import os
+import re
+import sys
+import timeit
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from feeds import iter_feed_items
+from number_normalization import normalize_number, normalize_numbers
+
+## Legacy helpers (frozen copies of the per-value helpers that number_normalization replaced)
+def legacy_normalize_numbers_in_vol_liq_mcap(value: str) -> float:
+    if value.find("T") != -1:
+        value = float(re.sub(pattern="T", repl="", string=value)) * 1000000
+    elif value.find("B") != -1:
+        value = float(re.sub(pattern="B", repl="", string=value)) * 1000
+    elif value.find("M") != -1:
+        value = float(re.sub(pattern="M", repl="", string=value))
+    elif value.find("K") != -1:
+        value = float(re.sub(pattern="K", repl="", string=value)) / 1000
+    else:
+        value = float(value)
+    return value
+
+def legacy_normalize_numbers_in_pct_gains(value: str) -> float:
+    if value.find("B") != -1:
+        value = float(re.sub(pattern="%|B|,", repl="", string=value)) * pow(10, 9)
+    elif value.find("M") != -1:
+        value = float(re.sub(pattern="%|M|,", repl="", string=value)) * pow(10, 6)
+    elif value.find("K") != -1:
+        value = float(re.sub(pattern="%|K|,", repl="", string=value)) * pow(10, 3)
+    else:
+        value = float(re.sub(pattern="%|,", repl="", string=value))
+    return value
+
+def legacy_normalize_numbers_in_txn_data(value: str) -> float:
+    if value is not None:
+        if value.find("B") != -1:
+            value = float(re.sub(pattern=r"\$|B|,|<", repl="", string=value)) * pow(10, 9)
+        elif value.find("M") != -1:
+            value = float(re.sub(pattern=r"\$|M|,|<", repl="", string=value)) * pow(10, 6)
+        elif value.find("K") != -1:
+            value = float(re.sub(pattern=r"\$|K|,|<", repl="", string=value)) * pow(10, 3)
+        else:
+            value = float(re.sub(pattern=r"\$|,|<", repl="", string=value))
+    return value
+
+## Benchmark inputs
+def load_raw_values(file_name: str, fields: list) -> list:
+    """
+    A function to load the raw (i.e., displayed) values of the given fields from a recorded feed, in any feed format (see feeds.iter_feed_items).
+    """
+    rows = iter_feed_items(feed_name=os.path.join(PROJECT_ROOT, os.path.splitext(file_name)[0]))
+    return [row[field] for row in rows for field in fields]
+
+def run_case(name: str, values: list, legacy_function, unit: str, repeat: int = 5):
+    """
+    A function to time the legacy helper, the new scalar API and the new batch API over the same values and check that they agree.
+    """
+    # Check that the new engine returns the same numbers as the legacy helper
+    non_null_values = [v for v in values if v is not None]
+    mismatches = [v for v in non_null_values if legacy_function(v) != normalize_number(v, unit=unit)]
+
+    legacy_secs = min(timeit.repeat(lambda: [legacy_function(v) for v in non_null_values], number=1, repeat=repeat))
+    scalar_secs = min(timeit.repeat(lambda: [normalize_number(v, unit=unit) for v in non_null_values], number=1, repeat=repeat))
+    batch_secs = min(timeit.repeat(lambda: normalize_numbers(non_null_values, unit=unit), number=1, repeat=repeat))
+
+    print(f"{name} ({len(non_null_values):,} values, {len(mismatches)} mismatches)")
+    print(f"    legacy helper: {legacy_secs * 1000:8.2f} ms")
+    print(f"    scalar API:    {scalar_secs * 1000:8.2f} ms ({legacy_secs / scalar_secs:.2f}x)")
+    print(f"    batch API:     {batch_secs * 1000:8.2f} ms ({legacy_secs / batch_secs:.2f}x)")
+
+if __name__ == "__main__":
+    # Scale the recorded values up to get stable timings
+    scale_factor = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    txn_values = load_raw_values("dex_screener_top_traders.json", ["trader_bought_usd_raw", "trader_bought_crypto_raw", "trader_buy_txns_raw", "trader_sold_usd_raw", "trader_sold_crypto_raw", "trader_sell_txns_raw", "trader_pnl_raw"])
+    pct_values = load_raw_values("dex_screener_top_gainers.json", ["asset_price_change_l5m_raw", "asset_price_change_l1h_raw", "asset_price_change_l6h_raw", "asset_price_change_l24h_raw"])
+    vol_values = load_raw_values("dex_screener_top_gainers.json", ["asset_24_hr_volume_in_mil_raw", "asset_liquidity_in_mil_raw", "asset_market_cap_in_mil_raw"])
+
+    run_case(name="Top traders txn data", values=txn_values * scale_factor, legacy_function=legacy_normalize_numbers_in_txn_data, unit="units")
+    run_case(name="Top gainers pct gains", values=pct_values * scale_factor * 10, legacy_function=legacy_normalize_numbers_in_pct_gains, unit="units")
+    run_case(name="Top gainers vol/liq/mcap", values=vol_values * scale_factor * 10, legacy_function=legacy_normalize_numbers_in_vol_liq_mcap, unit="millions")
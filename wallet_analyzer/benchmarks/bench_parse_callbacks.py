@@ -0,0 +1,108 @@
+# Import packages
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import scrapy
+from scrapy.http import HtmlResponse, Request
+from build_fixtures import FIXTURES_DIR, build_fixtures, load_feed, render_top_gainers_page, render_top_traders_page, select_top_traders_rows
+from wallet_analyzer.spiders.dex_screener_top_gainers import DexScreenerTopGainersSpider
+from wallet_analyzer.spiders.dex_screener_top_traders import DexScreenerTopTradersSpider
+from wallet_analyzer.spiders.dex_check_wallet_screener import DexCheckWalletScreenerSpider
+from wallet_analyzer.spiders.gmgn_ai_wallet_screener import GmgnAiWalletScreenerSpider
+
+## Fake responses
+class FakeZyteResponse(HtmlResponse):
+    # The wallet screeners log the Zyte API actions of every response
+    raw_api_response = {"actions": []}
+
+def build_response(url: str, html: str, meta: dict) -> FakeZyteResponse:
+    """
+    A function to build the response that Zyte would return for a browser-rendered request, without any network call.
+    """
+    return FakeZyteResponse(url=url, body=html.encode("utf-8"), encoding="utf-8", request=Request(url=url, meta=meta))
+
+def load_fixture(file_name: str) -> str:
+    # Rebuild the fixtures from the recorded feeds if they are missing
+    path = os.path.join(FIXTURES_DIR, file_name)
+    if not os.path.exists(path):
+        build_fixtures()
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+## Benchmark runner
+def run_case(name: str, callback, url: str, html: str, meta: dict, repeat: int = 5, number: int = 10) -> dict:
+    """
+    A function to replay a page through a parse callback and report its throughput, its per-row latency and its peak memory.
+    A new response is built on every call, so that the HTML parsing of the page is counted (Scrapy caches the selector of a response).
+    """
+    def parse_page():
+        return [r for r in callback(build_response(url=url, html=html, meta=meta)) if isinstance(r, scrapy.Item)]
+
+    num_items = len(parse_page())
+    best_secs = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            parse_page()
+        best_secs = min(best_secs, (time.perf_counter() - start_time) / number)
+
+    # Measure the peak memory in a separate run, because tracemalloc slows the code down
+    tracemalloc.start()
+    parse_page()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "case": name,
+        "page_kb": round(len(html.encode("utf-8")) / 1024, 1),
+        "items_per_page": num_items,
+        "ms_per_page": round(best_secs * 1000, 3),
+        "items_per_sec": round(num_items / best_secs, 1),
+        "us_per_row": round(best_secs / max(num_items, 1) * pow(10, 6), 1),
+        "peak_memory_kb": round(peak_bytes / 1024, 1)
+    }
+    print(
+        f"{name:<32} {result['items_per_page']:>6} rows {result['page_kb']:>8} KB  {result['ms_per_page']:>9.3f} ms/page  "
+        f"{result['items_per_sec']:>10,.1f} items/s  {result['us_per_row']:>8.1f} us/row  {result['peak_memory_kb']:>9,.1f} KB peak"
+    )
+    return result
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/bench_parse_callbacks.py [scale factor of the synthetic pages] [path of a JSON file to write the results to]
+    scale_factor = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    top_gainers_stage = DexScreenerTopGainersSpider()
+    top_traders_stage = DexScreenerTopTradersSpider()
+    dex_check_stage = DexCheckWalletScreenerSpider()
+    gmgn_ai_stage = GmgnAiWalletScreenerSpider()
+
+    # The meta data that the request builders attach to the requests of every callback
+    gainers_meta = {"chain": "solana"}
+    traders_meta = {"asset_name": "fixture", "asset_url": "https://dexscreener.com/solana/fixture", "chain": "solana"}
+    wallet_meta = {"wallet_address": "fixture", "chain": "solana", "request_counter": 1, "wallet_count": 1, "tot_num_wallets": 1}
+
+    # The synthetic pages repeat the recorded rows to show how the parsers scale with the number of rows
+    scaled_gainers_html = render_top_gainers_page(load_feed("dex_screener_top_gainers.json") * scale_factor)
+    scaled_traders_html = render_top_traders_page(select_top_traders_rows(load_feed("dex_screener_top_traders.json")) * scale_factor)
+
+    results = [
+        run_case(name="parse_top_gainers", callback=top_gainers_stage.parse_top_gainers, url=top_gainers_stage.top_gainers_urls["solana"], html=load_fixture("top_gainers.html"), meta=gainers_meta),
+        run_case(name=f"parse_top_gainers (x{scale_factor} rows)", callback=top_gainers_stage.parse_top_gainers, url=top_gainers_stage.top_gainers_urls["solana"], html=scaled_gainers_html, meta=gainers_meta, number=2),
+        run_case(name="parse_top_traders", callback=top_traders_stage.parse_top_traders, url=traders_meta["asset_url"], html=load_fixture("top_traders.html"), meta=traders_meta),
+        run_case(name=f"parse_top_traders (x{scale_factor} rows)", callback=top_traders_stage.parse_top_traders, url=traders_meta["asset_url"], html=scaled_traders_html, meta=traders_meta, number=2),
+        run_case(name="dex_check parse_wallet_data", callback=dex_check_stage.parse_wallet_data, url=dex_check_stage.base_url.format(wallet_address="fixture"), html=load_fixture("dex_check_wallet.html"), meta=wallet_meta, number=200),
+        run_case(name="gmgn_ai parse_wallet_data", callback=gmgn_ai_stage.parse_wallet_data, url=gmgn_ai_stage.base_url.format(gmgn_ai_chain="sol", wallet_address="fixture"), html=load_fixture("gmgn_ai_wallet.html"), meta=wallet_meta, number=200)
+    ]
+
+    # Keep the results to compare them with the next run (e.g., before and after a change to the selectors)
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
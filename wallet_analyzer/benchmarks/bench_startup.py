@@ -0,0 +1,61 @@
+# Import packages
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The benchmark runs every case in a fresh interpreter from the project root, as cron launches the spiders
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The code that loads a spider class the way `scrapy crawl <spider>` does (i.e., through the spider loader of the project settings), then reports the heavy modules it imported
+LOAD_SPIDER_CODE = """
+import sys
+from scrapy.spiderloader import get_spider_loader
+from scrapy.utils.project import get_project_settings
+get_spider_loader(get_project_settings()).load({spider_name!r})
+print(",".join(module for module in ("pandas", "numpy", "pyarrow", "dotenv") if module in sys.modules))
+"""
+
+SPIDER_NAMES = ["dex_screener_top_gainers", "dex_screener_top_traders", "dex_check_wallet_screener", "gmgn_ai_wallet_screener", "wallet_analyzer_pipeline"]
+
+## Benchmark runner
+def run_case(name: str, command: list, repeat: int = 7, reports_modules: bool = False) -> dict:
+    """
+    A function to run a command in a fresh interpreter several times and report its median and best wall time, and the heavy modules it imported (if it prints them).
+    """
+    durations, output = [], ""
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        durations.append(time.perf_counter() - start_time)
+        output = completed.stdout.strip().splitlines()[-1] if reports_modules and completed.stdout.strip() else ""
+
+    result = {
+        "case": name,
+        "median_ms": round(statistics.median(durations) * 1000, 1),
+        "best_ms": round(min(durations) * 1000, 1),
+        "heavy_modules": output
+    }
+    print(f"{name:<40} {result['median_ms']:>9.1f} ms median  {result['best_ms']:>9.1f} ms best  heavy modules: {result['heavy_modules'] or '-'}")
+    return result
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/bench_startup.py [number of runs per case] [path of a JSON file to write the results to]
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    # The bare interpreter and Scrapy are the floor of every startup
+    results = [
+        run_case(name="python", command=[sys.executable, "-c", "pass"], repeat=repeat),
+        run_case(name="import scrapy", command=[sys.executable, "-c", "import scrapy"], repeat=repeat),
+        run_case(name="scrapy list", command=[sys.executable, "-m", "scrapy", "list"], repeat=repeat)
+    ]
+    for spider_name in SPIDER_NAMES:
+        results.append(run_case(name=f"load {spider_name}", command=[sys.executable, "-c", LOAD_SPIDER_CODE.format(spider_name=spider_name)], repeat=repeat, reports_modules=True))
+
+    # Keep the results to compare them with the next run (e.g., before and after a change to the imports)
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,74 @@
+# Import packages
+import os
+import sys
+import timeit
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from parsel import Selector
+from bench_parse_callbacks import build_response
+from build_fixtures import load_feed, render_top_gainers_page
+import wallet_analyzer.spiders.dex_screener_top_gainers as top_gainers_module
+
+## Legacy extractor (frozen copy of the per-field XPath queries that extract_top_gainers_row replaced)
+def legacy_extract_top_gainers_row(row) -> dict:
+    res = Selector(root=row)
+    return {
+        "asset_name": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-token']/span[contains(@class, 'ds-dex-table-row-base-token-symbol')]/text()").get(),
+        "asset_name_text": res.xpath(".//div[@class='ds-table-data-cell ds-dex-table-row-col-token']/div[@class='ds-dex-table-row-base-token-name']/span/text()[1]").get(),
+        "asset_gain_rank_raw": res.xpath(".//span[@class='ds-dex-table-row-badge-pair-no']/text()[2]").get(),
+        "asset_network": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-token']/img[@class='ds-dex-table-row-chain-icon']/@title").get(),
+        "dex": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-token']/img[@class='ds-dex-table-row-dex-icon']/@title").get(),
+        "asset_price_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price']/text()[2]").get(),
+        "asset_age": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-pair-age']/span/text()").get(),
+        "asset_24_hr_txns_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-txns']/text()").get(),
+        "asset_24_hr_volume_in_mil_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-volume']/text()[2]").get(),
+        "num_makers_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-makers']/text()").get(),
+        "asset_price_change_l5m_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-m5']/span/text()").get(),
+        "asset_price_change_l1h_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-h1']/span/text()").get(),
+        "asset_price_change_l6h_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-h6']/span/text()").get(),
+        "asset_price_change_l24h_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-h24']/span/text()").get(),
+        "asset_liquidity_in_mil_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-liquidity']/text()[2]").get(),
+        "asset_market_cap_in_mil_raw": res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-market-cap']/text()[2]").get()
+    }
+
+def run_case(name: str, html: str, repeat: int = 5, number: int = 3):
+    """
+    A function to time the legacy and the single-pass extractors, both on the row extraction alone and through the full parse_top_gainers callback, and check that they agree.
+    """
+    spider = top_gainers_module.DexScreenerTopGainersSpider()
+    rows = top_gainers_module.TOP_GAINERS_ROWS_XPATH(build_response(url=spider.top_gainers_urls["solana"], html=html, meta={"chain": "solana"}).selector.root)
+
+    # Check that the single-pass extractor returns the same values as the legacy queries
+    mismatches = [row for row in rows if legacy_extract_top_gainers_row(row) != top_gainers_module.extract_top_gainers_row(row)]
+
+    # Time the row extraction alone on an already parsed page
+    legacy_extract_secs = min(timeit.repeat(lambda: [legacy_extract_top_gainers_row(row) for row in rows], number=number, repeat=repeat)) / number
+    new_extract_secs = min(timeit.repeat(lambda: [top_gainers_module.extract_top_gainers_row(row) for row in rows], number=number, repeat=repeat)) / number
+
+    # Time the full callback (HTML parsing, extraction and number normalization) with each extractor
+    def parse_page():
+        return list(spider.parse_top_gainers(build_response(url=spider.top_gainers_urls["solana"], html=html, meta={"chain": "solana"})))
+
+    new_callback_secs = min(timeit.repeat(parse_page, number=number, repeat=repeat)) / number
+    single_pass_extractor = top_gainers_module.extract_top_gainers_row
+    top_gainers_module.extract_top_gainers_row = legacy_extract_top_gainers_row
+    try:
+        legacy_callback_secs = min(timeit.repeat(parse_page, number=number, repeat=repeat)) / number
+    finally:
+        top_gainers_module.extract_top_gainers_row = single_pass_extractor
+
+    print(f"{name} ({len(rows):,} rows, {len(mismatches)} mismatches)")
+    print(f"    legacy row extraction:      {legacy_extract_secs * 1000:9.2f} ms")
+    print(f"    single-pass row extraction: {new_extract_secs * 1000:9.2f} ms ({legacy_extract_secs / new_extract_secs:.2f}x)")
+    print(f"    legacy callback:            {legacy_callback_secs * 1000:9.2f} ms")
+    print(f"    single-pass callback:       {new_callback_secs * 1000:9.2f} ms ({legacy_callback_secs / new_callback_secs:.2f}x)")
+
+if __name__ == "__main__":
+    gainers_rows = load_feed("dex_screener_top_gainers.json")
+
+    # The recorded page, then synthetic pages with several hundred rows (e.g., more chains or lower filters)
+    for scale_factor in [1, 5, 10]:
+        run_case(name=f"Top gainers page x{scale_factor}", html=render_top_gainers_page(gainers_rows * scale_factor))
@@ -0,0 +1,161 @@
+# Import packages
+import json
+import logging
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import scrapy
+from scrapy.http import TextResponse
+from scrapy.settings import Settings
+from scrapy.spidermiddlewares.httperror import HttpError
+from twisted.python.failure import Failure
+from bench_parse_callbacks import build_response, load_fixture
+from build_fixtures import load_feed, render_gmgn_ai_wallet_page
+from number_normalization import normalize_number
+from stub_wallet_api import build_stub_endpoints, start_stub_server
+from wallet_fetch import API_FETCH_MODE
+from wallet_analyzer.spiders.dex_check_wallet_screener import DexCheckWalletScreenerSpider
+from wallet_analyzer.spiders.gmgn_ai_wallet_screener import GmgnAiWalletScreenerSpider
+
+## Benchmark inputs
+def build_wallets(num_wallets: int, pct_missing: int = 5, pct_blocked: int = 1) -> list:
+    """
+    A function to build the arguments of the requests of synthetic wallets, a few of which are unknown to the stub endpoints or blocked by them (see stub_wallet_api.py).
+    """
+    wallets = []
+    for idx in range(num_wallets):
+        prefix = "blocked" if idx % 100 < pct_blocked else "missing" if idx % 100 < pct_blocked + pct_missing else "wallet"
+        wallets.append({"wallet_address": f"{prefix}{idx:06d}", "chain": "solana", "request_counter": 1, "wallet_count": idx + 1, "tot_num_wallets": num_wallets, "priority": 0})
+    return wallets
+
+def fetch(request):
+    """
+    A function to send a JSON request to the stub server and run its callback, or its errback if the stub refused it, as Scrapy would.
+    """
+    try:
+        with urllib.request.urlopen(request.url) as f:
+            response = TextResponse(url=request.url, status=f.status, body=f.read(), encoding="utf-8", request=request)
+        return list(request.callback(response))
+    except urllib.error.HTTPError as error:
+        response = TextResponse(url=request.url, status=error.code, body=error.read(), encoding="utf-8", request=request)
+        failure = Failure(HttpError(response))
+        failure.request = request # Scrapy attaches the request to the failures it passes to the errbacks
+        return list(request.errback(failure) or [])
+
+## Benchmark runner
+def run_case(name: str, spider_class, settings: dict, num_wallets: int) -> dict:
+    """
+    A function to screen synthetic wallets through the JSON endpoints of the stub server and report the number of requests, the wallets that fell back to the browser and the throughput.
+    """
+    spider = spider_class()
+    spider.settings = Settings(settings)
+    spider.screened_wallet_counts = set()
+    wallets = build_wallets(num_wallets=num_wallets)
+
+    start_time = time.perf_counter()
+    num_api_requests, num_items, num_fallbacks = 0, 0, 0
+    for start_request in spider.build_wallet_requests(wallets=wallets):
+        pending_requests = [start_request]
+        while pending_requests:
+            request = pending_requests.pop()
+            if request.meta["fetch_mode"] != API_FETCH_MODE:
+                num_fallbacks += 1 # A browser render: the stats of the wallet were not in the JSON, or the JSON requests were stopped
+                continue
+            num_api_requests += 1
+            for output in fetch(request):
+                num_items += isinstance(output, scrapy.Item)
+                if isinstance(output, scrapy.Request):
+                    pending_requests.append(output) # The halves of a batch that was refused, or a browser render
+    elapsed_secs = time.perf_counter() - start_time
+
+    result = {
+        "case": name,
+        "num_wallets": num_wallets,
+        "num_api_requests": num_api_requests,
+        "num_items": num_items,
+        "num_browser_fallbacks": num_fallbacks,
+        "ms_per_wallet": round(elapsed_secs / num_wallets * 1000, 3)
+    }
+    print(f"{name:<28} {num_wallets:>6} wallets  {num_api_requests:>6} JSON requests  {num_items:>6} items  {num_fallbacks:>5} browser fallbacks  {result['ms_per_wallet']:>8.3f} ms/wallet")
+    return result
+
+def run_parse_case(name: str, parse_page, repeat: int = 200) -> dict:
+    """
+    A function to time the parsing of the stats of one wallet, without any network call.
+    """
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        parse_page()
+    us_per_wallet = (time.perf_counter() - start_time) / repeat * pow(10, 6)
+    print(f"{name:<28} {us_per_wallet:>10.1f} us/wallet")
+    return {"case": name, "us_per_wallet": round(us_per_wallet, 1)}
+
+def run_format_check(wallet_rows: list) -> dict:
+    """
+    A function to check that the gmgn.ai JSON path yields the same strings as the page parse for the same stats: every recorded wallet is rendered
+    as the gmgn.ai wallet page (as the fixture is) and its stats are sent as the JSON payload of the endpoint. The strings whose last decimal is a zero
+    that came from a rounding (e.g., "$40.090") cannot be rebuilt from the displayed numbers, so the stats that only agree as numbers are counted apart.
+    """
+    spider = GmgnAiWalletScreenerSpider()
+    spider.screened_wallet_counts = set()
+    wallet_meta = {"wallet_address": "wallet000000", "chain": "solana", "request_counter": 1, "wallet_count": 1, "tot_num_wallets": 1}
+    fields = ("tot_gross_profit", "tot_roi", "win_rate")
+    num_stats, num_identical, num_same_numbers = 0, 0, 0
+    for row in wallet_rows:
+        if any(row.get(field) is None for field in fields):
+            continue
+        page_item = next(output for output in spider.parse_wallet_data(build_response(url="https://example.com", html=render_gmgn_ai_wallet_page(row), meta=wallet_meta)) if isinstance(output, scrapy.Item))
+        payload = {"code": 0, "data": {"total_profit": normalize_number(row["tot_gross_profit"]), "pnl_30d": normalize_number(row["tot_roi"]) / 100, "winrate": normalize_number(row["win_rate"]) / 100}}
+        api_row = spider.parse_api_payload(payload=payload, wallets=[wallet_meta])[wallet_meta["wallet_address"]]
+        for field in fields:
+            num_stats += 1
+            num_identical += api_row[field] == page_item[field]
+            num_same_numbers += api_row[field] != page_item[field] and normalize_number(api_row[field]) == normalize_number(page_item[field])
+    num_mismatches = num_stats - num_identical - num_same_numbers
+    print(f"gmgn_ai JSON vs page strings  {num_stats:>6} stats  {num_identical:>6} identical  {num_same_numbers:>5} same numbers  {num_mismatches:>5} mismatches")
+    return {"case": "gmgn_ai JSON vs page strings", "num_stats": num_stats, "num_identical": num_identical, "num_same_numbers": num_same_numbers, "num_mismatches": num_mismatches}
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/bench_wallet_api.py [number of wallets] [path of a JSON file to write the results to]
+    num_wallets = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    # The spiders log a warning for every batch that falls back to the browser render
+    logging.disable(logging.WARNING)
+
+    stub_server = start_stub_server()
+    results = []
+    for batch_size in (1, 20, 100):
+        api_settings = {"WALLET_FETCH_MODE": "api_first", "WALLET_API_VIA_ZYTE": False, "WALLET_API_ENDPOINTS": build_stub_endpoints(server=stub_server, dex_check_batch_size=batch_size)}
+        results.append(run_case(name=f"dex_check (batches of {batch_size})", spider_class=DexCheckWalletScreenerSpider, settings=api_settings, num_wallets=num_wallets))
+    results.append(run_case(name="gmgn_ai", spider_class=GmgnAiWalletScreenerSpider, settings=api_settings, num_wallets=num_wallets))
+
+    # The parsing of the stats of a wallet from the rendered page (XPath over the DOM) and from the JSON of the endpoint
+    wallet_meta = {"wallet_address": "wallet000000", "chain": "solana", "request_counter": 1, "wallet_count": 1, "tot_num_wallets": 1}
+    for spider_class, fixture_name in ((DexCheckWalletScreenerSpider, "dex_check_wallet.html"), (GmgnAiWalletScreenerSpider, "gmgn_ai_wallet.html")):
+        spider = spider_class()
+        spider.screened_wallet_counts = set()
+        html = load_fixture(fixture_name)
+        results.append(run_parse_case(name=f"{spider.wallet_source} page (XPath)", parse_page=lambda: list(spider.parse_wallet_data(build_response(url="https://example.com", html=html, meta=wallet_meta)))))
+        endpoint = build_stub_endpoints(server=stub_server)[spider.wallet_source]["url"].format(gmgn_ai_chain="sol", wallet_address="wallet000000", wallet_addresses="wallet000000")
+        with urllib.request.urlopen(endpoint) as f:
+            payload_body = f.read()
+        results.append(run_parse_case(name=f"{spider.wallet_source} JSON", parse_page=lambda: spider.parse_api_payload(payload=json.loads(payload_body), wallets=[wallet_meta])))
+    stub_server.shutdown()
+
+    # The strings of the JSON path must match the page for the stats of the gmgn.ai fixture, and for the recorded wallets up to the zeros of the roundings
+    fixture_item = next(output for output in GmgnAiWalletScreenerSpider().parse_wallet_data(build_response(url="https://example.com", html=load_fixture("gmgn_ai_wallet.html"), meta=wallet_meta)) if isinstance(output, scrapy.Item))
+    results.append(run_format_check(wallet_rows=[dict(fixture_item)]))
+    results.append(run_format_check(wallet_rows=load_feed("dex_check_wallet_screener.json")))
+
+    # Keep the results to compare them with the next run
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,85 @@
+# Import packages
+import json
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from wallet_scoring import PROFILE_SCORE_FIELDS, SCORE_WEIGHTINGS, compute_wallet_scores, helper_percentile_rank, rank_wallet_scores
+
+## Benchmark inputs
+def build_profile_columns(num_wallets: int, seed: int = 0) -> dict:
+    """
+    A function to build the columns of synthetic wallet profiles: a third of the wallets with DexCheck stats, a third with gmgn.ai stats and a third with the top traders stats only,
+    with heavy-tailed profits and volumes and tied values (e.g., the integer counts), like the real profiles.
+    """
+    rng = np.random.default_rng(seed)
+    source = rng.integers(0, 3, size=num_wallets)
+    is_dex_check, is_gmgn = source == 0, source == 1
+
+    def only(mask, values):
+        return np.where(mask, values, np.nan)
+
+    num_assets = rng.integers(1, 200, size=num_wallets).astype(np.float64)
+    num_wins = rng.integers(0, 300, size=num_wallets).astype(np.float64)
+    realized_gross_profit = rng.standard_t(df=2, size=num_wallets) * 1e4
+    unrealized_gross_profit = rng.standard_t(df=2, size=num_wallets) * 1e4
+    trading_volume = rng.lognormal(mean=11, sigma=2, size=num_wallets)
+    top_traders_tot_bought_usd = rng.lognormal(mean=8, sigma=2, size=num_wallets)
+
+    columns = {
+        "chain": np.array(["solana", "ethereum", "base"], dtype=object)[rng.integers(0, 3, size=num_wallets)],
+        "wallet_address": np.array([f"wallet_{idx}" for idx in range(num_wallets)], dtype=object),
+        "num_assets": only(is_dex_check, num_assets),
+        "num_winning_assets": only(is_dex_check, np.floor(num_assets * rng.random(num_wallets))),
+        "num_wins": only(is_dex_check, num_wins),
+        "num_losses": only(is_dex_check, rng.integers(0, 300, size=num_wallets).astype(np.float64)),
+        "win_rate": only(is_gmgn, np.round(rng.random(num_wallets) * 100, 1)),
+        "realized_gross_profit": only(is_dex_check, realized_gross_profit),
+        "unrealized_gross_profit": only(is_dex_check, unrealized_gross_profit),
+        "tot_gross_profit": only(is_dex_check, realized_gross_profit + unrealized_gross_profit),
+        "realized_roi": only(is_gmgn, rng.standard_t(df=2, size=num_wallets) * 50),
+        "tot_roi": only(is_gmgn, rng.standard_t(df=2, size=num_wallets) * 50),
+        "num_trades": only(~is_gmgn, rng.integers(1, 5000, size=num_wallets).astype(np.float64)),
+        "trading_volume": only(is_dex_check, trading_volume),
+        "avg_trade_size": only(is_dex_check, trading_volume / 100),
+        "top_traders_tot_pnl": top_traders_tot_bought_usd * rng.normal(loc=0.2, scale=1, size=num_wallets),
+        "top_traders_tot_bought_usd": top_traders_tot_bought_usd,
+        "top_traders_mean_pct_pnl": rng.standard_t(df=2, size=num_wallets) * 100
+    }
+    assert set(PROFILE_SCORE_FIELDS) <= set(columns)
+    return columns
+
+def run_case(num_wallets: int, repeat: int = 5) -> dict:
+    """
+    A function to time the scoring and ranking of synthetic wallets with every weighting, and check the percentile ranks against pandas.
+    """
+    columns = build_profile_columns(num_wallets=num_wallets)
+
+    # The percentile ranks must match pandas' rank(pct=True), ties and NaN included
+    for field in ("num_wins", "top_traders_mean_pct_pnl"):
+        assert np.allclose(helper_percentile_rank(columns[field]), pd.Series(columns[field]).rank(pct=True).to_numpy(), equal_nan=True)
+
+    result = {"num_wallets": num_wallets}
+    for weighting, weights in SCORE_WEIGHTINGS.items():
+        scoring_secs = min(timeit.repeat(lambda: rank_wallet_scores(scores=compute_wallet_scores(columns=columns, weights=weights)), number=1, repeat=repeat))
+        result[f"{weighting}_ms"] = round(scoring_secs * 1000, 1)
+        print(f"{num_wallets:>10,} wallets  {weighting:<12} {scoring_secs * 1000:9.1f} ms  ({num_wallets / scoring_secs:,.0f} wallets/s)")
+    return result
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/bench_wallet_scoring.py [number of wallets, e.g., 1000000] [path of a JSON file to write the results to]
+    wallet_counts = [int(sys.argv[1])] if len(sys.argv) > 1 else [10_000, 100_000, 1_000_000]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    results = [run_case(num_wallets=num_wallets) for num_wallets in wallet_counts]
+
+    # Keep the results to compare them with the next run
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,83 @@
+# Import packages
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from wallet_signals import build_wallet_asset_matrix, compute_wallet_stats, find_wallet_clusters, iter_repeat_winners, iter_wallet_clusters
+
+## Benchmark inputs
+def build_traders(num_wallets: int, num_assets: int, traders_per_asset: int = 100, seed: int = 0) -> tuple:
+    """
+    A function to build synthetic top traders rows: the traders of every asset are drawn with a heavy-tailed popularity, so that a few wallets show up on many top gainers
+    as in the real feeds, and groups of 5 wallets that always win on the same assets together are planted to be found as clusters.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, num_wallets + 1) ** 0.8
+    popularity /= popularity.sum()
+    wallet_addresses = [f"wallet_{idx}" for idx in range(num_wallets)]
+    asset_urls = [f"https://dexscreener.com/solana/asset_{idx}" for idx in range(num_assets)]
+    group_assets = [rng.choice(num_assets, size=8, replace=False) for _ in range(20)]
+
+    traders = []
+    for col, asset_url in enumerate(asset_urls):
+        rows = set(rng.choice(num_wallets, size=traders_per_asset, replace=False, p=popularity).tolist())
+        planted_rows = {num_wallets - 1 - 5 * group_id - member for group_id, assets in enumerate(group_assets) if col in assets for member in range(5)} # The least popular wallets, which would not show up together by chance
+        for row in rows | planted_rows:
+            bought_usd = float(rng.lognormal(mean=8, sigma=1.5))
+            pct_pnl = abs(float(rng.normal(loc=0.5, scale=0.2))) if row in planted_rows else float(rng.normal(loc=0.3, scale=1))
+            traders.append({"asset_url": asset_url, "wallet_address": wallet_addresses[row], "trader_bought_usd": bought_usd, "trader_sold_usd": bought_usd * (1 + pct_pnl), "trader_pnl": bought_usd * pct_pnl})
+    asset_ages = {asset_url: float(age) for asset_url, age in zip(asset_urls, rng.exponential(scale=72, size=num_assets))}
+    return traders, asset_ages
+
+def run_case(num_wallets: int, num_assets: int) -> dict:
+    """
+    A function to time every step of the signal detection over synthetic top traders.
+    """
+    traders, asset_ages = build_traders(num_wallets=num_wallets, num_assets=num_assets)
+    timings = {}
+
+    start_time = time.perf_counter()
+    matrix = build_wallet_asset_matrix(traders=traders, asset_ages=asset_ages)
+    timings["build_ms"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    stats = compute_wallet_stats(matrix=matrix)
+    timings["stats_ms"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    labels, pairs = find_wallet_clusters(matrix=matrix)
+    timings["clusters_ms"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    num_repeat_winners = sum(1 for _ in iter_repeat_winners(matrix=matrix, stats=stats, labels=labels))
+    clusters = list(iter_wallet_clusters(matrix=matrix, stats=stats, labels=labels, pairs=pairs))
+    timings["output_ms"] = time.perf_counter() - start_time
+
+    # Every planted group of wallets must be found in one cluster
+    planted_groups = [{f"wallet_{num_wallets - 1 - 5 * group_id - member}" for member in range(5)} for group_id in range(20)]
+    num_found_groups = sum(any(group <= set(cluster["wallet_addresses"]) for cluster in clusters) for group in planted_groups)
+
+    result = {"num_wallets": matrix.shape[0], "num_assets": matrix.shape[1], "num_positions": matrix.traded.nnz, "num_repeat_winners": num_repeat_winners, "num_clusters": len(clusters), "num_found_groups": num_found_groups}
+    result.update({name: round(seconds * 1000, 1) for name, seconds in timings.items()})
+    print(f"{matrix.shape[0]:>7,} wallets x {matrix.shape[1]:>4} assets ({matrix.traded.nnz:,} positions): "
+          + "  ".join(f"{name[:-3]} {result[name]:8.1f} ms" for name in timings)
+          + f"  |  {num_repeat_winners:,} repeat winners, {len(clusters)} clusters, {num_found_groups}/20 planted groups found")
+    return result
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/bench_wallet_signals.py [number of wallets] [number of assets] [path of a JSON file to write the results to]
+    cases = [(int(sys.argv[1]), int(sys.argv[2]))] if len(sys.argv) > 2 else [(5_000, 100), (20_000, 300), (50_000, 800)]
+    output_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    results = [run_case(num_wallets=num_wallets, num_assets=num_assets) for num_wallets, num_assets in cases]
+
+    # Keep the results to compare them with the next run
+    if output_path is not None:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
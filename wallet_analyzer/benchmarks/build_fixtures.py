@@ -0,0 +1,184 @@
+# Import packages
+import os
+import sys
+from collections import Counter
+from html import escape
+
+# Make the project root importable when the script is run from any directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from feeds import iter_feed_items
+
+# The browserHtml pages that the parse callbacks are benchmarked against. They are rebuilt from the recorded feeds, so every row carries
+# the displayed values that the spiders actually scraped, in the markup that the spiders' XPaths select. A real browserHtml capture of
+# a page can be saved in the fixtures directory under the same file name to replace its reconstruction
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+## Helper functions
+def helper_text(value) -> str:
+    return "" if value is None else escape(str(value))
+
+def helper_optional(value, markup: str) -> str:
+    """
+    A function to leave an element out of the page when the recorded value is None, so that its XPath selects nothing as it did on the live page.
+    """
+    return "" if value is None else markup
+
+def load_feed(file_name: str) -> list:
+    # The feeds are read with iter_feed_items, which also reads the JSON Lines feeds and the arrays appended by a resumed crawl (i.e., "[...][...]")
+    try:
+        return list(iter_feed_items(feed_name=os.path.join(PROJECT_ROOT, os.path.splitext(file_name)[0])))
+    except FileNotFoundError:
+        return []
+
+## Page renderers
+def render_top_gainers_page(rows: list) -> str:
+    """
+    A function to render the rows of the top gainers feed as the top gainers table of dexscreener.com.
+    """
+    table_rows = []
+    for row in rows:
+        table_rows.append(
+            f"<a class='ds-dex-table-row ds-dex-table-row-top' href='{helper_text(row['asset_url'].replace('https://dexscreener.com', ''))}'>"
+            "<div class='ds-table-data-cell ds-dex-table-row-col-token'>"
+            f"<span class='ds-dex-table-row-badge-pair-no'>#<!-- -->{helper_text(row['asset_gain_rank_raw'])}</span>"
+            f"<img class='ds-dex-table-row-chain-icon' title='{helper_text(row['asset_network'])}'/>"
+            f"<img class='ds-dex-table-row-dex-icon' title='{helper_text(row['dex'])}'/>"
+            f"<span class='ds-dex-table-row-base-token-symbol custom-1gwsj5d'>{helper_text(row['asset_name'])}</span>"
+            f"<div class='ds-dex-table-row-base-token-name'><span>{helper_text(row['asset_name_text'])}</span></div>"
+            "</div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-price'>$<!-- -->{helper_text(row['asset_price_raw'])}</div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-pair-age'><span>{helper_text(row['asset_age'])}</span></div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-txns'>{helper_text(row['asset_24_hr_txns_raw'])}</div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-volume'>$<!-- -->{helper_text(row['asset_24_hr_volume_in_mil_raw'])}</div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-makers'>{helper_text(row['num_makers_raw'])}</div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-price-change-m5'><span>{helper_text(row['asset_price_change_l5m_raw'])}</span></div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-price-change-h1'><span>{helper_text(row['asset_price_change_l1h_raw'])}</span></div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-price-change-h6'><span>{helper_text(row['asset_price_change_l6h_raw'])}</span></div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-price-change-h24'><span>{helper_text(row['asset_price_change_l24h_raw'])}</span></div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-liquidity'>$<!-- -->{helper_text(row['asset_liquidity_in_mil_raw'])}</div>"
+            f"<div class='ds-table-data-cell ds-dex-table-row-col-market-cap'>$<!-- -->{helper_text(row['asset_market_cap_in_mil_raw'])}</div>"
+            "</a>"
+        )
+    return (
+        "<html><head><title>Top gainers</title></head><body><main>"
+        "<div class='ds-dex-table ds-dex-table-top'>\n" + "\n".join(table_rows) + "\n</div>"
+        "</main></body></html>"
+    )
+
+def render_top_traders_page(rows: list) -> str:
+    """
+    A function to render the rows of the top traders feed as the 'Top Traders' tab of an asset page on dexscreener.com.
+    """
+    table_rows = []
+    for row in rows:
+        bought_markup = helper_optional(
+            row["trader_bought_usd_raw"],
+            f"<span class='chakra-text custom-rcecxm'>{helper_text(row['trader_bought_usd_raw'])}</span>"
+            f"<span class='custom-2ygcmq'><span>{helper_text(row['trader_bought_crypto_raw'])}</span><span>/</span><span>{helper_text(row['trader_buy_txns_raw'])}</span><span> txns</span></span>"
+        )
+        sold_markup = helper_optional(
+            row["trader_sold_usd_raw"],
+            f"<span class='chakra-text custom-dv3t8y'>{helper_text(row['trader_sold_usd_raw'])}</span>"
+            f"<span class='custom-2ygcmq'><span>{helper_text(row['trader_sold_crypto_raw'])}</span><span>/</span><span>{helper_text(row['trader_sell_txns_raw'])}</span><span> txns</span></span>"
+        )
+        pnl_markup = helper_optional(row["trader_pnl_raw"], f"<div class='custom-1e9y0rl'>{helper_text(row['trader_pnl_raw'])}</div>")
+        explorer_markup = helper_optional(row["sol_scan_url"], f"<a aria-label='Open in block explorer' href='{helper_text(row['sol_scan_url'])}'></a>")
+        table_rows.append(
+            "<div class='custom-1nvxwu0'>"
+            f"<div class='custom-q9k0mw'>{bought_markup}</div>"
+            f"<div class='custom-q9k0mw'>{sold_markup}</div>"
+            f"{pnl_markup}"
+            f"<div class='custom-1dwgrrr'>{explorer_markup}</div>"
+            "</div>"
+        )
+    return (
+        "<html><head><title>Top traders</title></head><body><main><div class='custom-1nm7nf0'>"
+        "<div class='custom-1nvxwu0'><div class='custom-q9k0mw'><span>bought</span><span>sold</span><span>pnl</span></div></div>\n"
+        + "\n".join(table_rows) +
+        "\n</div></main></body></html>"
+    )
+
+def render_dex_check_wallet_page(row: dict) -> str:
+    """
+    A function to render a row of the DexCheck wallet screener feed as the wallet analyzer page of dexcheck.ai.
+    The raw (i.e., displayed) values are taken from the *_raw fields when the feed has them, and from the fields themselves otherwise (older feeds).
+    """
+    def raw(field):
+        return helper_text(row.get(f"{field}_raw", row.get(field)))
+
+    return (
+        "<html><head><title>Wallet analyzer</title></head><body><main>"
+        f"<div class='card'><button>Gross Profit</button><p>{raw('tot_gross_profit')}</p>"
+        f"<div><div><p>Realized</p><p><span>{raw('realized_gross_profit')}</span></p></div>"
+        f"<div><p>Unrealized</p><p><span>{raw('unrealized_gross_profit')}</span></p></div></div></div>"
+        f"<div class='card'><button>Total ROI</button><p>{raw('tot_roi')}</p>"
+        f"<div><div><p>Realized</p><p>{raw('realized_roi')}</p></div>"
+        f"<div><p>Unrealized</p><p>{raw('unrealized_roi')}</p></div></div></div>"
+        f"<div class='card'><button>Win Rate</button><div><p>{raw('win_rate')}</p>"
+        f"<div><p>Win</p><p>{raw('num_wins')}</p><p>Lose</p><p>{raw('num_losses')}</p></div></div></div>"
+        f"<div class='card'><button>Trading Volume</button><p>{raw('trading_volume')}</p></div>"
+        f"<div class='card'><button>Trades</button><p>{raw('num_trades')}</p></div>"
+        f"<div class='card'><button>Avg. Trade Size</button><p><span>{raw('avg_trade_size')}</span></p></div>"
+        "</main></body></html>"
+    )
+
+def render_gmgn_ai_wallet_page(row: dict) -> str:
+    """
+    A function to render the stats of a wallet as the wallet page of gmgn.ai.
+    """
+    return (
+        "<html><head><title>Wallet</title></head><body><main>"
+        f"<div class='stat'><div>Total PnL</div><div>{helper_text(row['tot_gross_profit'])}</div></div>"
+        f"<div class='stat'><div>Last 7D PnL</div><div>{helper_text(row['tot_roi'])}</div></div>"
+        f"<div class='stat'><div>Win Rate</div><div>{helper_text(row['win_rate'])}</div></div>"
+        "</main></body></html>"
+    )
+
+## Fixture selection
+def select_top_traders_rows(traders_rows: list) -> list:
+    """
+    A function to select the rows of the asset with the most top traders, i.e., the largest 'Top Traders' tab that was recorded.
+    """
+    asset_url = Counter(row["asset_url"] for row in traders_rows).most_common(1)[0][0]
+    return [row for row in traders_rows if row["asset_url"] == asset_url]
+
+def select_dex_check_row(wallet_rows: list) -> dict:
+    """
+    A function to select the first recorded wallet whose stats are all present.
+    """
+    return next(row for row in wallet_rows if all(v is not None for v in row.values()))
+
+def select_gmgn_ai_row(gmgn_rows: list, dex_check_row: dict) -> dict:
+    # Fall back to the DexCheck stats of the same wallet if the gmgn.ai feed is empty
+    if gmgn_rows:
+        return gmgn_rows[0]
+    return {k: dex_check_row[k] for k in ("wallet_address", "tot_gross_profit", "tot_roi", "win_rate")}
+
+def build_fixtures() -> dict:
+    """
+    A function to rebuild the fixture pages from the recorded feeds. Returns the path of every fixture page.
+    """
+    gainers_rows = load_feed("dex_screener_top_gainers.json")
+    traders_rows = load_feed("dex_screener_top_traders.json")
+    dex_check_row = select_dex_check_row(load_feed("dex_check_wallet_screener.json"))
+    gmgn_ai_row = select_gmgn_ai_row(load_feed("gmgn_ai_wallet_screener.json"), dex_check_row)
+
+    pages = {
+        "top_gainers.html": render_top_gainers_page(gainers_rows),
+        "top_traders.html": render_top_traders_page(select_top_traders_rows(traders_rows)),
+        "dex_check_wallet.html": render_dex_check_wallet_page(dex_check_row),
+        "gmgn_ai_wallet.html": render_gmgn_ai_wallet_page(gmgn_ai_row)
+    }
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    paths = {}
+    for file_name, html in pages.items():
+        paths[file_name] = os.path.join(FIXTURES_DIR, file_name)
+        with open(paths[file_name], "w", encoding="utf-8") as f:
+            f.write(html)
+    return paths
+
+if __name__ == "__main__":
+    for file_name, path in build_fixtures().items():
+        print(f"Wrote {path} ({os.path.getsize(path):,} bytes)")
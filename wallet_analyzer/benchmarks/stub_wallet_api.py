@@ -0,0 +1,107 @@
+# Import packages
+import hashlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# A local stub of the JSON endpoints behind the wallet pages of gmgn.ai and DexCheck, to test the api_first fetch mode without any request to the sites or to Zyte.
+# The stats of a wallet are derived from the hash of its address, so they are the same on every run. The wallets whose address starts with "missing"
+# are unknown to the endpoints, and a batch with a wallet whose address starts with "blocked" gets a 403 bot check page, as the sites do for the scrapers they spot
+GMGN_AI_PATH = "/gmgn/defi/quotation/v1/smartmoney/{gmgn_ai_chain}/walletNew/{wallet_address}"
+DEX_CHECK_PATH = "/dexcheck/wallets"
+
+## Stub data
+def helper_wallet_numbers(wallet_address: str, count: int) -> list:
+    # Numbers in [0, 1) derived from the address of a wallet
+    digest = hashlib.sha256(wallet_address.encode("utf-8")).digest()
+    return [digest[idx] / 256 for idx in range(count)]
+
+def build_gmgn_ai_data(wallet_address: str) -> dict:
+    total_profit, pnl_30d, winrate = helper_wallet_numbers(wallet_address=wallet_address, count=3)
+    return {"wallet_address": wallet_address, "total_profit": round((total_profit - 0.3) * 1e5, 2), "pnl_30d": round(pnl_30d * 4 - 1, 4), "winrate": round(winrate, 4)}
+
+def build_dex_check_record(wallet_address: str) -> dict:
+    gross_profit, realized_share, roi, win_rate, num_wins, num_losses, volume = helper_wallet_numbers(wallet_address=wallet_address, count=7)
+    gross_profit = round((gross_profit - 0.3) * 1e5, 2)
+    num_wins, num_losses = int(num_wins * 200), int(num_losses * 200)
+    trading_volume = round(volume * 1e6 + 1000, 2)
+    return {
+        "address": wallet_address,
+        "grossProfit": gross_profit,
+        "realizedProfit": round(gross_profit * realized_share, 2),
+        "unrealizedProfit": round(gross_profit * (1 - realized_share), 2),
+        "roi": round(roi * 400 - 100, 2),
+        "realizedRoi": round((roi * 400 - 100) * realized_share, 2),
+        "unrealizedRoi": round((roi * 400 - 100) * (1 - realized_share), 2),
+        "winRate": round(win_rate * 100, 2),
+        "wins": num_wins,
+        "losses": num_losses,
+        "tradingVolume": trading_volume,
+        "trades": num_wins + num_losses,
+        "avgTradeSize": round(trading_volume / max(num_wins + num_losses, 1), 2)
+    }
+
+## Stub server
+class StubWalletApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.num_requests += 1
+        url = urlparse(self.path)
+        path_parts = url.path.strip("/").split("/")
+        if url.path.startswith("/gmgn/") and len(path_parts) == 8:
+            wallet_addresses = [path_parts[-1]]
+            payload = {"code": 1, "msg": "wallet not found", "data": None} if wallet_addresses[0].startswith("missing") else {"code": 0, "msg": "success", "data": build_gmgn_ai_data(wallet_address=wallet_addresses[0])}
+        elif url.path == DEX_CHECK_PATH:
+            wallet_addresses = [address for address in parse_qs(url.query).get("addresses", [""])[0].split(",") if address]
+            payload = {"data": [build_dex_check_record(wallet_address=address) for address in wallet_addresses if not address.startswith("missing")]}
+        else:
+            self.send_error(404)
+            return
+
+        if any(address.startswith("blocked") for address in wallet_addresses):
+            self.send_response(403)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(b"<html><body>Checking your browser before accessing the site</body></html>")
+            return
+
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep the benchmarks and crawls quiet
+
+def start_stub_server(port: int = 0) -> ThreadingHTTPServer:
+    """
+    A function to start the stub server in a background thread (on a free port by default). The number of requests it served is kept in server.num_requests.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubWalletApiHandler)
+    server.num_requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def build_stub_endpoints(server: ThreadingHTTPServer, dex_check_batch_size: int = 20) -> dict:
+    """
+    A function to build the WALLET_API_ENDPOINTS setting that points the spiders to the stub server.
+    """
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return {
+        "gmgn_ai": {"url": base_url + GMGN_AI_PATH + "?period=30d", "batch_size": 1},
+        "dex_check": {"url": base_url + DEX_CHECK_PATH + "?addresses={wallet_addresses}", "batch_size": dex_check_batch_size}
+    }
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/stub_wallet_api.py [port], then run the wallet screeners with the environment variables it prints
+    stub_server = start_stub_server(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    stub_endpoints = build_stub_endpoints(server=stub_server)
+    print("Serving the stub wallet endpoints. Run the wallet screeners with:")
+    print(f"    WALLET_FETCH_MODE=api_first WALLET_API_VIA_ZYTE=0 WALLET_API_GMGN_AI_URL='{stub_endpoints['gmgn_ai']['url']}' WALLET_API_DEX_CHECK_URL='{stub_endpoints['dex_check']['url']}'")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub_server.shutdown()
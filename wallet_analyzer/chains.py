@@ -0,0 +1,76 @@
+# Import packages
+import re
+from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+# The chains that can be crawled, keyed by their DexScreener chain ID (i.e., the first path segment of the DexScreener URLs).
+# Every chain has the pattern that extracts a wallet address from the block explorer URLs of its top traders, and its chain ID on gmgn.ai
+CHAINS = {
+    "solana": {
+        "explorer_wallet_pattern": re.compile(r"(?<=/account/)[^/?#]+"), # e.g., https://solscan.io/account/<wallet_address>
+        "gmgn_ai_chain": "sol"
+    },
+    "ethereum": {
+        "explorer_wallet_pattern": re.compile(r"(?<=/address/)[^/?#]+"), # e.g., https://etherscan.io/address/<wallet_address>
+        "gmgn_ai_chain": "eth"
+    },
+    "base": {
+        "explorer_wallet_pattern": re.compile(r"(?<=/address/)[^/?#]+"), # e.g., https://basescan.org/address/<wallet_address>
+        "gmgn_ai_chain": "base"
+    },
+    "bsc": {
+        "explorer_wallet_pattern": re.compile(r"(?<=/address/)[^/?#]+"), # e.g., https://bscscan.com/address/<wallet_address>
+        "gmgn_ai_chain": "bsc"
+    }
+}
+
+# The chain of the feeds that were written before the crawls became multi-chain
+DEFAULT_CHAIN = "solana"
+
+# The default filters of the top gainers pages: Volume > 500k, Liquidity > 250k, MCap > 1M
+DEFAULT_TOP_GAINERS_FILTERS = {
+    "min24HSells": 30,
+    "min24HTxns": 300,
+    "min24HVol": 500000,
+    "minLiq": 250000,
+    "minMarketCap": 1000000
+}
+
+def parse_chains(chains: str) -> list:
+    """
+    A function to parse a comma-separated list of chains (e.g., "solana,ethereum,base,bsc") and check that they are supported.
+    """
+    parsed_chains = [chain.strip().lower() for chain in chains.split(",") if chain.strip()]
+    unsupported_chains = [chain for chain in parsed_chains if chain not in CHAINS]
+    if unsupported_chains or not parsed_chains:
+        raise ValueError(f"Unsupported chains: {', '.join(unsupported_chains) or chains!r}. The supported chains are: {', '.join(CHAINS)}")
+    return list(dict.fromkeys(parsed_chains))
+
+def build_top_gainers_url(chain: str, filters: Optional[dict] = None) -> str:
+    """
+    A function to build the URL of the top gainers page of a chain, ranked by the price change in the last 24 hours.
+    """
+    query_params = {**DEFAULT_TOP_GAINERS_FILTERS, **(filters or {}), "order": "desc", "rankBy": "priceChangeH24"}
+    return f"https://dexscreener.com/gainers/{chain}?{urlencode(sorted(query_params.items()))}"
+
+def chain_from_asset_url(asset_url: str) -> str:
+    """
+    A function to extract the chain of an asset from its DexScreener URL, e.g., https://dexscreener.com/base/0x... -> base.
+    """
+    chain = urlparse(asset_url).path.strip("/").split("/")[0]
+    return chain if chain in CHAINS else DEFAULT_CHAIN
+
+def extract_wallet_address(explorer_url: Optional[str], chain: str) -> Optional[str]:
+    """
+    A function to extract the wallet address from the block explorer URL of a top trader.
+    """
+    if explorer_url is None:
+        return None
+    match = CHAINS[chain]["explorer_wallet_pattern"].search(explorer_url)
+    return match.group(0) if match is not None else None
+
+def build_wallet_key(chain: str, wallet_address: str) -> str:
+    """
+    A function to build the key of a wallet in the crawl checkpoints. The chain is part of the key because the same EVM address can be screened on several chains.
+    """
+    return f"{chain}:{wallet_address}"
@@ -0,0 +1,153 @@
+# Import packages
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+from scrapy import signals
+
+class CrawlCheckpoint:
+    """
+    A persistent SQLite record of the work units of every stage of a crawl (e.g., the asset URLs of the top traders stage or the wallet addresses of a wallet screener).
+    A unit is "pending" from the moment its request is scheduled until its items are yielded, at which point it becomes "done".
+    The request counter of a pending unit is kept up to date, so the retries that were already spent survive a restart.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS work_units (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                request_counter INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def reset(self):
+        """
+        A function to forget all the work units (i.e., start a fresh crawl).
+        """
+        self.conn.execute("DELETE FROM work_units")
+        self.conn.commit()
+
+    def mark_pending(self, stage: str, key: str, payload: Optional[dict] = None, request_counter: int = 1):
+        """
+        A function to record that the request of a work unit has been scheduled. Units that are already done stay done.
+        """
+        self.conn.execute(
+            """
+            INSERT INTO work_units (stage, key, status, request_counter, payload, updated_at) VALUES (?, ?, 'pending', ?, ?, ?)
+            ON CONFLICT (stage, key) DO UPDATE SET request_counter = excluded.request_counter, payload = excluded.payload, updated_at = excluded.updated_at
+            WHERE work_units.status = 'pending'
+            """,
+            (stage, key, request_counter, json.dumps(payload or {}), time.time())
+        )
+        self.conn.commit()
+
+    def mark_done(self, stage: str, key: str):
+        """
+        A function to record that a work unit has produced its items.
+        """
+        self.conn.execute(
+            """
+            INSERT INTO work_units (stage, key, status, request_counter, payload, updated_at) VALUES (?, ?, 'done', 1, '{}', ?)
+            ON CONFLICT (stage, key) DO UPDATE SET status = 'done', updated_at = excluded.updated_at
+            """,
+            (stage, key, time.time())
+        )
+        self.conn.commit()
+
+    def get_status(self, stage: str, key: str) -> Optional[tuple]:
+        """
+        A function to return the (status, request_counter) of a work unit, or None if it has never been scheduled.
+        """
+        return self.conn.execute("SELECT status, request_counter FROM work_units WHERE stage = ? AND key = ?", (stage, key)).fetchone()
+
+    def keys(self, stage: str, status: Optional[str] = None) -> set:
+        """
+        A function to return the keys of the work units of a stage, optionally filtered by status.
+        """
+        if status is None:
+            rows = self.conn.execute("SELECT key FROM work_units WHERE stage = ?", (stage,))
+        else:
+            rows = self.conn.execute("SELECT key FROM work_units WHERE stage = ? AND status = ?", (stage, status))
+        return {row[0] for row in rows}
+
+    def pending_units(self, stage: str) -> list:
+        """
+        A function to return the (key, payload, request_counter) of the outstanding work units of a stage.
+        """
+        rows = self.conn.execute("SELECT key, payload, request_counter FROM work_units WHERE stage = ? AND status = 'pending' ORDER BY updated_at", (stage,))
+        return [(key, json.loads(payload), request_counter) for key, payload, request_counter in rows]
+
+    def close(self):
+        self.conn.close()
+
+class CheckpointedSpiderMixin:
+    """
+    A mixin that gives a spider a persistent checkpoint of its work units and a resume mode.
+    Run with `-s RESUME_CRAWL=1` to keep the checkpoint of the previous run, append to the feeds instead of overwriting them, and only re-issue the outstanding requests.
+    """
+    checkpoint = None
+    resume_crawl = False
+
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+
+        # Append to the feeds of the previous run instead of overwriting them
+        if settings.getbool("RESUME_CRAWL"):
+            feeds = {uri: {**options, "overwrite": False} for uri, options in settings.getdict("FEEDS").items()}
+            settings.set("FEEDS", feeds, priority="spider")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.resume_crawl = crawler.settings.getbool("RESUME_CRAWL")
+
+        # Open the checkpoint of the spider, and forget the previous run unless it is being resumed
+        os.makedirs(crawler.settings.get("CHECKPOINT_DIR"), exist_ok=True)
+        spider.checkpoint = CrawlCheckpoint(path=os.path.join(crawler.settings.get("CHECKPOINT_DIR"), f"{spider.name}.sqlite"))
+        if not spider.resume_crawl:
+            spider.checkpoint.reset()
+        crawler.signals.connect(spider.checkpoint.close, signal=signals.spider_closed)
+        return spider
+
+    def is_work_done(self, stage: str, key: str) -> bool:
+        """
+        A function to check if a work unit was completed by the run that is being resumed.
+        """
+        if self.checkpoint is None or not self.resume_crawl:
+            return False
+        status = self.checkpoint.get_status(stage=stage, key=key)
+        return status is not None and status[0] == "done"
+
+    def is_work_scheduled(self, stage: str, key: str) -> bool:
+        """
+        A function to check if the request of a work unit has already been scheduled (by this run or by the run that is being resumed).
+        """
+        return self.checkpoint is not None and self.checkpoint.get_status(stage=stage, key=key) is not None
+
+    def get_resumed_request_counter(self, stage: str, key: str) -> int:
+        """
+        A function to return the request counter a work unit had reached in the run that is being resumed (1 for new units).
+        """
+        if self.checkpoint is None or not self.resume_crawl:
+            return 1
+        status = self.checkpoint.get_status(stage=stage, key=key)
+        return 1 if status is None else status[1]
+
+    def mark_work_pending(self, stage: str, key: str, payload: Optional[dict] = None, request_counter: int = 1):
+        if self.checkpoint is not None:
+            self.checkpoint.mark_pending(stage=stage, key=key, payload=payload, request_counter=request_counter)
+
+    def mark_work_done(self, stage: str, key: str):
+        if self.checkpoint is not None:
+            self.checkpoint.mark_done(stage=stage, key=key)
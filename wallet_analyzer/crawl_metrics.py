@@ -0,0 +1,118 @@
+# Import packages
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# The upper bounds of the buckets of the histograms (in seconds for timings, in attempts for the Zyte API retries)
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+ATTEMPTS_BUCKETS = (1, 2, 3, 5, 10, 20, 50)
+
+class Histogram:
+    """
+    A cumulative histogram in the Prometheus style (i.e., every bucket counts the observations that are less than or equal to its upper bound).
+    """
+    def __init__(self, buckets: tuple = SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1) # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self) -> dict:
+        cumulative_counts, running_count = {}, 0
+        for upper_bound, bucket_count in zip([*self.buckets, "+Inf"], self.bucket_counts):
+            running_count += bucket_count
+            cumulative_counts[str(upper_bound)] = running_count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "buckets": cumulative_counts
+        }
+
+class MetricsRegistry:
+    """
+    An in-process registry of the histograms and counters of a crawl. Every metric is identified by its name and its labels (e.g., callback="parse_top_traders").
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name: str, value: float, buckets: tuple = SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(buckets=buckets)
+        self.histograms[key].observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        A context manager to record the duration of a block of code in a histogram.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    def snapshot(self) -> dict:
+        return {
+            "histograms": [{"name": name, "labels": dict(labels), **histogram.to_dict()} for (name, labels), histogram in self.histograms.items()],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()]
+        }
+
+# The registry shared by the spiders, the middlewares, the pipelines and the Zyte API retry policy of the process
+metrics = MetricsRegistry()
+
+## Exporting
+def helper_escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def helper_format_labels(labels: dict, extra_labels: Optional[dict] = None) -> str:
+    """
+    A function to format the labels of a metric in the Prometheus text format, e.g., {callback="parse_top_traders",le="0.5"}.
+    """
+    all_labels = {**labels, **(extra_labels or {})}
+    if not all_labels:
+        return ""
+    return "{" + ",".join(f'{k}="{helper_escape_label_value(v)}"' for k, v in all_labels.items()) + "}"
+
+def render_prometheus(snapshot: dict, prefix: str = "wallet_analyzer") -> str:
+    """
+    A function to render a metrics snapshot in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in snapshot["histograms"]:
+        name = f"{prefix}_{histogram['name']}"
+        for upper_bound, cumulative_count in histogram["buckets"].items():
+            lines.append(f"{name}_bucket{helper_format_labels(histogram['labels'], {'le': upper_bound})} {cumulative_count}")
+        lines.append(f"{name}_sum{helper_format_labels(histogram['labels'])} {histogram['sum']}")
+        lines.append(f"{name}_count{helper_format_labels(histogram['labels'])} {histogram['count']}")
+    for counter in snapshot["counters"]:
+        lines.append(f"{prefix}_{counter['name']}_total{helper_format_labels(counter['labels'])} {counter['value']}")
+    for gauge in snapshot.get("gauges", []):
+        lines.append(f"{prefix}_{gauge['name']}{helper_format_labels(gauge['labels'])} {gauge['value']}")
+
+    # Only the numeric Scrapy stats can be exported as gauges
+    for stat_name, stat_value in snapshot.get("scrapy_stats", {}).items():
+        if isinstance(stat_value, (int, float)) and not isinstance(stat_value, bool):
+            lines.append(f"{prefix}_scrapy_stat{helper_format_labels({'stat': stat_name})} {stat_value}")
+    return "\n".join(lines) + "\n"
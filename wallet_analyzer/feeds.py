@@ -0,0 +1,84 @@
+# Import packages
+import json
+import logging
+import os
+from typing import Iterable, Iterator, Optional
+from inputs import feed_format
+
+logger = logging.getLogger(__name__)
+
+# The file extension of every supported feed format
+FEED_FORMAT_EXTENSIONS = {
+    "json": "json",
+    "jsonlines": "jsonl"
+}
+
+## Writing
+def build_feed(feed_name: str, item_classes: Optional[list] = None, overwrite: bool = True) -> dict:
+    """
+    A function to build the FEEDS entry of a spider output in the configured feed format (json or jsonlines).
+    """
+    feed_options = {
+        'format': feed_format,
+        'overwrite': overwrite
+    }
+    if item_classes is not None:
+        feed_options['item_classes'] = item_classes
+    return {f"{feed_name}.{FEED_FORMAT_EXTENSIONS[feed_format]}": feed_options}
+
+def write_feed_items(feed_name: str, items: Iterable[dict]) -> str:
+    """
+    A function to write items to a feed in the configured feed format, one item per line (like Scrapy does) so that iter_feed_items can stream it back.
+    The items are written as they are consumed, to a temporary file that replaces the feed at the end, so that a crash does not leave a truncated feed behind. Returns the path of the feed.
+    """
+    path = f"{feed_name}.{FEED_FORMAT_EXTENSIONS[feed_format]}"
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        if feed_format == "jsonlines":
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        else:
+            f.write("[")
+            for idx, item in enumerate(items):
+                f.write(("\n" if idx == 0 else ",\n") + json.dumps(item, ensure_ascii=False))
+            f.write("\n]")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+## Reading
+def helper_resolve_feed_path(feed_name: str) -> str:
+    """
+    A function to find the file of a feed. If the feed exists in more than one format, the most recently written file wins.
+    """
+    candidate_paths = [f"{feed_name}.{extension}" for extension in FEED_FORMAT_EXTENSIONS.values()]
+    existing_paths = [path for path in candidate_paths if os.path.exists(path)]
+    if not existing_paths:
+        raise FileNotFoundError(f"Could not find the feed {feed_name} (looked for {', '.join(candidate_paths)})")
+    return max(existing_paths, key=os.path.getmtime)
+
+def iter_feed_items(feed_name: str) -> Iterator[dict]:
+    """
+    A function to stream the items of a feed one at a time, without loading the whole file in memory.
+    It reads JSON Lines files as well as the JSON arrays written by Scrapy, which put one item per line between the brackets.
+    A partially written last line (e.g., when the crawl crashed) is skipped with a warning, so the items before it can still be read.
+    """
+    path = helper_resolve_feed_path(feed_name=feed_name)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+
+            # Skip the brackets of JSON arrays (including the "][" between the arrays of a resumed crawl) and the empty lines
+            if not line.strip("[]"):
+                continue
+
+            # A JSON array written on a single line
+            if line.startswith("[") and line.endswith("]"):
+                yield from json.loads(line)
+                continue
+
+            try:
+                yield json.loads(line.rstrip(","))
+            except json.JSONDecodeError:
+                # Only the last line of a file can be incomplete
+                if any(remaining_line.strip() not in ("", "]") for remaining_line in f):
+                    raise ValueError(f"The feed {path} does not have one item per line")
+                logger.warning(f"Skipping the incomplete last line of the feed {path}")
@@ -1,55 +1,29 @@
 # Import packages
-import re
+import math
 from typing import Any
+from number_normalization import normalize_number
 
 ## Helper functions
 def helper_normalize_numbers_in_vol_liq_mcap(value: str) -> float:
     """
     A function to normalize the volume, liquidity, and market capitalization values in millions and thousands.
+    Kept for backwards compatibility. Use number_normalization.normalize_number(value, unit="millions") instead.
     """
-    if value.find("T") != -1:
-        value = float(re.sub(pattern="T", repl="", string=value)) * 1000000
-    elif value.find("B") != -1:
-        value = float(re.sub(pattern="B", repl="", string=value)) * 1000
-    elif value.find("M") != -1:
-        value = float(re.sub(pattern="M", repl="", string=value))
-    elif value.find("K") != -1:
-        value = float(re.sub(pattern="K", repl="", string=value)) / 1000
-    else:
-        value = float(value)
-    
-    return value
+    return normalize_number(value=value, unit="millions")
 
 def helper_normalize_numbers_in_pct_gains(value: str) -> float:
     """
     A function to normalize the percentage gains in the last 5 minutes, 1 hour, 6 hours, and 24 hours.
+    Kept for backwards compatibility. Use number_normalization.normalize_number(value) instead.
     """
-    if value.find("B") != -1:
-        value = float(re.sub(pattern="%|B|,", repl="", string=value)) * pow(10, 9)
-    elif value.find("M") != -1:
-        value = float(re.sub(pattern="%|M|,", repl="", string=value)) * pow(10, 6)
-    elif value.find("K") != -1:
-        value = float(re.sub(pattern="%|K|,", repl="", string=value)) * pow(10, 3)
-    else:
-        value = float(re.sub(pattern="%|,", repl="", string=value))
-    
-    return value
+    return normalize_number(value=value)
 
 def helper_normalize_numbers_in_txn_data(value: str) -> float:
     """
-    A function to normalize the percentage gains in the last 5 minutes, 1 hour, 6 hours, and 24 hours.
+    A function to normalize the USD amounts, crypto amounts and transaction counts of the top traders.
+    Kept for backwards compatibility. Use number_normalization.normalize_number(value) instead.
     """
-    if value is not None:
-        if value.find("B") != -1:
-            value = float(re.sub(pattern=r"\$|B|,|<", repl="", string=value)) * pow(10, 9)
-        elif value.find("M") != -1:
-            value = float(re.sub(pattern=r"\$|M|,|<", repl="", string=value)) * pow(10, 6)
-        elif value.find("K") != -1:
-            value = float(re.sub(pattern=r"\$|K|,|<", repl="", string=value)) * pow(10, 3)
-        else:
-            value = float(re.sub(pattern=r"\$|,|<", repl="", string=value))
-    
-    return value
+    return normalize_number(value=value)
 
 def helper_treat_none_before_data_type_change(value: str, data_type: Any):
     """
@@ -60,4 +34,45 @@ def helper_treat_none_before_data_type_change(value: str, data_type: Any):
             value = int(value)
         elif data_type == "float":
             value = float(value)
-    return value
\ No newline at end of file
+    return value
+
+def helper_format_decimals(value: float, max_decimals: int) -> str:
+    """
+    A function to round a number to max_decimals without padding the numbers that have fewer decimals (e.g., 158.2 -> "158.2" and 40.0899 -> "40.090" with 3 decimals).
+    """
+    value = round(value, 10) # Drop the floating point noise, e.g., of 1.211 * 100
+    if value == int(value):
+        num_decimals = 0
+    else:
+        text = repr(value)
+        num_decimals = len(text.split(".")[1]) if "e" not in text else max_decimals
+    return f"{value:,.{min(num_decimals, max_decimals)}f}"
+
+def helper_format_usd(value: Any):
+    """
+    A function to format a USD amount the way the wallet pages display it, for the stats that the feeds keep as displayed: up to 5 significant digits,
+    whole dollars from $10,000 and a B or T suffix from a billion (e.g., 158.2 -> "$158.2", -1581.94 -> "-$1,581.9", 1319616.4 -> "$1,319,616", -4.43e11 -> "-$443B").
+    """
+    if value is None:
+        return None
+    value = float(value)
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    if value >= pow(10, 9):
+        value, suffix = (value / pow(10, 12), "T") if value >= pow(10, 12) else (value / pow(10, 9), "B")
+        return f"{sign}${helper_format_decimals(value=value, max_decimals=1 if value < 10 else 0)}{suffix}"
+    max_decimals = max(0, 4 - math.floor(math.log10(value))) if value > 0 else 0
+    return f"{sign}${helper_format_decimals(value=value, max_decimals=max_decimals)}"
+
+def helper_format_pct(ratio: Any, fixed_decimals: bool = True):
+    """
+    A function to format a ratio as a percentage the way the wallet pages display it, for the stats that the feeds keep as displayed. The computed percentages
+    (e.g., the win rate) have 2 decimals, except the whole ones (e.g., 0.352 -> "35.20%", 0.75 -> "75%"). The percentages that the sites read from their data
+    (e.g., the ROI) have up to 2 decimals (fixed_decimals=False, e.g., 1.211 -> "121.1%").
+    """
+    if ratio is None:
+        return None
+    value = round(float(ratio) * 100, 2)
+    if not fixed_decimals:
+        return f"{helper_format_decimals(value=float(ratio) * 100, max_decimals=2)}%"
+    return f"{value:,.0f}%" if value == int(value) else f"{value:,.2f}%"
@@ -1,9 +1,27 @@
 # Import libraries
 import os
-from dotenv import load_dotenv
+from typing import Optional
 
-# Load the environment variables from the .env file
-load_dotenv()
+def helper_find_dotenv() -> Optional[str]:
+    """
+    A function to find the .env file of the project, looking up from the directory of this file to the root as load_dotenv() does.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        if os.path.isfile(os.path.join(directory, ".env")):
+            return os.path.join(directory, ".env")
+        if os.path.dirname(directory) == directory:
+            return None
+        directory = os.path.dirname(directory)
+
+# Load the environment variables from the .env file. python-dotenv is only imported if there is one (e.g., not when cron passes the variables)
+dotenv_path = helper_find_dotenv()
+if dotenv_path is not None:
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=dotenv_path)
+
+# The format of the spider outputs: "json" (one big array, the default) or "jsonlines" (one item per line, readable while the crawl is still running)
+feed_format = os.getenv("WALLET_ANALYZER_FEED_FORMAT", "json")
 
 # Custom scrapy settings
 custom_scrapy_settings = {
@@ -22,7 +40,17 @@ custom_scrapy_settings = {
         "https": "scrapy_zyte_api.ScrapyZyteAPIDownloadHandler",
     },
     "DOWNLOADER_MIDDLEWARES": {
+        "wallet_analyzer.middlewares.WalletStatsCacheDownloaderMiddleware": 500,
+        "wallet_analyzer.middlewares.WalletScreeningBudgetMiddleware": 950, # After the Zyte response cache (HttpCacheMiddleware, 900), so the replayed responses do not use up the budget
         "scrapy_zyte_api.ScrapyZyteAPIDownloaderMiddleware": 1000,
+        "wallet_analyzer.middlewares.AdaptiveConcurrencyMiddleware": 1010, # After the Zyte API middleware, which sets the downloader slot of the requests it sends
+    },
+    "SPIDER_MIDDLEWARES": {
+        "wallet_analyzer.middlewares.WalletStatsCacheSpiderMiddleware": 500,
+        "wallet_analyzer.middlewares.CallbackTimingSpiderMiddleware": 950,
+    },
+    "EXTENSIONS": {
+        "wallet_analyzer.extensions.CrawlMetricsExtension": 500,
     },
     "REQUEST_FINGERPRINTER_CLASS": "scrapy_zyte_api.ScrapyZyteAPIRequestFingerprinter",
     "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
@@ -30,5 +58,79 @@ custom_scrapy_settings = {
     "ZYTE_API_LOG_REQUESTS": True,
     "ZYTE_API_TRANSPARENT_MODE": True,
     "ZYTE_API_SKIP_HEADERS": ["Cookie", "User-Agent"],
-    "ZYTE_API_RETRY_POLICY": "retry_policies.CUSTOM_RETRY_POLICY"
+    "ZYTE_API_RETRY_POLICY": "retry_policies.CUSTOM_RETRY_POLICY",
+    "ITEM_PIPELINES": {
+        "wallet_analyzer.pipelines.ParquetExportPipeline": 300,
+        "wallet_analyzer.pipelines.TimeSeriesStorePipeline": 400,
+    },
+    # Adaptive concurrency settings
+    "ADAPTIVE_CONCURRENCY_ENABLED": True, # Tune the concurrency of every target domain to maximize the successfully scraped items per minute
+    "ADAPTIVE_CONCURRENCY_START": 5, # The concurrency of a domain before its first adjustment
+    "ADAPTIVE_CONCURRENCY_MIN": 1,
+    "ADAPTIVE_CONCURRENCY_MAX": 15, # Capped by CONCURRENT_REQUESTS
+    "ADAPTIVE_CONCURRENCY_DOMAIN_BOUNDS": {}, # Optional [min, max] concurrency per domain, e.g. {"gmgn.ai": [1, 5]}
+    "ADAPTIVE_CONCURRENCY_INTERVAL": 30, # The minimum number of seconds between two adjustments of a domain
+    "ADAPTIVE_CONCURRENCY_MIN_SAMPLES": 5, # The minimum number of responses between two adjustments of a domain
+    "ADAPTIVE_CONCURRENCY_MAX_THROTTLED_RATE": 0.1, # Back off if more than 10% of the requests get a 429/503/520/521
+    "ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE": 0.2, # Back off if more than 20% of the requests fail for other reasons
+    "ADAPTIVE_CONCURRENCY_MAX_P90_LATENCY": 90, # Back off if the p90 latency gets close to DOWNLOAD_TIMEOUT
+    "ADAPTIVE_CONCURRENCY_BACKOFF_FACTOR": 0.5,
+    # Metrics settings
+    "METRICS_ENABLED": True, # Record the callback timings, the Zyte API latencies and retries, and the items per second of the crawl
+    "METRICS_FORMAT": "json", # The format of the metrics snapshot: "json" or "prometheus" (text exposition format)
+    "METRICS_DIR": "metrics", # The snapshot is written to <METRICS_DIR>/<spider name>_metrics.json (or .prom)
+    "METRICS_DUMP_INTERVAL": 0, # Also dump the snapshot every N seconds while the crawl runs (0 = only when the spider closes)
+    # Parquet export settings
+    "PARQUET_EXPORT_ENABLED": True, # Also write every feed as a typed Parquet file next to the JSON feed (requires pyarrow)
+    "PARQUET_EXPORT_DIR": ".", # The directory of the Parquet files
+    "PARQUET_EXPORT_BATCH_SIZE": 500, # The number of items buffered per item class before a row group is written
+    "PARQUET_EXPORT_COMPRESSION": "zstd",
+    # Time-series store settings (see timeseries_store.py)
+    "TIMESERIES_STORE_ENABLED": True, # Append a snapshot of every asset, top trader and wallet to the time-series store (requires pyarrow)
+    "TIMESERIES_STORE_DIR": "timeseries",
+    "TIMESERIES_STORE_BUCKETS": 16, # The number of hash buckets of the keys of every entity per date
+    "TIMESERIES_STORE_BATCH_SIZE": 5000, # The number of snapshots buffered per item class before they are appended
+    "TIMESERIES_STORE_COMPACT_DAYS": 7, # Merge the part files of the last N days (before today) when the spider closes
+    # Checkpoint settings
+    "RESUME_CRAWL": False, # Run with -s RESUME_CRAWL=1 to only re-issue the requests that the previous run did not complete, appending to its feeds
+    "CHECKPOINT_DIR": "checkpoints", # The directory of the per-spider SQLite checkpoints of the work units
+    # Wallet stats cache settings
+    "WALLET_CACHE_ENABLED": True, # Skip the wallets that have been screened recently and merge their cached stats into the output feed
+    "WALLET_CACHE_PATH": "wallet_stats_cache.sqlite", # The SQLite file that stores the wallet stats keyed by wallet address, chain and source
+    "WALLET_CACHE_TTL": int(os.getenv("WALLET_CACHE_TTL", 6 * 60 * 60)), # A cached wallet is considered fresh for 6 hours by default
+    # Wallet screening priority and budget settings
+    "WALLET_PRIORITY_WEIGHTS": { # The weights of the ranks that order the wallet screening queue (a weight of 0 ignores the rank)
+        "pct_pnl_rank": 1, # The rank of the wallet's best trade by percentage-based PnL
+        "abs_pnl_rank": 1, # The rank of the wallet's best trade by absolute PnL
+        "aggregate_rank": 1 # The rank of the wallet by its winning assets and total PnL across all assets (see wallet_aggregation.py)
+    },
+    "WALLET_SCREENING_BUDGET_SECONDS": 0, # Stop sending wallet screening requests N seconds after the spider opened (0 = no time budget)
+    "WALLET_SCREENING_BUDGET_REQUESTS": 0, # Stop sending wallet screening requests after N requests to Zyte, retries included (0 = no request budget)
+    # Wallet fetch mode settings (see wallet_fetch.py)
+    "WALLET_FETCH_MODE": os.getenv("WALLET_FETCH_MODE", "browser"), # "api_first" reads the stats from the JSON endpoints of WALLET_API_ENDPOINTS and "light_first" tries a non-browser request first, and both only render the wallets whose cheap response lacks their stats. "browser" always renders
+    "WALLET_LIGHT_FETCH_MIN_SAMPLES": 20, # The number of wallets fetched with the light or JSON requests after which their success rate is checked
+    "WALLET_LIGHT_FETCH_MIN_SUCCESS_RATE": 0.2, # Stop the light or JSON requests for the rest of the crawl if fewer than 20% of their wallets got their stats
+    "WALLET_API_ENDPOINTS": { # The JSON endpoints behind the wallet pages per wallet source, filled with {wallet_address}, {wallet_addresses} (comma-separated) and the chain IDs of CHAINS (e.g., {gmgn_ai_chain})
+        "gmgn_ai": {"url": os.getenv("WALLET_API_GMGN_AI_URL", "https://gmgn.ai/defi/quotation/v1/smartmoney/{gmgn_ai_chain}/walletNew/{wallet_address}?period=30d"), "batch_size": 1},
+        "dex_check": {"url": os.getenv("WALLET_API_DEX_CHECK_URL"), "batch_size": int(os.getenv("WALLET_API_DEX_CHECK_BATCH_SIZE", 20))} # No default URL: set the endpoint that returns {"data": [{"address": ..., "grossProfit": ..., ...}]} (see DEX_CHECK_API_FIELDS)
+    },
+    "WALLET_API_VIA_ZYTE": os.getenv("WALLET_API_VIA_ZYTE", "1") == "1", # Send the JSON requests through Zyte without a browser. Set it to 0 to call the endpoints directly (e.g., the local stub of benchmarks/stub_wallet_api.py)
+    "WALLET_ACTION_TIMEOUTS": {}, # The timeout in seconds of the waitForSelector actions per wallet source, e.g. {"dex_check": 5} (tune it with the wallet_action_seconds metric)
+    # Zyte response cache settings (to re-run the parse callbacks over the rendered pages without paying for them again)
+    "HTTPCACHE_ENABLED": os.getenv("ZYTE_CACHE_ENABLED", "0") == "1", # Store every Zyte API response (run_pipeline.py --cache-responses also enables it)
+    "HTTPCACHE_STORAGE": "wallet_analyzer.httpcache.ZyteResponseCacheStorage",
+    "HTTPCACHE_POLICY": "scrapy.extensions.httpcache.DummyPolicy", # Cache every response, whatever its HTTP caching headers
+    "HTTPCACHE_DIR": "zyte_cache", # Relative to the .scrapy directory of the project
+    "HTTPCACHE_EXPIRATION_SECS": 24 * 60 * 60, # The TTL of the spiders that are not in ZYTE_CACHE_TTLS (0 = never expire)
+    "HTTPCACHE_IGNORE_MISSING": False, # Drop the requests that are not cached instead of sending them to Zyte (set by run_pipeline.py --reparse-only)
+    "ZYTE_CACHE_TTLS": { # The TTL in seconds of the cached responses per spider. The top gainers and top traders change much faster than the wallet stats
+        "dex_screener_top_gainers": 30 * 60,
+        "dex_screener_top_traders": 60 * 60,
+        "dex_check_wallet_screener": 24 * 60 * 60,
+        "gmgn_ai_wallet_screener": 24 * 60 * 60,
+        "wallet_analyzer_pipeline": 30 * 60
+    },
+    "ZYTE_CACHE_MAX_BYTES": 2 * pow(2, 30), # Evict the least recently used responses when the compressed payloads exceed 2 GB (0 = no limit)
+    "ZYTE_CACHE_COMPRESSION_LEVEL": 6, # The gzip compression level of the payloads
+    "ZYTE_CACHE_REPARSE_ONLY": False # Serve every cached response whatever its age (set by run_pipeline.py --reparse-only)
 }
\ No newline at end of file
@@ -0,0 +1,100 @@
+# Import packages
+import re
+from typing import TYPE_CHECKING, Optional, Union
+
+# NumPy and pandas are only imported by the batch API, so that the spiders, which only use the scalar API, start without them
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+## Suffix table
+# The magnitude suffixes shown on DexScreener, expressed as powers of 10
+SUFFIX_EXPONENTS = {"K": 3, "M": 6, "B": 9, "T": 12}
+
+# The units a value can be normalized to, expressed as powers of 10
+UNIT_EXPONENTS = {"units": 0, "thousands": 3, "millions": 6}
+
+# The (multiplier, divisor) pair of every unit and suffix combination. Dividing instead of multiplying by a negative power of 10 keeps the results exact (e.g., 542K -> 0.542 million)
+SCALE_TABLE = {
+    unit: {
+        suffix: (
+            float(pow(10, max(suffix_exponent - unit_exponent, 0))),
+            float(pow(10, max(unit_exponent - suffix_exponent, 0)))
+        )
+        for suffix, suffix_exponent in {**SUFFIX_EXPONENTS, None: 0}.items()
+    }
+    for unit, unit_exponent in UNIT_EXPONENTS.items()
+}
+
+## Precompiled patterns
+# The characters that carry no numeric information ($, %, thousands separators, the "<" of "<$0.1" and whitespace), as a str.translate deletion table
+NOISE_TABLE = str.maketrans("", "", "$%,< \t\n")
+
+# The placeholders the sites show instead of a number when there is no data
+MISSING_VALUES = frozenset(["NA", "N/A", "-", "--", ""])
+
+# DexCheck compresses runs of zeros with a subscript count (e.g., "$0.0₁₂1467" is 0.0 followed by 12 zeros and then 1467)
+SUBSCRIPT_ZERO_PATTERN = re.compile(r"0([₀₁₂₃₄₅₆₇₈₉]+)")
+SUBSCRIPT_DIGITS_TABLE = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+# A cleaned value: an optional sign, the number and an optional magnitude suffix
+NUMBER_PATTERN = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+))([KMBT])?$")
+
+## Scalar API
+def decode_subscript_zeros(value: str) -> str:
+    """
+    A function to expand the subscript zero-run compression, e.g., "0.0₄5678" -> "0.00005678".
+    """
+    return SUBSCRIPT_ZERO_PATTERN.sub(lambda match: "0" * int(match.group(1).translate(SUBSCRIPT_DIGITS_TABLE)), value)
+
+def normalize_number(value: Optional[str], unit: str = "units") -> Optional[float]:
+    """
+    A function to convert a displayed number such as "$1,800", "<$0.1", "44.70%", "3.23B" or "$0.0₁₂1467" to a float expressed in the given unit.
+    None values and placeholders such as "NA" are returned as None.
+    """
+    if value is None or value in MISSING_VALUES:
+        return None
+
+    # Only the values with subscript digits are non-ASCII, so the common case skips the decoding
+    if not value.isascii():
+        value = decode_subscript_zeros(value)
+
+    match = NUMBER_PATTERN.match(value.translate(NOISE_TABLE))
+    if match is None:
+        raise ValueError(f"Could not normalize the value: {value!r}")
+
+    multiplier, divisor = SCALE_TABLE[unit][match.group(2)]
+    return float(match.group(1)) * multiplier / divisor
+
+## Batch API
+def normalize_numbers(values: Union["pd.Series", "np.ndarray", list], unit: str = "units") -> Union["pd.Series", "np.ndarray"]:
+    """
+    A function to normalize a whole pandas Series, NumPy array or list of displayed numbers in one pass.
+    Displayed values repeat a lot (e.g., "$1.2K" or "84"), so every distinct value is parsed once and the results are broadcast back with a vectorized take.
+    None values and values that cannot be parsed become NaN. A Series is returned for a Series input, otherwise a float64 NumPy array.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Encode the values as integer codes over the distinct values (None and NaN get the code -1)
+    codes, uniques = pd.factorize(np.asarray(values, dtype="object"))
+
+    # Parse every distinct value once
+    scales = SCALE_TABLE[unit]
+    normalized_uniques = np.full(len(uniques) + 1, np.nan)
+    for idx, value in enumerate(uniques):
+        if not isinstance(value, str):
+            continue
+        if not value.isascii():
+            value = decode_subscript_zeros(value)
+        match = NUMBER_PATTERN.match(value.translate(NOISE_TABLE))
+        if match is not None:
+            multiplier, divisor = scales[match.group(2)]
+            normalized_uniques[idx] = float(match.group(1)) * multiplier / divisor
+
+    # Broadcast the parsed values back to the original positions (the code -1 picks the trailing NaN)
+    normalized = normalized_uniques[codes]
+
+    if isinstance(values, pd.Series):
+        return pd.Series(normalized, index=values.index, name=values.name)
+    return normalized
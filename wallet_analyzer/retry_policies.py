@@ -1,6 +1,7 @@
 from tenacity import retry_if_exception, RetryCallState
 from zyte_api.aio.errors import RequestError
 from zyte_api.aio.retry import RetryFactory
+from crawl_metrics import metrics, ATTEMPTS_BUCKETS
 
 def is_http_521(exc: BaseException) -> bool:
     return isinstance(exc, RequestError) and (exc.status == 521 or exc.status == 500)
@@ -19,7 +20,34 @@ class CustomRetryFactory(RetryFactory):
 
     def stop(self, retry_state: RetryCallState) -> bool:
         if is_http_521(retry_state.outcome.exception()):
-            return self.temporary_download_error_stop(retry_state)
-        return super().stop(retry_state)
+            should_stop = self.temporary_download_error_stop(retry_state)
+        else:
+            should_stop = super().stop(retry_state)
+        if should_stop:
+            record_final_attempt(retry_state, outcome="gave_up")
+        return should_stop
+
+    def retry(self, retry_state: RetryCallState) -> bool:
+        # Called on the outcome of every attempt, so it sees the successes as well as the retryable errors (the stop condition may still give up on them)
+        should_retry = self.retry_condition(retry_state)
+        if should_retry:
+            metrics.increment("zyte_api_retryable_errors", reason=helper_retry_reason(retry_state.outcome.exception()))
+        else:
+            record_final_attempt(retry_state, outcome="failed" if retry_state.outcome.failed else "success")
+        return should_retry
+
+    def build(self):
+        return super().build().copy(retry=self.retry)
+
+def helper_retry_reason(exc: BaseException) -> str:
+    if isinstance(exc, RequestError):
+        return str(exc.status)
+    return type(exc).__name__
+
+def record_final_attempt(retry_state: RetryCallState, outcome: str):
+    """
+    A function to record the number of attempts a Zyte API request needed before it succeeded, failed or was given up on.
+    """
+    metrics.observe("zyte_api_attempts", retry_state.attempt_number, buckets=ATTEMPTS_BUCKETS, outcome=outcome)
 
 CUSTOM_RETRY_POLICY = CustomRetryFactory().build()
\ No newline at end of file
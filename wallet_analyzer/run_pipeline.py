@@ -0,0 +1,51 @@
+# Import libraries
+import argparse
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+if __name__ == "__main__":
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description="Run the top gainers, top traders and wallet screener stages in a single crawl.")
+    parser.add_argument("--wallet-screeners", default="dex_check,gmgn_ai", help="Comma-separated list of the wallet screeners to run (dex_check, gmgn_ai)")
+    parser.add_argument("--chains", default="solana", help="Comma-separated list of the chains whose top gainers to crawl in parallel (solana, ethereum, base, bsc)")
+    parser.add_argument("--min-24h-sells", default=None, help="Minimum number of sells in the last 24 hours of the top gainers")
+    parser.add_argument("--min-24h-txns", default=None, help="Minimum number of transactions in the last 24 hours of the top gainers")
+    parser.add_argument("--min-24h-vol", default=None, help="Minimum volume in dollars in the last 24 hours of the top gainers")
+    parser.add_argument("--min-liq", default=None, help="Minimum liquidity in dollars of the top gainers")
+    parser.add_argument("--min-market-cap", default=None, help="Minimum market cap in dollars of the top gainers")
+    parser.add_argument("--watch-interval", default=0, help="Poll the top gainers pages again every N seconds and only send the newly appearing assets to the next stages (0 = poll them once)")
+    parser.add_argument("--watch-max-polls", default=0, help="Stop the watch mode after N polls of every chain (0 = until the run is stopped)")
+    parser.add_argument("--trader-scroll-depth", default=0, help="Number of times to scroll the top traders list of every asset within its render, to load the traders beyond the first page")
+    parser.add_argument("--cache-responses", action="store_true", help="Store every Zyte API response in the local response cache, so that the run can be re-parsed later")
+    parser.add_argument("--reparse-only", action="store_true", help="Re-run the parse callbacks over the cached Zyte API responses only, without any request to Zyte")
+    parser.add_argument("--fetch-mode", choices=["api_first", "light_first", "browser"], default=None, help="Read the wallet stats from the JSON endpoints of the sites first (api_first), try a non-browser request first for the wallet pages (light_first) or always render them in the browser (browser). Defaults to WALLET_FETCH_MODE")
+    parser.add_argument("--resume", action="store_true", help="Only re-issue the requests that the previous run did not complete, appending to its feeds")
+    args = parser.parse_args()
+
+    # Run all the stages in one CrawlerProcess (i.e., one reactor) so that the Zyte concurrency slots stay full across the whole run
+    settings = get_project_settings()
+    settings.set("RESUME_CRAWL", args.resume, priority="cmdline")
+    if args.fetch_mode is not None:
+        settings.set("WALLET_FETCH_MODE", args.fetch_mode, priority="cmdline")
+    if args.cache_responses or args.reparse_only:
+        settings.set("HTTPCACHE_ENABLED", True, priority="cmdline")
+    if args.reparse_only:
+        # Serve every cached response whatever its age, drop the requests that were never cached, and bypass the wallet stats cache so that every wallet page is re-parsed
+        settings.set("ZYTE_CACHE_REPARSE_ONLY", True, priority="cmdline")
+        settings.set("HTTPCACHE_IGNORE_MISSING", True, priority="cmdline")
+        settings.set("WALLET_CACHE_ENABLED", False, priority="cmdline")
+    process = CrawlerProcess(settings)
+    process.crawl(
+        "wallet_analyzer_pipeline",
+        wallet_screeners=args.wallet_screeners,
+        chains=args.chains,
+        min_24h_sells=args.min_24h_sells,
+        min_24h_txns=args.min_24h_txns,
+        min_24h_vol=args.min_24h_vol,
+        min_liq=args.min_liq,
+        min_market_cap=args.min_market_cap,
+        trader_scroll_depth=args.trader_scroll_depth,
+        watch_interval=args.watch_interval,
+        watch_max_polls=args.watch_max_polls
+    )
+    process.start()
@@ -0,0 +1,203 @@
+# Import packages
+import datetime
+import os
+import sys
+import time
+import zlib
+from typing import Iterable, Optional
+
+# pyarrow is imported by the functions that read or write the store, so that importing this module stays cheap (see the Parquet export)
+
+## Helper functions
+def helper_bucket(entity_key: str, num_buckets: int) -> int:
+    # CRC32 instead of hash(), which is salted per process, so that a key stays in the same bucket across runs
+    return zlib.crc32(entity_key.encode("utf-8")) % num_buckets
+
+def helper_snapshot_date(snapshot_at: datetime.datetime) -> str:
+    return snapshot_at.astimezone(datetime.timezone.utc).strftime("%Y-%m-%d")
+
+def helper_write_table_atomically(table, path: str, row_group_size: Optional[int] = None):
+    """
+    A function to write a Parquet file under a temporary name and rename it, so that the readers never see a partial file.
+    """
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, f"{path}.tmp", compression="zstd", row_group_size=row_group_size)
+    os.replace(f"{path}.tmp", path)
+
+def helper_concat_tables(tables: list):
+    # The columns that were added to an entity later (e.g., a new item field) are null in its older files
+    import pyarrow as pa
+
+    return pa.concat_tables(tables, promote_options="default")
+
+def helper_keep_latest_per_key(table):
+    """
+    A function to keep the most recent snapshot of every key of a table, sorted by key.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    table = table.sort_by([("entity_key", "ascending"), ("snapshot_at", "descending")])
+    keys = table.column("entity_key").to_numpy(zero_copy_only=False)
+    is_first_of_key = np.ones(len(keys), dtype=bool)
+    is_first_of_key[1:] = keys[1:] != keys[:-1]
+    return table.filter(pa.array(is_first_of_key))
+
+def helper_drop_repeated_snapshots(table):
+    """
+    A function to drop the repeated snapshots of a table sorted by key and time (i.e., the same key at the same time, e.g., a run that was resumed).
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    if table.num_rows <= 1:
+        return table
+    keys = table.column("entity_key").to_numpy(zero_copy_only=False)
+    snapshot_times = table.column("snapshot_at").to_numpy(zero_copy_only=False)
+    is_new_snapshot = np.ones(len(keys), dtype=bool)
+    is_new_snapshot[1:] = (keys[1:] != keys[:-1]) | (snapshot_times[1:] != snapshot_times[:-1])
+    return table.filter(pa.array(is_new_snapshot))
+
+class TimeSeriesStore:
+    """
+    An append-only store of the snapshots of the assets and wallets scraped by every run, as typed Parquet columns (see TimeSeriesStorePipeline).
+    Every entity (e.g., assets or dex_check_wallets) is partitioned by the UTC date of its snapshots and by a hash bucket of its key:
+
+        <root_dir>/<entity>/history/date=YYYY-MM-DD/bucket=NN/part-<run>-<seq>.parquet   every snapshot, sorted by key and time within a file
+        <root_dir>/<entity>/latest/bucket=NN.parquet                                        the most recent snapshot of every key
+
+    The latest files are updated with every append, so "latest per key" reads them only, whatever the length of the history.
+    "Range for key" only reads the history files of the dates in the range and of the bucket of the key, and the row group statistics of the key column
+    let Parquet skip the row groups of the other keys. Every run appends new part files, which compact() merges into one sorted file per date and bucket.
+    """
+    def __init__(self, root_dir: str, num_buckets: int = 16):
+        self.root_dir = root_dir
+        self.num_buckets = num_buckets
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self.num_parts = 0
+
+    def helper_history_dir(self, entity: str, date: str, bucket: int) -> str:
+        return os.path.join(self.root_dir, entity, "history", f"date={date}", f"bucket={bucket:02d}")
+
+    def helper_latest_path(self, entity: str, bucket: int) -> str:
+        return os.path.join(self.root_dir, entity, "latest", f"bucket={bucket:02d}.parquet")
+
+    def helper_dates(self, entity: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> list:
+        # The date partitions of an entity in a date range (the ISO dates sort like strings)
+        history_dir = os.path.join(self.root_dir, entity, "history")
+        if not os.path.isdir(history_dir):
+            return []
+        dates = sorted(name[len("date="):] for name in os.listdir(history_dir) if name.startswith("date="))
+        return [date for date in dates if (start_date is None or date >= start_date) and (end_date is None or date <= end_date)]
+
+    ## Writing
+    def append(self, entity: str, table):
+        """
+        A function to append snapshots to an entity. The table needs an entity_key (string) column and a snapshot_at (timestamp) column.
+        The snapshots are written to one new part file per date and bucket, and merged into the latest file of every bucket they touch.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if table.num_rows == 0:
+            return
+        buckets = pa.array([helper_bucket(entity_key=entity_key, num_buckets=self.num_buckets) for entity_key in table.column("entity_key").to_pylist()], type=pa.int16())
+        dates = pc.strftime(table.column("snapshot_at"), format="%Y-%m-%d")
+        for bucket in pc.unique(buckets).to_pylist():
+            bucket_table = table.filter(pc.equal(buckets, bucket))
+            bucket_dates = dates.filter(pc.equal(buckets, bucket))
+            for date in pc.unique(bucket_dates).to_pylist():
+                part = bucket_table.filter(pc.equal(bucket_dates, date)).sort_by([("entity_key", "ascending"), ("snapshot_at", "ascending")])
+                self.num_parts += 1
+                helper_write_table_atomically(part, os.path.join(self.helper_history_dir(entity=entity, date=date, bucket=bucket), f"part-{self.run_id}-{self.num_parts:05d}.parquet"))
+            self.helper_update_latest(entity=entity, bucket=bucket, table=bucket_table)
+
+    def helper_update_latest(self, entity: str, bucket: int, table):
+        import pyarrow.parquet as pq
+
+        path = self.helper_latest_path(entity=entity, bucket=bucket)
+        if os.path.exists(path):
+            table = helper_concat_tables([pq.read_table(path), table])
+        helper_write_table_atomically(helper_keep_latest_per_key(table), path)
+
+    def compact(self, entity: str, before_date: Optional[str] = None, max_days: Optional[int] = None) -> int:
+        """
+        A function to merge the part files of every date and bucket of an entity into one file sorted by key and time, dropping the repeated snapshots
+        (i.e., the same key at the same time). Only the dates before before_date (e.g., today, which is still being written) are compacted, and only the last max_days of them.
+        Returns the number of partitions that were compacted.
+        """
+        import pyarrow.parquet as pq
+
+        dates = [date for date in self.helper_dates(entity=entity) if before_date is None or date < before_date]
+        num_compacted = 0
+        for date in (dates[-max_days:] if max_days else dates):
+            date_dir = os.path.join(self.root_dir, entity, "history", f"date={date}")
+            for bucket_name in sorted(os.listdir(date_dir)):
+                bucket_dir = os.path.join(date_dir, bucket_name)
+                part_names = sorted(name for name in os.listdir(bucket_dir) if name.endswith(".parquet"))
+                if len(part_names) <= 1:
+                    continue
+                table = helper_concat_tables([pq.read_table(os.path.join(bucket_dir, name)) for name in part_names])
+                table = table.sort_by([("entity_key", "ascending"), ("snapshot_at", "ascending")])
+                table = helper_drop_repeated_snapshots(table)
+                helper_write_table_atomically(table, os.path.join(bucket_dir, f"compacted-{self.run_id}.parquet"), row_group_size=8192)
+                for name in part_names:
+                    os.remove(os.path.join(bucket_dir, name))
+                num_compacted += 1
+        return num_compacted
+
+    ## Reading
+    def latest(self, entity: str, keys: Optional[Iterable[str]] = None, columns: Optional[list] = None):
+        """
+        A function to return the most recent snapshot of every key of an entity (or of the given keys only), as a pyarrow table.
+        """
+        import pyarrow.parquet as pq
+
+        if keys is not None:
+            keys = list(keys)
+            buckets = sorted({helper_bucket(entity_key=entity_key, num_buckets=self.num_buckets) for entity_key in keys})
+        else:
+            buckets = range(self.num_buckets)
+        tables = []
+        for bucket in buckets:
+            path = self.helper_latest_path(entity=entity, bucket=bucket)
+            if os.path.exists(path):
+                tables.append(pq.read_table(path, columns=columns, filters=None if keys is None else [("entity_key", "in", keys)]))
+        return helper_concat_tables(tables) if tables else None
+
+    def range(self, entity: str, entity_key: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None, columns: Optional[list] = None):
+        """
+        A function to return the snapshots of a key between two times (both included, None = unbounded), sorted by time, as a pyarrow table.
+        """
+        import pyarrow.parquet as pq
+
+        bucket = helper_bucket(entity_key=entity_key, num_buckets=self.num_buckets)
+        filters = [("entity_key", "=", entity_key)]
+        if start is not None:
+            filters.append(("snapshot_at", ">=", start))
+        if end is not None:
+            filters.append(("snapshot_at", "<=", end))
+
+        tables = []
+        for date in self.helper_dates(entity=entity, start_date=None if start is None else helper_snapshot_date(start), end_date=None if end is None else helper_snapshot_date(end)):
+            bucket_dir = self.helper_history_dir(entity=entity, date=date, bucket=bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for name in sorted(os.listdir(bucket_dir)):
+                if name.endswith(".parquet"):
+                    tables.append(pq.read_table(os.path.join(bucket_dir, name), columns=None if columns is None else ["entity_key", "snapshot_at", *columns], filters=filters))
+        return helper_drop_repeated_snapshots(helper_concat_tables(tables).sort_by("snapshot_at")) if tables else None
+
+if __name__ == "__main__":
+    # Usage: python timeseries_store.py latest <entity> [key] | range <entity> <key> [start date] [end date] | compact <entity>
+    store = TimeSeriesStore(root_dir=os.getenv("TIMESERIES_STORE_DIR", "timeseries"))
+    command, entity = sys.argv[1], sys.argv[2]
+    if command == "latest":
+        print(store.latest(entity=entity, keys=sys.argv[3:] or None))
+    elif command == "range":
+        start, end = [datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc) if value else None for value in (sys.argv[4:6] + [None, None])[:2]]
+        print(store.range(entity=entity, entity_key=sys.argv[3], start=start, end=end))
+    elif command == "compact":
+        print(f"Compacted {store.compact(entity=entity, before_date=helper_snapshot_date(datetime.datetime.now(datetime.timezone.utc)))} partitions of {entity}")
@@ -0,0 +1,95 @@
+# Import packages
+from typing import Iterator, Mapping, Optional
+from chains import DEFAULT_CHAIN
+from feeds import iter_feed_items, write_feed_items
+
+class WalletAggregationIndex:
+    """
+    An in-memory index from every wallet (keyed by its chain and address) to its positions in the assets it is a top trader of.
+    The top traders items are added as they stream in, and the aggregates of a wallet (e.g., its total PnL across assets) can be read at any time.
+    Only the traders that both bought and sold an asset are indexed, as they are the only ones that are screened.
+    """
+    def __init__(self):
+        self.positions = {} # (chain, wallet_address) -> {asset_url: (trader_pnl, trader_bought_usd, trader_sold_usd)}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, wallet_key: tuple) -> bool:
+        return wallet_key in self.positions
+
+    def add_trader(self, trader: Mapping) -> Optional[tuple]:
+        """
+        A function to add a top traders item (or a row of the ranked top traders) to the index. Returns the (chain, wallet_address) key of the wallet, or None if the trader was not indexed.
+        A position that is added twice (e.g., the same asset in a resumed crawl) replaces the previous one, so it is only counted once.
+        """
+        wallet_address = trader.get("wallet_address")
+        if helper_is_missing(wallet_address) or helper_is_missing(trader.get("trader_bought_usd")) or helper_is_missing(trader.get("trader_sold_usd")):
+            return None
+
+        wallet_key = (trader.get("chain") or DEFAULT_CHAIN, wallet_address)
+        trader_pnl = 0 if helper_is_missing(trader.get("trader_pnl")) else float(trader["trader_pnl"])
+        self.positions.setdefault(wallet_key, {})[trader["asset_url"]] = (trader_pnl, float(trader["trader_bought_usd"]), float(trader["trader_sold_usd"]))
+        return wallet_key
+
+    def get_aggregate(self, chain: str, wallet_address: str) -> dict:
+        """
+        A function to return the consolidated record of a wallet: its number of assets and winning assets, its total PnL, bought and sold amounts, and its mean percentage PnL.
+        """
+        wallet_positions = self.positions[(chain, wallet_address)].values()
+        pct_pnls = [trader_pnl / trader_bought_usd * 100 for trader_pnl, trader_bought_usd, _ in wallet_positions if trader_bought_usd > 0]
+        return {
+            "chain": chain,
+            "wallet_address": wallet_address,
+            "num_assets": len(wallet_positions),
+            "num_winning_assets": sum(1 for trader_pnl, _, _ in wallet_positions if trader_pnl > 0),
+            "tot_pnl": round(sum(trader_pnl for trader_pnl, _, _ in wallet_positions), 2),
+            "tot_bought_usd": round(sum(trader_bought_usd for _, trader_bought_usd, _ in wallet_positions), 2),
+            "tot_sold_usd": round(sum(trader_sold_usd for _, _, trader_sold_usd in wallet_positions), 2),
+            "mean_pct_pnl": round(sum(pct_pnls) / len(pct_pnls), 2) if pct_pnls else None
+        }
+
+    def iter_aggregates(self) -> Iterator[dict]:
+        """
+        A function to yield the consolidated record of every wallet, in screening order (see helper_screening_sort_key).
+        """
+        aggregates = [self.get_aggregate(chain=chain, wallet_address=wallet_address) for chain, wallet_address in self.positions]
+        yield from sorted(aggregates, key=helper_screening_sort_key)
+
+## Helper functions
+def helper_is_missing(value) -> bool:
+    # The rows of a pandas data frame hold NaN instead of None
+    return value is None or value != value
+
+def helper_screening_sort_key(aggregate: dict) -> tuple:
+    """
+    A function to order the wallets to screen: the wallets that made a profit on the most assets first, then the wallets with the highest total PnL.
+    """
+    return (-aggregate["num_winning_assets"], -aggregate["tot_pnl"], aggregate["wallet_address"])
+
+def helper_screening_priority(aggregate: dict) -> int:
+    """
+    A function to turn the aggregates of a wallet into a Scrapy request priority, for the wallets that are scheduled before all their positions are known.
+    """
+    return aggregate["num_winning_assets"]
+
+## Building and writing the index
+def build_wallet_index(traders: Optional[Iterator[Mapping]] = None, traders_feed: str = "dex_screener_top_traders") -> WalletAggregationIndex:
+    """
+    A function to build the index from top traders rows, or by streaming the top traders feed if no rows are given.
+    """
+    index = WalletAggregationIndex()
+    for trader in (iter_feed_items(feed_name=traders_feed) if traders is None else traders):
+        index.add_trader(trader)
+    return index
+
+def write_wallet_aggregates(index: WalletAggregationIndex, feed_name: str = "wallet_aggregates") -> str:
+    """
+    A function to write one consolidated record per wallet to a feed in the configured feed format. Returns the path of the feed.
+    """
+    return write_feed_items(feed_name=feed_name, items=index.iter_aggregates())
+
+if __name__ == "__main__":
+    # Rebuild the wallet aggregates from the top traders feed of the last crawl
+    wallet_index = build_wallet_index()
+    print(f"Wrote the aggregates of {len(wallet_index):,} wallets to {write_wallet_aggregates(index=wallet_index)}")
@@ -0,0 +1,99 @@
+# Define here the extensions of the project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import json
+import os
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet import task
+
+from crawl_metrics import metrics, render_prometheus
+
+
+class CrawlMetricsExtension:
+    # Collects the Zyte API latency of every request and the items scraped per
+    # item class, and dumps them, together with the histograms recorded by the
+    # callbacks, the retry policy and the pipelines in the shared metrics
+    # registry, as a JSON or Prometheus text snapshot when the spider closes
+    # (and every METRICS_DUMP_INTERVAL seconds while it runs, if set).
+
+    def __init__(self, stats, output_dir, output_format, dump_interval):
+        self.stats = stats
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.dump_interval = dump_interval
+        self.start_time = None
+        self.dump_task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured
+        output_format = crawler.settings.get("METRICS_FORMAT")
+        if output_format not in ("json", "prometheus"):
+            raise NotConfigured(f"Unsupported METRICS_FORMAT: {output_format} (expected json or prometheus)")
+
+        ext = cls(
+            stats=crawler.stats,
+            output_dir=crawler.settings.get("METRICS_DIR"),
+            output_format=output_format,
+            dump_interval=crawler.settings.getfloat("METRICS_DUMP_INTERVAL")
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        return ext
+
+    def spider_opened(self, spider):
+        metrics.reset()
+        self.start_time = time.monotonic()
+        if self.dump_interval > 0:
+            self.dump_task = task.LoopingCall(self.dump, spider)
+            self.dump_task.start(self.dump_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.dump_task is not None and self.dump_task.running:
+            self.dump_task.stop()
+        self.dump(spider)
+
+    def response_received(self, response, request, spider):
+        # Only the responses that came from the network carry a download latency (i.e., the wallet stats cache hits are skipped)
+        if "download_latency" in request.meta:
+            metrics.observe("zyte_request_latency_seconds", request.meta["download_latency"], domain=urlparse_cached(request).hostname)
+
+    def item_scraped(self, item, response, spider):
+        metrics.increment("items_scraped", item_class=type(item).__name__)
+
+    def build_snapshot(self, spider):
+        """
+        A function to combine the metrics registry, the items per second and the Scrapy stats into one snapshot.
+        """
+        snapshot = metrics.snapshot()
+        elapsed_seconds = max(time.monotonic() - self.start_time, 1e-9)
+        snapshot["gauges"] = [{"name": "elapsed_seconds", "labels": {"spider": spider.name}, "value": round(elapsed_seconds, 3)}]
+        for counter in snapshot["counters"]:
+            if counter["name"] == "items_scraped":
+                snapshot["gauges"].append({"name": "items_per_second", "labels": {"spider": spider.name, **counter["labels"]}, "value": round(counter["value"] / elapsed_seconds, 3)})
+        snapshot["scrapy_stats"] = {k: v for k, v in self.stats.get_stats().items() if isinstance(v, (int, float, str))}
+        return snapshot
+
+    def dump(self, spider):
+        snapshot = self.build_snapshot(spider)
+        extension = "json" if self.output_format == "json" else "prom"
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{spider.name}_metrics.{extension}")
+
+        # Write to a temporary file first, so that a reader never sees a partially written snapshot
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            if self.output_format == "json":
+                json.dump(snapshot, f, indent=2)
+            else:
+                f.write(render_prometheus(snapshot))
+        os.replace(f"{path}.tmp", path)
+        spider.logger.info(f"Dumped the crawl metrics to {path}")
@@ -0,0 +1,206 @@
+# Define here the HTTP cache storage of the project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-storage-backends
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from base64 import b64decode, b64encode
+
+from scrapy.http import Headers, JsonResponse, TextResponse, XmlResponse
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from scrapy_zyte_api.responses import ZyteAPIJsonResponse, ZyteAPIResponse, ZyteAPITextResponse, ZyteAPIXmlResponse
+
+
+class ZyteResponseCacheStorage:
+    # Stores the Zyte API responses (the whole raw_api_response payload, i.e., the
+    # browserHtml and the logs of the actions) so that the parse callbacks can be
+    # re-run over them without paying for the renders again.
+    #
+    # The payloads are gzipped and content-addressed: every payload is written once
+    # under the SHA-256 hash of its content, and a SQLite index maps the request
+    # fingerprints (computed by ScrapyZyteAPIRequestFingerprinter, so the Zyte API
+    # parameters such as the actions are part of the key) to the payloads. The
+    # index is shared by all the spiders, so a page rendered by the pipeline spider
+    # can be re-parsed by the stage spider and the other way around.
+    #
+    # A response expires after the TTL of the spider that reads it (ZYTE_CACHE_TTLS,
+    # falling back to HTTPCACHE_EXPIRATION_SECS, 0 = never), and the least recently
+    # used responses are evicted when the payloads exceed ZYTE_CACHE_MAX_BYTES.
+    # In reparse-only mode (ZYTE_CACHE_REPARSE_ONLY), the responses never expire;
+    # set HTTPCACHE_IGNORE_MISSING as well so that the cache misses are dropped
+    # instead of being sent to Zyte (run_pipeline.py --reparse-only sets both).
+
+    def __init__(self, settings):
+        self.cache_dir = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.default_ttl = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.spider_ttls = settings.getdict("ZYTE_CACHE_TTLS")
+        self.max_bytes = settings.getint("ZYTE_CACHE_MAX_BYTES")
+        self.compression_level = settings.getint("ZYTE_CACHE_COMPRESSION_LEVEL", 6)
+        self.reparse_only = settings.getbool("ZYTE_CACHE_REPARSE_ONLY")
+        self.ignore_missing = settings.getbool("HTTPCACHE_IGNORE_MISSING")
+        self.conn = None
+        self.tot_bytes = 0
+
+    def open_spider(self, spider):
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        self.ttl = 0 if self.reparse_only else self.spider_ttls.get(spider.name, self.default_ttl)
+        if self.reparse_only and not self.ignore_missing:
+            spider.logger.warning("ZYTE_CACHE_REPARSE_ONLY is set without HTTPCACHE_IGNORE_MISSING, so the requests that are not cached will still be sent to Zyte")
+
+        self.conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"))
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                fingerprint TEXT PRIMARY KEY,
+                payload_hash TEXT NOT NULL,
+                spider TEXT NOT NULL,
+                url TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS payloads (payload_hash TEXT PRIMARY KEY, num_bytes INTEGER NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_payload_hash ON responses (payload_hash)")
+        self.conn.commit()
+        self.tot_bytes = self.conn.execute("SELECT COALESCE(SUM(num_bytes), 0) FROM payloads").fetchone()[0]
+        spider.logger.info(f"Using the Zyte response cache in {self.cache_dir} ({self.tot_bytes / pow(2, 20):.1f} MB, TTL {self.ttl or 'none'}, reparse only: {self.reparse_only})")
+
+    def close_spider(self, spider):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def retrieve_response(self, spider, request):
+        fingerprint = self._fingerprinter.fingerprint(request).hex()
+        row = self.conn.execute("SELECT payload_hash, stored_at FROM responses WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        if row is None:
+            return None
+        payload_hash, stored_at = row
+        if 0 < self.ttl < time.time() - stored_at:
+            return None
+
+        # A payload that was deleted from the disk is a cache miss
+        try:
+            with gzip.open(self.helper_payload_path(payload_hash), "rb") as f:
+                payload = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE fingerprint = ?", (time.time(), fingerprint))
+        self.conn.commit()
+        request.meta["cache_timestamp"] = stored_at
+        return helper_build_response(payload=payload, request=request)
+
+    def store_response(self, spider, request, response):
+        payload = helper_build_payload(response=response)
+        payload_bytes = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        payload_hash = hashlib.sha256(payload_bytes).hexdigest()
+
+        # Only write the payloads that are not stored yet (e.g., the same page rendered for two requests is stored once)
+        if self.conn.execute("SELECT 1 FROM payloads WHERE payload_hash = ?", (payload_hash,)).fetchone() is None:
+            path = self.helper_payload_path(payload_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed_bytes = gzip.compress(payload_bytes, compresslevel=self.compression_level)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(compressed_bytes)
+            os.replace(f"{path}.tmp", path)
+            self.conn.execute("INSERT INTO payloads (payload_hash, num_bytes) VALUES (?, ?)", (payload_hash, len(compressed_bytes)))
+            self.tot_bytes += len(compressed_bytes)
+
+        # Point the fingerprint of the request to the payload, and delete the payload it pointed to before if nothing else uses it
+        fingerprint = self._fingerprinter.fingerprint(request).hex()
+        now = time.time()
+        previous_row = self.conn.execute("SELECT payload_hash FROM responses WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (fingerprint, payload_hash, spider, url, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (fingerprint, payload_hash, spider.name, request.url, now, now)
+        )
+        if previous_row is not None and previous_row[0] != payload_hash:
+            self.delete_unreferenced_payload(payload_hash=previous_row[0])
+        self.evict_least_recently_used()
+        self.conn.commit()
+
+    def evict_least_recently_used(self):
+        """
+        A function to delete the least recently used responses until the payloads fit in ZYTE_CACHE_MAX_BYTES (0 = no limit).
+        """
+        if self.max_bytes <= 0 or self.tot_bytes <= self.max_bytes:
+            return
+        while self.tot_bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT fingerprint, payload_hash FROM responses ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                break
+            for fingerprint, payload_hash in rows:
+                self.conn.execute("DELETE FROM responses WHERE fingerprint = ?", (fingerprint,))
+                self.delete_unreferenced_payload(payload_hash=payload_hash)
+                if self.tot_bytes <= self.max_bytes:
+                    break
+
+    def delete_unreferenced_payload(self, payload_hash):
+        # A payload is only deleted once no response points to it anymore
+        if self.conn.execute("SELECT 1 FROM responses WHERE payload_hash = ? LIMIT 1", (payload_hash,)).fetchone() is not None:
+            return
+        row = self.conn.execute("SELECT num_bytes FROM payloads WHERE payload_hash = ?", (payload_hash,)).fetchone()
+        self.conn.execute("DELETE FROM payloads WHERE payload_hash = ?", (payload_hash,))
+        if row is not None:
+            self.tot_bytes -= row[0]
+        try:
+            os.remove(self.helper_payload_path(payload_hash))
+        except FileNotFoundError:
+            pass
+
+    def helper_payload_path(self, payload_hash):
+        return os.path.join(self.cache_dir, "payloads", payload_hash[:2], f"{payload_hash}.json.gz")
+
+
+def helper_build_payload(response):
+    """
+    A function to serialize a response. The Zyte API responses are stored as their raw API payload, which already holds the body (e.g., browserHtml),
+    and the other responses as their URL, status, headers and base64-encoded body.
+    """
+    raw_api_response = getattr(response, "raw_api_response", None)
+    if raw_api_response is not None:
+        return {"raw_api_response": raw_api_response}
+    return {
+        "url": response.url,
+        "status": response.status,
+        "headers": {k.decode("latin-1"): [v.decode("latin-1") for v in vs] for k, vs in response.headers.items()},
+        "body": b64encode(response.body).decode("ascii")
+    }
+
+
+def helper_build_response(payload, request):
+    """
+    A function to rebuild a response from its payload, with the same raw_api_response as the original Zyte API response.
+    """
+    if "raw_api_response" in payload:
+        return helper_build_zyte_api_response(api_response=payload["raw_api_response"], request=request)
+    headers = Headers(payload["headers"])
+    body = b64decode(payload["body"])
+    response_class = responsetypes.from_args(headers=headers, url=payload["url"], body=body)
+    return response_class(url=payload["url"], status=payload["status"], headers=headers, body=body, request=request)
+
+
+def helper_build_zyte_api_response(api_response, request):
+    """
+    A function to rebuild a Zyte API response with the public constructors of scrapy-zyte-api. The browser renders are text pages, and so are the raw HTTP
+    bodies whose headers and content say so (e.g., the light requests), with the JSON and XML bodies rebuilt as the JSON and XML responses of scrapy-zyte-api.
+    The other bodies are binary responses.
+    """
+    if api_response.get("browserHtml"):
+        return ZyteAPITextResponse.from_api_response(api_response, request=request)
+    if api_response.get("httpResponseHeaders") and api_response.get("httpResponseBody"):
+        headers = Headers({header["name"]: header["value"] for header in api_response["httpResponseHeaders"]})
+        response_class = responsetypes.from_args(headers=headers, url=api_response["url"], body=b64decode(api_response["httpResponseBody"]))
+        if issubclass(response_class, TextResponse):
+            zyte_response_class = {JsonResponse: ZyteAPIJsonResponse, XmlResponse: ZyteAPIXmlResponse}.get(response_class, ZyteAPITextResponse)
+            return zyte_response_class.from_api_response(api_response, request=request)
+    return ZyteAPIResponse.from_api_response(api_response, request=request)
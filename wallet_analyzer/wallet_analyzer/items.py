@@ -2,38 +2,111 @@
 #
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
+#
+# The dtype of every field is used to build the typed schema of the Parquet export (see ParquetExportPipeline)
 
 import scrapy
 
 
 class DexScreenerTopGainers(scrapy.Item):
-    asset_name = scrapy.Field()
-    asset_name_text = scrapy.Field()
-    asset_url = scrapy.Field()
-    asset_gain_rank = scrapy.Field()
-    asset_network = scrapy.Field()
-    dex = scrapy.Field()
-    asset_price = scrapy.Field()
-    asset_age = scrapy.Field()
-    asset_24_hr_txns = scrapy.Field()
-    asset_24_hr_volume_in_mil = scrapy.Field()
-    num_makers = scrapy.Field()
-    asset_price_change_l5m = scrapy.Field()
-    asset_price_change_l1h = scrapy.Field()
-    asset_price_change_l6h = scrapy.Field()
-    asset_price_change_l24h = scrapy.Field()
-    asset_liquidity_in_mil = scrapy.Field()
-    asset_market_cap_in_mil = scrapy.Field()
+    chain = scrapy.Field(dtype="string") # The DexScreener chain ID, e.g., solana, ethereum, base or bsc
+    asset_name = scrapy.Field(dtype="string")
+    asset_name_text = scrapy.Field(dtype="string")
+    asset_url = scrapy.Field(dtype="string")
+    asset_gain_rank_raw = scrapy.Field(dtype="string")
+    asset_gain_rank = scrapy.Field(dtype="int64")
+    asset_network = scrapy.Field(dtype="string")
+    dex = scrapy.Field(dtype="string")
+    asset_price_raw = scrapy.Field(dtype="string")
+    asset_price = scrapy.Field(dtype="float64")
+    asset_age = scrapy.Field(dtype="string")
+    asset_24_hr_txns_raw = scrapy.Field(dtype="string")
+    asset_24_hr_txns = scrapy.Field(dtype="int64")
+    asset_24_hr_volume_in_mil_raw = scrapy.Field(dtype="string")
+    asset_24_hr_volume_in_mil = scrapy.Field(dtype="float64")
+    num_makers_raw = scrapy.Field(dtype="string")
+    num_makers = scrapy.Field(dtype="int64")
+    asset_price_change_l5m_raw = scrapy.Field(dtype="string")
+    asset_price_change_l1h_raw = scrapy.Field(dtype="string")
+    asset_price_change_l6h_raw = scrapy.Field(dtype="string")
+    asset_price_change_l24h_raw = scrapy.Field(dtype="string")
+    asset_price_change_l5m = scrapy.Field(dtype="float64")
+    asset_price_change_l1h = scrapy.Field(dtype="float64")
+    asset_price_change_l6h = scrapy.Field(dtype="float64")
+    asset_price_change_l24h = scrapy.Field(dtype="float64")
+    asset_liquidity_in_mil_raw = scrapy.Field(dtype="string")
+    asset_liquidity_in_mil = scrapy.Field(dtype="float64")
+    asset_market_cap_in_mil_raw = scrapy.Field(dtype="string")
+    asset_market_cap_in_mil = scrapy.Field(dtype="float64")
+
+class DexScreenerTopGainersDelta(scrapy.Item):
+    # A change of the top gainers list between two polls of the watch mode (see DexScreenerTopGainersSpider)
+    chain = scrapy.Field(dtype="string")
+    asset_name = scrapy.Field(dtype="string")
+    asset_url = scrapy.Field(dtype="string")
+    change_type = scrapy.Field(dtype="string") # new, dropped, rank_change or price_change
+    previous_gain_rank = scrapy.Field(dtype="int64")
+    asset_gain_rank = scrapy.Field(dtype="int64")
+    previous_price = scrapy.Field(dtype="float64")
+    asset_price = scrapy.Field(dtype="float64")
+    price_change_pct = scrapy.Field(dtype="float64") # The change of the price since the previous poll
+    poll_number = scrapy.Field(dtype="int64")
+    polled_at = scrapy.Field(dtype="float64")
 
 class DexScreenerTopTraders(scrapy.Item):
-    asset_name = scrapy.Field()
-    asset_url = scrapy.Field()
-    trader_bought_usd = scrapy.Field()
-    trader_bought_crypto = scrapy.Field()
-    trader_buy_txns = scrapy.Field()
-    trader_sold_usd = scrapy.Field()
-    trader_sold_crypto = scrapy.Field()
-    trader_sell_txns = scrapy.Field()
-    trader_pnl = scrapy.Field()
-    sol_scan_url = scrapy.Field()
-    wallet_address = scrapy.Field()
\ No newline at end of file
+    chain = scrapy.Field(dtype="string") # The DexScreener chain ID, e.g., solana, ethereum, base or bsc
+    asset_name = scrapy.Field(dtype="string")
+    asset_url = scrapy.Field(dtype="string")
+    trader_bought_usd_raw = scrapy.Field(dtype="string")
+    trader_bought_usd = scrapy.Field(dtype="float64")
+    trader_bought_crypto_raw = scrapy.Field(dtype="string")
+    trader_bought_crypto = scrapy.Field(dtype="float64")
+    trader_buy_txns_raw = scrapy.Field(dtype="string")
+    trader_buy_txns = scrapy.Field(dtype="int64")
+    trader_sold_usd_raw = scrapy.Field(dtype="string")
+    trader_sold_usd = scrapy.Field(dtype="float64")
+    trader_sold_crypto_raw = scrapy.Field(dtype="string")
+    trader_sold_crypto = scrapy.Field(dtype="float64")
+    trader_sell_txns_raw = scrapy.Field(dtype="string")
+    trader_sell_txns = scrapy.Field(dtype="int64")
+    trader_pnl_raw = scrapy.Field(dtype="string")
+    trader_pnl = scrapy.Field(dtype="float64")
+    sol_scan_url = scrapy.Field(dtype="string") # The block explorer URL of the trader on any chain (the name is kept for the existing feeds)
+    wallet_address = scrapy.Field(dtype="string")
+
+class DexCheckWalletScreener(scrapy.Item):
+    chain = scrapy.Field(dtype="string") # The DexScreener chain ID, e.g., solana, ethereum, base or bsc
+    wallet_address = scrapy.Field(dtype="string")
+    tot_gross_profit_raw = scrapy.Field(dtype="string")
+    tot_gross_profit = scrapy.Field(dtype="float64")
+    realized_gross_profit_raw = scrapy.Field(dtype="string")
+    realized_gross_profit = scrapy.Field(dtype="float64")
+    unrealized_gross_profit_raw = scrapy.Field(dtype="string")
+    unrealized_gross_profit = scrapy.Field(dtype="float64")
+    tot_roi_raw = scrapy.Field(dtype="string")
+    tot_roi = scrapy.Field(dtype="float64")
+    realized_roi_raw = scrapy.Field(dtype="string")
+    realized_roi = scrapy.Field(dtype="float64")
+    unrealized_roi_raw = scrapy.Field(dtype="string")
+    unrealized_roi = scrapy.Field(dtype="float64")
+    win_rate_raw = scrapy.Field(dtype="string")
+    win_rate = scrapy.Field(dtype="float64")
+    num_wins_raw = scrapy.Field(dtype="string")
+    num_wins = scrapy.Field(dtype="int64")
+    num_losses_raw = scrapy.Field(dtype="string")
+    num_losses = scrapy.Field(dtype="int64")
+    trading_volume_raw = scrapy.Field(dtype="string")
+    trading_volume = scrapy.Field(dtype="float64")
+    num_trades_raw = scrapy.Field(dtype="string")
+    num_trades = scrapy.Field(dtype="int64")
+    avg_trade_size_raw = scrapy.Field(dtype="string")
+    avg_trade_size = scrapy.Field(dtype="float64")
+    scraped_at = scrapy.Field(dtype="float64") # The Unix timestamp of the screening (kept by the cached rows, so it is the time the stats were actually scraped)
+
+class GmgnAiWalletScreener(scrapy.Item):
+    chain = scrapy.Field(dtype="string") # The DexScreener chain ID, e.g., solana, ethereum, base or bsc
+    wallet_address = scrapy.Field(dtype="string")
+    tot_gross_profit = scrapy.Field(dtype="string")
+    tot_roi = scrapy.Field(dtype="string")
+    win_rate = scrapy.Field(dtype="string")
+    scraped_at = scrapy.Field(dtype="float64") # The Unix timestamp of the screening (kept by the cached rows, so it is the time the stats were actually scraped)
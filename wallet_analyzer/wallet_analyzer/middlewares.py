@@ -3,11 +3,30 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import math
+import time
+from collections import deque
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Response
+from zyte_api.aio.errors import RequestError
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from wallet_analyzer.items import DexCheckWalletScreener, GmgnAiWalletScreener
+from wallet_cache import WalletStatsCache
+from chains import build_wallet_key
+from crawl_metrics import metrics
+
+# The wallet item that each wallet screening source yields
+WALLET_SOURCE_ITEMS = {
+    "dex_check": DexCheckWalletScreener,
+    "gmgn_ai": GmgnAiWalletScreener
+}
+WALLET_ITEM_SOURCES = {v: k for k, v in WALLET_SOURCE_ITEMS.items()}
+
 
 class WalletAnalyzerSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -101,3 +120,383 @@ class WalletAnalyzerDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class WalletStatsCacheDownloaderMiddleware:
+    # Serves the wallet screening requests of wallets that have been screened
+    # recently from the local wallet stats cache, without sending the request
+    # to Zyte. The spider emits the cached row from response.meta["wallet_cache_row"].
+    # The batched requests of the JSON endpoints get the cached rows of their
+    # fresh wallets in response.meta["wallet_cache_rows"], and are only sent if
+    # some of their wallets are not fresh.
+
+    def __init__(self, cache, stats):
+        self.cache = cache
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("WALLET_CACHE_ENABLED"):
+            raise NotConfigured
+        cache = WalletStatsCache(
+            path=crawler.settings.get("WALLET_CACHE_PATH"),
+            ttl=crawler.settings.getint("WALLET_CACHE_TTL")
+        )
+        s = cls(cache=cache, stats=crawler.stats)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_request(self, request, spider):
+        # Only the wallet screening requests carry a wallet source
+        wallet_source = request.meta.get("wallet_source")
+        if wallet_source is None:
+            return None
+
+        if "wallet_batch" in request.meta:
+            cached_rows = {}
+            for wallet in request.meta["wallet_batch"]:
+                cached_row = self.get_fresh_row(wallet_source=wallet_source, wallet_address=wallet["wallet_address"], chain=wallet["chain"])
+                if cached_row is not None:
+                    cached_rows[build_wallet_key(chain=wallet["chain"], wallet_address=wallet["wallet_address"])] = cached_row
+            request.meta["wallet_cache_rows"] = cached_rows
+            return Response(url=request.url, request=request) if len(cached_rows) == len(request.meta["wallet_batch"]) else None
+
+        cached_row = self.get_fresh_row(wallet_source=wallet_source, wallet_address=request.meta["wallet_address"], chain=request.meta["chain"])
+        if cached_row is None:
+            return None
+        request.meta["wallet_cache_row"] = cached_row
+        return Response(url=request.url, request=request)
+
+    def get_fresh_row(self, wallet_source, wallet_address, chain):
+        # Look up a fresh row that still has exactly the fields of the wallet item (i.e., rows cached before a schema change are treated as stale)
+        cached_row = self.cache.get_fresh(wallet_address=wallet_address, chain=chain, source=wallet_source)
+        if cached_row is None or set(cached_row) != set(WALLET_SOURCE_ITEMS[wallet_source].fields):
+            self.stats.inc_value(f"wallet_cache/{wallet_source}/miss")
+            return None
+        self.stats.inc_value(f"wallet_cache/{wallet_source}/hit")
+        return cached_row
+
+    def spider_closed(self, spider):
+        self.cache.close()
+
+
+class WalletStatsCacheSpiderMiddleware:
+    # Stores the wallet stats that were freshly scraped in the local wallet
+    # stats cache, so that repeat runs can skip the wallets that are still fresh.
+
+    def __init__(self, cache, stats):
+        self.cache = cache
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("WALLET_CACHE_ENABLED"):
+            raise NotConfigured
+        cache = WalletStatsCache(
+            path=crawler.settings.get("WALLET_CACHE_PATH"),
+            ttl=crawler.settings.getint("WALLET_CACHE_TTL")
+        )
+        s = cls(cache=cache, stats=crawler.stats)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_spider_output(self, response, result, spider):
+        for i in result:
+            self.store_wallet_item(response=response, item=i)
+            yield i
+
+    async def process_spider_output_async(self, response, result, spider):
+        # Newer Scrapy versions pass the outputs of the spider as an asynchronous iterable
+        async for i in result:
+            self.store_wallet_item(response=response, item=i)
+            yield i
+
+    def store_wallet_item(self, response, item):
+        wallet_source = WALLET_ITEM_SOURCES.get(type(item))
+
+        # Skip the rows that were served from the cache and the pages that failed to load (i.e., all the stats are None)
+        if wallet_source is not None and "wallet_cache_row" not in response.meta and build_wallet_key(chain=item["chain"], wallet_address=item["wallet_address"]) not in response.meta.get("wallet_cache_rows", {}):
+            stats_values = [v for k, v in item.items() if k not in ("wallet_address", "chain", "scraped_at")]
+            if any(v is not None for v in stats_values):
+                self.cache.upsert(wallet_address=item["wallet_address"], chain=item["chain"], source=wallet_source, payload=dict(item))
+                self.stats.inc_value(f"wallet_cache/{wallet_source}/store")
+
+    def spider_closed(self, spider):
+        self.cache.close()
+
+
+class WalletScreeningBudgetMiddleware:
+    # Caps the wallet screening requests that are sent to Zyte by a time budget
+    # (WALLET_SCREENING_BUDGET_SECONDS since the spider opened) and/or a request
+    # budget (WALLET_SCREENING_BUDGET_REQUESTS). The wallet requests are scheduled
+    # by priority, so a run that is cut short has screened the highest-value
+    # wallets. It sits after the wallet stats cache and the Zyte response cache
+    # (HttpCacheMiddleware), so the cache hits are free.
+
+    def __init__(self, budget_seconds, budget_requests, stats):
+        self.budget_seconds = budget_seconds
+        self.budget_requests = budget_requests
+        self.stats = stats
+        self.start_time = time.monotonic()
+        self.num_requests = 0
+        self.exhausted_reason = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        budget_seconds = crawler.settings.getfloat("WALLET_SCREENING_BUDGET_SECONDS")
+        budget_requests = crawler.settings.getint("WALLET_SCREENING_BUDGET_REQUESTS")
+        if budget_seconds <= 0 and budget_requests <= 0:
+            raise NotConfigured
+        s = cls(budget_seconds=budget_seconds, budget_requests=budget_requests, stats=crawler.stats)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        return s
+
+    def spider_opened(self, spider):
+        self.start_time = time.monotonic()
+
+    def process_request(self, request, spider):
+        # Only the wallet screening requests carry a wallet source
+        wallet_source = request.meta.get("wallet_source")
+        if wallet_source is None:
+            return None
+
+        if self.exhausted_reason is None:
+            if self.budget_seconds > 0 and time.monotonic() - self.start_time >= self.budget_seconds:
+                self.exhausted_reason = f"time budget of {self.budget_seconds:g} seconds"
+            elif self.budget_requests > 0 and self.num_requests >= self.budget_requests:
+                self.exhausted_reason = f"request budget of {self.budget_requests} requests"
+            if self.exhausted_reason is not None:
+                spider.logger.info(f"The wallet screening {self.exhausted_reason} is exhausted. Skipping the remaining wallet screening requests")
+
+        if self.exhausted_reason is not None:
+            self.stats.inc_value(f"wallet_screening/{wallet_source}/budget_skipped")
+            raise IgnoreRequest(f"The wallet screening {self.exhausted_reason} is exhausted")
+
+        self.num_requests += 1
+        self.stats.inc_value(f"wallet_screening/{wallet_source}/budget_used")
+        return None
+
+
+class DomainConcurrencyState:
+    # The measurements of one target domain (e.g., dexscreener.com) since the
+    # last concurrency adjustment, plus the direction the controller is moving in.
+
+    def __init__(self, concurrency, min_concurrency, max_concurrency):
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.direction = 1 # +1 while probing for more throughput, -1 while probing downwards
+        self.previous_items_per_minute = None
+        self.reset_window()
+
+    def reset_window(self):
+        self.window_start = time.monotonic()
+        self.latencies = deque()
+        self.num_responses = 0
+        self.num_throttled = 0
+        self.num_errors = 0
+        self.num_items = 0
+        self.saturated = False # True if requests were queued behind the slot during the window
+
+    def latency_percentile(self, pct):
+        if not self.latencies:
+            return None
+        sorted_latencies = sorted(self.latencies)
+        return sorted_latencies[max(0, math.ceil(pct / 100 * len(sorted_latencies)) - 1)]
+
+
+class AdaptiveConcurrencyMiddleware:
+    # Tunes the concurrency of every downloader slot (i.e., every target domain)
+    # to maximize the number of successfully scraped items per minute.
+    # Every ADAPTIVE_CONCURRENCY_INTERVAL seconds, a domain backs off multiplicatively
+    # if its throttling rate (429/503/520/521), error rate or p90 latency is too high.
+    # Otherwise, it hill-climbs: it keeps moving its concurrency one step in the same
+    # direction while the items per minute do not drop, and reverses when they do.
+
+    THROTTLING_STATUSES = {429, 503, 520, 521}
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.start_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_START", settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"))
+        self.min_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_MIN", 1)
+        self.max_concurrency = min(settings.getint("ADAPTIVE_CONCURRENCY_MAX", settings.getint("CONCURRENT_REQUESTS")), settings.getint("CONCURRENT_REQUESTS"))
+        self.domain_bounds = settings.getdict("ADAPTIVE_CONCURRENCY_DOMAIN_BOUNDS") # e.g., {"gmgn.ai": [1, 5]}
+        self.interval = settings.getfloat("ADAPTIVE_CONCURRENCY_INTERVAL", 30)
+        self.min_samples = settings.getint("ADAPTIVE_CONCURRENCY_MIN_SAMPLES", 5)
+        self.max_throttled_rate = settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_THROTTLED_RATE", 0.1)
+        self.max_error_rate = settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE", 0.2)
+        self.max_p90_latency = settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_P90_LATENCY", 90)
+        self.backoff_factor = settings.getfloat("ADAPTIVE_CONCURRENCY_BACKOFF_FACTOR", 0.5)
+        self.domains = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler=crawler)
+        crawler.signals.connect(s.item_scraped, signal=signals.item_scraped)
+        return s
+
+    def get_domain_state(self, request):
+        """
+        A function to return the slot key of a request and the state of its domain, applying the start concurrency to new domains.
+        """
+        slot_key = self.crawler.engine.downloader.get_slot_key(request)
+        if slot_key not in self.domains:
+            # The requests sent through Zyte API are downloaded through the slot "zyte-api@<domain>", the direct ones through "<domain>"
+            domain = slot_key.split("@", 1)[-1]
+            min_concurrency, max_concurrency = self.domain_bounds.get(domain, (self.min_concurrency, self.max_concurrency))
+            concurrency = min(max(self.start_concurrency, min_concurrency), max_concurrency)
+            self.domains[slot_key] = DomainConcurrencyState(concurrency=concurrency, min_concurrency=min_concurrency, max_concurrency=max_concurrency)
+            self.apply_concurrency(slot_key=slot_key)
+        return slot_key, self.domains[slot_key]
+
+    def apply_concurrency(self, slot_key):
+        """
+        A function to set the concurrency of a downloader slot. It is also stored in the per-slot settings, so that it survives the garbage collection of idle slots.
+        """
+        downloader = self.crawler.engine.downloader
+        concurrency = self.domains[slot_key].concurrency
+        downloader.per_slot_settings.setdefault(slot_key, {})["concurrency"] = concurrency
+        if slot_key in downloader.slots:
+            downloader.slots[slot_key].concurrency = concurrency
+        self.stats.set_value(f"adaptive_concurrency/{slot_key}/concurrency", concurrency)
+
+    def process_request(self, request, spider):
+        # Register the domain before its slot is created, so that the slot starts at the right concurrency. The middleware runs
+        # after ScrapyZyteAPIDownloaderMiddleware, which moves the requests it sends to Zyte API to their own slot (i.e., download_slot)
+        self.get_domain_state(request)
+        return None
+
+    def process_response(self, request, response, spider):
+        # Skip the responses that did not come from the network (e.g., the ones served by the wallet stats cache)
+        if "download_latency" not in request.meta:
+            return response
+
+        slot_key, state = self.get_domain_state(request)
+        state.num_responses += 1
+        state.latencies.append(request.meta["download_latency"])
+        if response.status in self.THROTTLING_STATUSES:
+            state.num_throttled += 1
+        elif response.status >= 400:
+            state.num_errors += 1
+        self.check_saturation(slot_key=slot_key, state=state)
+        self.maybe_adjust(slot_key=slot_key, state=state, spider=spider)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        # Zyte API errors carry the status code of the failed request (e.g., 521 when the website bans the request)
+        slot_key, state = self.get_domain_state(request)
+        state.num_responses += 1
+        if isinstance(exception, RequestError) and exception.status in self.THROTTLING_STATUSES:
+            state.num_throttled += 1
+        else:
+            state.num_errors += 1
+        self.check_saturation(slot_key=slot_key, state=state)
+        self.maybe_adjust(slot_key=slot_key, state=state, spider=spider)
+        return None
+
+    def item_scraped(self, item, response, spider):
+        # Credit the item to the domain of the page it was scraped from
+        if response is None or "download_latency" not in response.meta:
+            return
+        _, state = self.get_domain_state(response.request)
+        state.num_items += 1
+
+    def check_saturation(self, slot_key, state):
+        slot = self.crawler.engine.downloader.slots.get(slot_key)
+        if slot is not None and slot.queue:
+            state.saturated = True
+
+    def maybe_adjust(self, slot_key, state, spider):
+        """
+        A function to adjust the concurrency of a domain once its measurement window is long enough.
+        """
+        elapsed = time.monotonic() - state.window_start
+        if elapsed < self.interval or state.num_responses < self.min_samples:
+            return
+
+        throttled_rate = state.num_throttled / state.num_responses
+        error_rate = state.num_errors / state.num_responses
+        p50_latency = state.latency_percentile(50)
+        p90_latency = state.latency_percentile(90)
+        items_per_minute = state.num_items / elapsed * 60
+        old_concurrency = state.concurrency
+
+        if throttled_rate > self.max_throttled_rate or error_rate > self.max_error_rate or (p90_latency is not None and p90_latency > self.max_p90_latency):
+            # Back off multiplicatively, then probe upwards again from the new level
+            state.concurrency = math.floor(state.concurrency * self.backoff_factor)
+            state.direction = 1
+            reason = "backing off"
+        else:
+            # Reverse the direction if the throughput dropped by more than 5% since the last adjustment
+            if state.previous_items_per_minute is not None and items_per_minute < state.previous_items_per_minute * 0.95:
+                state.direction = -state.direction
+
+            # Raising the concurrency of a slot that had no queued requests would not make it any faster
+            if state.direction == 1 and not state.saturated:
+                reason = "holding, the slot is not saturated"
+            else:
+                state.concurrency += state.direction
+                reason = "probing up" if state.direction == 1 else "probing down"
+        state.concurrency = min(max(state.concurrency, state.min_concurrency), state.max_concurrency)
+        state.previous_items_per_minute = items_per_minute
+
+        spider.logger.info(
+            f"Adaptive concurrency of {slot_key}: {old_concurrency} -> {state.concurrency} ({reason}). "
+            f"Items per minute: {items_per_minute:.1f}, throttled rate: {throttled_rate:.0%}, error rate: {error_rate:.0%}, "
+            f"p50 latency: {p50_latency}, p90 latency: {p90_latency}"
+        )
+        self.stats.set_value(f"adaptive_concurrency/{slot_key}/items_per_minute", round(items_per_minute, 1))
+        self.stats.set_value(f"adaptive_concurrency/{slot_key}/p90_latency", p90_latency)
+        if state.concurrency != old_concurrency:
+            self.apply_concurrency(slot_key=slot_key)
+        state.reset_window()
+
+
+class CallbackTimingSpiderMiddleware:
+    # Records how long every spider callback takes (e.g., the XPath extraction
+    # and the number normalization of parse_top_traders) in a histogram per
+    # callback. It sits right next to the spider, so only the time spent
+    # producing the outputs is counted, not the time of the downstream components.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured
+        return cls()
+
+    def process_spider_output(self, response, result, spider):
+        iterator = iter(result)
+        elapsed = 0.0
+        while True:
+            start_time = time.perf_counter()
+            try:
+                i = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start_time
+            yield i
+        self.record_callback_duration(response=response, spider=spider, elapsed=elapsed)
+
+    async def process_spider_output_async(self, response, result, spider):
+        # Newer Scrapy versions pass the outputs of the spider as an asynchronous iterable
+        iterator = result.__aiter__()
+        elapsed = 0.0
+        while True:
+            start_time = time.perf_counter()
+            try:
+                i = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start_time
+            yield i
+        self.record_callback_duration(response=response, spider=spider, elapsed=elapsed)
+
+    def record_callback_duration(self, response, spider, elapsed):
+        callback = response.request.callback if response.request is not None else None
+        metrics.observe("callback_duration_seconds", elapsed, spider=spider.name, callback=getattr(callback, "__name__", "parse"))
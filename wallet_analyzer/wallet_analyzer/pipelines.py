@@ -3,11 +3,195 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
+import os
+import re
+import time
+
+import scrapy
+from scrapy.exceptions import NotConfigured
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+from crawl_metrics import metrics
+
 
 class WalletAnalyzerPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class ParquetExportPipeline:
+    # Buffers the items of every item class and writes them in batches to one
+    # typed Parquet file per item class (e.g., DexScreenerTopTraders ->
+    # dex_screener_top_traders.parquet). The column types come from the dtype
+    # declared on every field in items.py.
+
+    def __init__(self, output_dir, batch_size, compression):
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.compression = compression
+        self.buffers = {}
+        self.writers = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("PARQUET_EXPORT_ENABLED"):
+            raise NotConfigured
+
+        # pyarrow is only needed when the Parquet export is enabled
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise NotConfigured("The Parquet export requires pyarrow")
+
+        return cls(
+            output_dir=crawler.settings.get("PARQUET_EXPORT_DIR"),
+            batch_size=crawler.settings.getint("PARQUET_EXPORT_BATCH_SIZE"),
+            compression=crawler.settings.get("PARQUET_EXPORT_COMPRESSION")
+        )
+
+    def process_item(self, item, spider):
+        if isinstance(item, scrapy.Item):
+            buffer = self.buffers.setdefault(type(item), [])
+            buffer.append(ItemAdapter(item).asdict())
+            if len(buffer) >= self.batch_size:
+                self.flush(type(item))
+        return item
+
+    def close_spider(self, spider):
+        for item_class in list(self.buffers):
+            self.flush(item_class)
+        for writer in self.writers.values():
+            writer.close()
+
+    def flush(self, item_class):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = self.buffers.pop(item_class, [])
+        if not rows:
+            return
+
+        # Open the Parquet file of the item class on its first batch
+        schema = helper_build_arrow_schema(item_class)
+        if item_class not in self.writers:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{helper_snake_case(item_class.__name__)}.parquet")
+            self.writers[item_class] = pq.ParquetWriter(path, schema, compression=self.compression)
+
+        # Every batch becomes a row group of the file
+        with metrics.timer("parquet_flush_duration_seconds", item_class=item_class.__name__):
+            self.writers[item_class].write_table(pa.Table.from_pylist(rows, schema=schema))
+
+
+def helper_snake_case(name):
+    """
+    A function to convert a class name to snake case, e.g., DexScreenerTopTraders -> dex_screener_top_traders.
+    """
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def helper_build_arrow_schema(item_class):
+    """
+    A function to build the Arrow schema of an item class from the dtype of its fields.
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field(field_name, pa.type_for_alias(field_meta.get("dtype", "string")))
+        for field_name, field_meta in item_class.fields.items()
+    ])
+
+
+class TimeSeriesStorePipeline:
+    # Appends a snapshot of every scraped asset, top trader and wallet to the
+    # time-series store (see timeseries_store.py), so that the history of
+    # their stats is kept even though the feeds are overwritten by every run.
+    # Only the typed fields are stored (not the displayed *_raw strings), with
+    # the key of the entity and the time of the snapshot (the scraped_at of the
+    # wallet items, else the time the item was scraped). The wallets served
+    # from the wallet stats cache were stored by the run that screened them,
+    # so they are skipped.
+
+    # The entity of every item class and the fields of its key
+    ENTITIES = {
+        "DexScreenerTopGainers": ("assets", ["asset_url"]),
+        "DexScreenerTopTraders": ("traders", ["asset_url", "wallet_address"]),
+        "DexCheckWalletScreener": ("dex_check_wallets", ["chain", "wallet_address"]),
+        "GmgnAiWalletScreener": ("gmgn_ai_wallets", ["chain", "wallet_address"])
+    }
+
+    def __init__(self, root_dir, num_buckets, batch_size, compact_days):
+        from timeseries_store import TimeSeriesStore
+
+        self.store = TimeSeriesStore(root_dir=root_dir, num_buckets=num_buckets)
+        self.batch_size = batch_size
+        self.compact_days = compact_days
+        self.buffers = {}
+        self.opened_at = time.time()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("TIMESERIES_STORE_ENABLED"):
+            raise NotConfigured
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise NotConfigured("The time-series store requires pyarrow")
+
+        return cls(
+            root_dir=crawler.settings.get("TIMESERIES_STORE_DIR"),
+            num_buckets=crawler.settings.getint("TIMESERIES_STORE_BUCKETS"),
+            batch_size=crawler.settings.getint("TIMESERIES_STORE_BATCH_SIZE"),
+            compact_days=crawler.settings.getint("TIMESERIES_STORE_COMPACT_DAYS")
+        )
+
+    def process_item(self, item, spider):
+        if not isinstance(item, scrapy.Item) or type(item).__name__ not in self.ENTITIES:
+            return item
+        row = ItemAdapter(item).asdict()
+        snapshot_at = row.get("scraped_at") or time.time()
+        if snapshot_at < self.opened_at:
+            return item # A cached wallet, already stored by the run that screened it
+
+        _, key_fields = self.ENTITIES[type(item).__name__]
+        row["entity_key"] = "|".join(str(row.get(field)) for field in key_fields)
+        row["snapshot_at"] = int(snapshot_at * 1000)
+        buffer = self.buffers.setdefault(type(item), [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(type(item))
+        return item
+
+    def close_spider(self, spider):
+        for item_class in list(self.buffers):
+            self.flush(item_class)
+
+        # Merge the part files of the previous days, which are not written anymore
+        today = time.strftime("%Y-%m-%d", time.gmtime())
+        for entity, _ in self.ENTITIES.values():
+            with metrics.timer("timeseries_compaction_duration_seconds", entity=entity):
+                num_compacted = self.store.compact(entity=entity, before_date=today, max_days=self.compact_days)
+            if num_compacted:
+                spider.logger.info(f"Compacted {num_compacted} partitions of the time-series store of the {entity}")
+
+    def flush(self, item_class):
+        import pyarrow as pa
+
+        rows = self.buffers.pop(item_class, [])
+        if not rows:
+            return
+        entity, _ = self.ENTITIES[item_class.__name__]
+        with metrics.timer("timeseries_append_duration_seconds", entity=entity):
+            self.store.append(entity=entity, table=pa.Table.from_pylist(rows, schema=helper_build_snapshot_schema(item_class)))
+
+
+def helper_build_snapshot_schema(item_class):
+    """
+    A function to build the Arrow schema of the snapshots of an item class in the time-series store: its key, its time and its typed fields.
+    """
+    import pyarrow as pa
+
+    typed_fields = [field for field in helper_build_arrow_schema(item_class) if not field.name.endswith("_raw")]
+    return pa.schema([pa.field("entity_key", pa.string()), pa.field("snapshot_at", pa.timestamp("ms", tz="UTC")), *typed_fields])
@@ -11,6 +11,7 @@ BOT_NAME = "wallet_analyzer"
 
 SPIDER_MODULES = ["wallet_analyzer.spiders"]
 NEWSPIDER_MODULE = "wallet_analyzer.spiders"
+SPIDER_LOADER_CLASS = "wallet_analyzer.spiderloader.LazySpiderLoader" # Only import the module of the spider that is run (the spiders are named after their module)
 
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
@@ -0,0 +1,62 @@
+# Define here the spider loader of the project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/api.html#the-spiderloader-api
+
+import pkgutil
+from importlib import import_module
+
+from scrapy.spiderloader import SpiderLoader
+
+
+class LazySpiderLoader(SpiderLoader):
+    # Scrapy's SpiderLoader imports every spider module of SPIDER_MODULES when
+    # it is created, so `scrapy crawl dex_screener_top_gainers` also imports the
+    # wallet screeners and the pipeline spider (and everything they import).
+    # The spiders of this project are named after their module, so this loader
+    # lists them from the module names without importing anything, and only
+    # imports the module of the spider that is loaded. A spider that is not
+    # found in the module of its name (e.g., a spider that was renamed)
+    # falls back to importing all the spider modules, as Scrapy does.
+
+    def __init__(self, settings):
+        self._all_spiders_loaded = False
+        super().__init__(settings)
+
+    def _load_all_spiders(self):
+        # Called by SpiderLoader.__init__: defer the imports to the first load()
+        pass
+
+    def helper_load_every_spider(self):
+        # The spiders that were already loaded are found again by the full scan, so they are forgotten first (their modules are not imported twice)
+        if not self._all_spiders_loaded:
+            self._all_spiders_loaded = True
+            self._spiders.clear()
+            self._found.clear()
+            super()._load_all_spiders()
+
+    def list(self):
+        spider_names = set(self._spiders)
+        for package_name in self.spider_modules:
+            package = import_module(package_name)
+            spider_names.update(module_info.name for module_info in pkgutil.iter_modules(getattr(package, "__path__", [])) if not module_info.ispkg)
+        return sorted(spider_names)
+
+    def load(self, spider_name):
+        if spider_name not in self._spiders:
+            for package_name in self.spider_modules:
+                try:
+                    module = import_module(f"{package_name}.{spider_name}")
+                except ModuleNotFoundError as error:
+                    if error.name != f"{package_name}.{spider_name}":
+                        raise # A dependency of the spider module is missing
+                    continue
+                self._load_spiders(module)
+        if spider_name not in self._spiders:
+            self.helper_load_every_spider()
+        return super().load(spider_name)
+
+    def find_by_request(self, request):
+        # Matching a request needs the allowed domains of every spider
+        self.helper_load_every_spider()
+        return super().find_by_request(request)
@@ -1,21 +1,42 @@
 # Import libraries
+import time
 import scrapy
 from inputs import custom_scrapy_settings
-import json
-import pandas as pd
+from feeds import build_feed
+from chains import build_wallet_key
+from crawl_checkpoints import CheckpointedSpiderMixin
+from wallet_fetch import BROWSER_FETCH_MODE, LIGHT_FETCH_MODE, WalletFetchModeMixin
+from helper_functions import helper_treat_none_before_data_type_change
+from number_normalization import normalize_number
+from crawl_metrics import metrics
+from wallet_analyzer.items import DexCheckWalletScreener
 
-class DexCheckWalletScreenerSpider(scrapy.Spider):
+# The keys of the stats in the records of the DexCheck JSON endpoint, by item field. Every record also holds the address of its wallet
+DEX_CHECK_API_FIELDS = {
+    "tot_gross_profit": "grossProfit",
+    "realized_gross_profit": "realizedProfit",
+    "unrealized_gross_profit": "unrealizedProfit",
+    "tot_roi": "roi",
+    "realized_roi": "realizedRoi",
+    "unrealized_roi": "unrealizedRoi",
+    "win_rate": "winRate",
+    "num_wins": "wins",
+    "num_losses": "losses",
+    "trading_volume": "tradingVolume",
+    "num_trades": "trades",
+    "avg_trade_size": "avgTradeSize"
+}
+DEX_CHECK_API_INT_FIELDS = ("num_wins", "num_losses", "num_trades")
+
+class DexCheckWalletScreenerSpider(CheckpointedSpiderMixin, WalletFetchModeMixin, scrapy.Spider):
     name = "dex_check_wallet_screener"
     custom_settings = custom_scrapy_settings.copy() # Define the custom settings of the spider
     custom_settings["LOG_FILE"] = "dex_check_wallet_screener.log"
-    custom_settings["FEEDS"] = {
-        'dex_check_wallet_screener.json': {
-            'format': 'json',
-            'overwrite': True
-        }
-    }
-    base_url = "https://dexcheck.ai/app/wallet-analyzer/{wallet_address}"
+    custom_settings["FEEDS"] = build_feed(feed_name="dex_check_wallet_screener")
+    base_url = "https://dexcheck.ai/app/wallet-analyzer/{wallet_address}" # The same page serves the wallets of every chain
+    wallet_source = "dex_check" # The key of the spider's rows in the wallet stats cache
     max_retries = 1
+    wallet_item_class = DexCheckWalletScreener
     spider_actions = {
         "action": "waitForSelector",
         "timeout": 10,
@@ -27,149 +48,250 @@ class DexCheckWalletScreenerSpider(scrapy.Spider):
         }
     }
 
+    def __init__(self, top_n_pct_pnl: float = pow(10, 6), top_n_abs_pnl: float = None, min_bought_usd: float = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # The wallet selection criteria (spider arguments are passed as strings)
+        self.top_n_pct_pnl = helper_treat_none_before_data_type_change(value=top_n_pct_pnl, data_type="float")
+        self.top_n_abs_pnl = helper_treat_none_before_data_type_change(value=top_n_abs_pnl, data_type="float")
+        self.min_bought_usd = helper_treat_none_before_data_type_change(value=min_bought_usd, data_type="float")
+
+        # The positions in the ranked list of the wallets that have been screened, to report the coverage of the list when the run ends (e.g., when a budget cut it short)
+        self.screened_wallet_counts = set()
+        self.tot_num_wallets = None
+
     def start_requests(self):
-        # Open the JSON file dex_screener_top_traders.json and convert it to a pandas data frame
-        self.logger.info("Opening the JSON file dex_screener_top_traders.json")
-        with open("dex_screener_top_traders.json", "r") as f:
-            # Load the JSON file
-            df_raw_data = json.load(f)
-        
-            # Change the top_gainers to a pandas data frame
-            df_raw_data = pd.DataFrame(df_raw_data)
-
-            # Drop all columns that end with _raw
-            df_raw_data = df_raw_data.loc[:, ~df_raw_data.columns.str.endswith('_raw')]
-        
-        # Change the data types of trader_bought_usd, trader_bought_crypto, trader_buy_txns, trader_sold_usd, trader_sold_crypto, trader_sell_txns, trader_pnl to numeric
-        df_raw_data.loc[:, "trader_bought_usd":"trader_pnl"] = df_raw_data.loc[:, "trader_bought_usd":"trader_pnl"].apply(pd.to_numeric).round(2)
-
-        # Filter the data frame to only include the rows where trader_bought_usd and trader_sold_usd are not null, then sort the data frame by trader_pnl in descending order
-        df_top_traders = df_raw_data[(df_raw_data["trader_bought_usd"].notnull()) & (df_raw_data["trader_sold_usd"].notnull())].sort_values(by="trader_pnl", ascending=False)
-
-        # Fill the NA trader_pnl values with 0
-        df_top_traders["trader_pnl"] = df_top_traders["trader_pnl"].fillna(0)
-
-        # Calculate the trader's percentage pnl
-        df_top_traders["trader_pct_pnl"] = round((df_top_traders["trader_pnl"] / df_top_traders["trader_bought_usd"]) * 100, 2)
-
-        # Rank the traders by their absolute PnL
-        df_top_traders["abs_pnl_rank"] = df_top_traders["trader_pnl"].rank(ascending=False)
-        
-        # Rank the traders by their percentage-based PnL
-        df_top_traders["pct_pnl_rank"] = df_top_traders["trader_pct_pnl"].rank(ascending=False)
-
-        # Filter for the top 250 traders
-        df_wallets_to_analyze = df_top_traders[df_top_traders["pct_pnl_rank"] <= pow(10, 6)].reset_index(drop=True)
-
-        # Extract the full list of wallets
-        full_list_of_wallets = list(df_wallets_to_analyze["wallet_address"].unique())
-        
-        for idx, wl in enumerate(full_list_of_wallets):
-            request_counter = 1
-            self.logger.info(f"Sending a request to the wallet address: {wl}, which is wallet {idx + 1} out of {len(full_list_of_wallets)}. Try {request_counter} out of {self.max_retries}.")
-            yield scrapy.Request(
-                url=self.base_url.format(wallet_address=wl),
-                callback=self.parse_wallet_data,
-                meta={
-                    "zyte_api_automap": {
-                        "browserHtml": True,
-                        "javascript": True,
-                        "actions": [self.spider_actions]
-                    },
-                    "wallet_address": wl,
-                    "request_counter": request_counter,
-                    "wallet_count": idx + 1,
-                    "tot_num_wallets": len(full_list_of_wallets)
-                }
-            )
+        # Load the wallets to screen. The ranking of the top traders feed is only recomputed when the feed changes.
+        # wallet_selection (and pandas) is imported here, so that the spider module imports fast (e.g., for scrapy list or the pipeline spider)
+        from wallet_selection import select_wallets_to_analyze
+        self.logger.info("Selecting the wallets to screen from the top traders feed dex_screener_top_traders")
+        df_wallets_to_analyze = select_wallets_to_analyze(
+            traders_feed="dex_screener_top_traders",
+            top_n_pct_pnl=self.top_n_pct_pnl,
+            top_n_abs_pnl=self.top_n_abs_pnl,
+            min_bought_usd=self.min_bought_usd,
+            priority_weights=self.settings.getdict("WALLET_PRIORITY_WEIGHTS") or None
+        )
+
+        # Extract the full list of wallets, their chains and their priorities, in screening order. The priorities keep that order in the request queue
+        full_list_of_wallets = list(zip(df_wallets_to_analyze["chain"], df_wallets_to_analyze["wallet_address"], df_wallets_to_analyze["screening_priority"]))
+        self.tot_num_wallets = len(full_list_of_wallets)
+
+        # Screen the wallets one page at a time, or in batches through the JSON endpoint of the site (see WalletFetchModeMixin)
+        yield from self.build_wallet_requests(wallets=self.iter_wallets_to_screen(full_list_of_wallets=full_list_of_wallets))
+
+    def iter_wallets_to_screen(self, full_list_of_wallets: list):
+        """
+        A function to yield the arguments of the request of every wallet that still has to be screened.
+        """
+        for idx, (chain, wl, priority) in enumerate(full_list_of_wallets):
+            # Skip the wallets that were already screened by the run that is being resumed, and carry over the retries they already spent
+            wallet_key = build_wallet_key(chain=chain, wallet_address=wl)
+            if self.is_work_done(stage=self.wallet_source, key=wallet_key):
+                self.screened_wallet_counts.add(idx + 1)
+                continue
+            request_counter = self.get_resumed_request_counter(stage=self.wallet_source, key=wallet_key)
+            self.mark_work_pending(stage=self.wallet_source, key=wallet_key, payload={"chain": chain, "wallet_address": wl}, request_counter=request_counter)
+            self.logger.info(f"Sending a request to the wallet address: {wl} on {chain}, which is wallet {idx + 1} out of {len(full_list_of_wallets)}. Try {request_counter} out of {self.max_retries}.")
+            yield {
+                "wallet_address": wl,
+                "chain": chain,
+                "request_counter": request_counter,
+                "wallet_count": idx + 1,
+                "tot_num_wallets": len(full_list_of_wallets),
+                "priority": int(priority)
+            }
+
+    def build_wallet_request(self, wallet_address: str, chain: str, request_counter: int, wallet_count: int, tot_num_wallets: int, priority: int = 0, dont_filter: bool = False, fetch_mode: str = None):
+        """
+        A function to build the request that screens a single wallet address, as a light request or a browser render (see WalletFetchModeMixin).
+        """
+        fetch_mode = fetch_mode or BROWSER_FETCH_MODE
+        return scrapy.Request(
+            url=self.base_url.format(wallet_address=wallet_address),
+            callback=self.parse_wallet_data,
+            meta={
+                "zyte_api_automap": self.build_zyte_api_params(fetch_mode=fetch_mode),
+                "fetch_mode": fetch_mode,
+                "wallet_address": wallet_address,
+                "chain": chain,
+                "wallet_source": self.wallet_source,
+                "request_counter": request_counter,
+                "wallet_count": wallet_count,
+                "tot_num_wallets": tot_num_wallets
+            },
+            priority=priority,
+            dont_filter=dont_filter
+        )
     
+    def parse_api_payload(self, payload, wallets: list) -> dict:
+        """
+        A function to read the stats of a batch of wallets from the JSON of the DexCheck wallets endpoint, e.g., {"data": [{"address": "...", "grossProfit": 22000.0, "winRate": 33.09, ...}]}.
+        The JSON values are already typed, so the raw fields (the values as displayed on the page) are left empty. The wallets that are missing from the payload hold no stats.
+        """
+        records = payload.get("data") if isinstance(payload, dict) else payload
+        if not isinstance(records, list):
+            return {}
+
+        # The EVM addresses can come back in another case than the one they were requested in
+        wallet_addresses = {wallet["wallet_address"].lower(): wallet["wallet_address"] for wallet in wallets}
+        api_rows = {}
+        for record in records:
+            wallet_address = wallet_addresses.get(str(record.get("address", "")).lower()) if isinstance(record, dict) else None
+            if wallet_address is None or all(record.get(key) is None for key in DEX_CHECK_API_FIELDS.values()):
+                continue
+            api_row = {}
+            for field, key in DEX_CHECK_API_FIELDS.items():
+                api_row[f"{field}_raw"] = None
+                api_row[field] = helper_treat_none_before_data_type_change(value=record.get(key), data_type="int" if field in DEX_CHECK_API_INT_FIELDS else "float")
+            api_rows[wallet_address] = api_row
+        return api_rows
+
     def parse_wallet_data(self, response):
         # Extract the meta data
         resp_wallet_address = response.meta["wallet_address"]
+        resp_chain = response.meta["chain"]
         resp_request_counter = response.meta["request_counter"]
         resp_wallet_count = response.meta["wallet_count"]
         resp_tot_num_wallets = response.meta["tot_num_wallets"]
 
-        # Print the raw logs of the Zyte API
-        self.logger.info(f"Raw logs of the Zyte API for wallet address {resp_wallet_address}, which is wallet {resp_wallet_count} out of {resp_tot_num_wallets} --> {response.raw_api_response['actions']}")
+        # Yield the cached stats if the wallet has been screened recently
+        if "wallet_cache_row" in response.meta:
+            self.logger.info(f"Using the cached stats of the wallet address: {resp_wallet_address}, which is wallet {resp_wallet_count} out of {resp_tot_num_wallets}.")
+            yield DexCheckWalletScreener(**response.meta["wallet_cache_row"])
+            self.screened_wallet_counts.add(resp_wallet_count)
+            self.mark_work_done(stage=self.wallet_source, key=build_wallet_key(chain=resp_chain, wallet_address=resp_wallet_address))
+            return
+
+        # Print the raw logs of the Zyte API (the light requests have no actions)
+        resp_fetch_mode = response.meta.get("fetch_mode", BROWSER_FETCH_MODE)
+        self.logger.info(f"Raw logs of the Zyte API for wallet address {resp_wallet_address} ({resp_fetch_mode} request), which is wallet {resp_wallet_count} out of {resp_tot_num_wallets} --> {response.raw_api_response.get('actions')}")
 
         # Check if the page has been fully loaded
         check_page_load = response.xpath("//button[text()='Gross Profit']/following-sibling::p/text()").get()
+        self.record_wallet_fetch(response=response, page_loaded=check_page_load is not None)
+
+        # Fall back to the browser render if the light response does not hold the stats of the wallet. The fallback does not count as a retry
+        if check_page_load is None and resp_fetch_mode == LIGHT_FETCH_MODE:
+            self.logger.info(f"The light response of the wallet address: {resp_wallet_address} does not hold its stats, falling back to the browser render. URL: {response.url}")
+            yield self.build_wallet_request(
+                wallet_address=resp_wallet_address,
+                chain=resp_chain,
+                request_counter=resp_request_counter,
+                wallet_count=resp_wallet_count,
+                tot_num_wallets=resp_tot_num_wallets,
+                priority=response.request.priority,
+                dont_filter=True,
+                fetch_mode=BROWSER_FETCH_MODE
+            )
+            return
+
+        if check_page_load is None:
+            metrics.increment("wallet_page_load_failures", source=self.wallet_source, action="retry" if resp_request_counter < self.max_retries else "gave_up")
         if check_page_load is None and resp_request_counter < self.max_retries:
             resp_request_counter += 1
             self.logger.error(f"The page has not been fully loaded for the wallet address: {resp_wallet_address}, which is wallet {resp_wallet_count} out of {resp_tot_num_wallets}. Retrying the request {resp_request_counter} out of {self.max_retries}. URL: {response.url}")
-            yield scrapy.Request(
-                url=response.url,
-                callback=self.parse_wallet_data,
-                meta={
-                    "zyte_api_automap": {
-                        "browserHtml": True,
-                        "javascript": True,
-                        "actions": [self.spider_actions]
-                    },
-                    "wallet_address": resp_wallet_address,
-                    "request_counter": resp_request_counter,
-                    "wallet_count": resp_wallet_count,
-                    "tot_num_wallets": resp_tot_num_wallets
-                },
-                dont_filter=True
+            self.mark_work_pending(stage=self.wallet_source, key=build_wallet_key(chain=resp_chain, wallet_address=resp_wallet_address), payload={"chain": resp_chain, "wallet_address": resp_wallet_address}, request_counter=resp_request_counter)
+            yield self.build_wallet_request(
+                wallet_address=resp_wallet_address,
+                chain=resp_chain,
+                request_counter=resp_request_counter,
+                wallet_count=resp_wallet_count,
+                tot_num_wallets=resp_tot_num_wallets,
+                priority=response.request.priority,
+                dont_filter=True,
+                fetch_mode=BROWSER_FETCH_MODE
             )
         else:
             # Print a status message
             self.logger.info(f"Processing the stats of the wallet address: {resp_wallet_address}, which is wallet {resp_wallet_count} out of {resp_tot_num_wallets}.")
 
-            # Extract the wallet's gross profit
-            tot_gross_profit = response.xpath("//button[text()='Gross Profit']/following-sibling::p/text()").get()
+            # Extract the wallet's gross profit. The raw values are kept next to the typed values (e.g., "$0.0₁₂1467" -> 1.467e-13, "33.09%" -> 33.09, "$22K" -> 22000.0)
+            tot_gross_profit_raw = response.xpath("//button[text()='Gross Profit']/following-sibling::p/text()").get()
+            tot_gross_profit = normalize_number(value=tot_gross_profit_raw)
 
             # Extract the realized gross profit
-            realized_gross_profit = response.xpath("//button[text()='Gross Profit']/../div//p[text()='Realized']/following-sibling::p/span[1]/text()").get()
+            realized_gross_profit_raw = response.xpath("//button[text()='Gross Profit']/../div//p[text()='Realized']/following-sibling::p/span[1]/text()").get()
+            realized_gross_profit = normalize_number(value=realized_gross_profit_raw)
             
             # Extract the unrealized gross profit
-            unrealized_gross_profit = response.xpath("//button[text()='Gross Profit']/../div//p[text()='Unrealized']/following-sibling::p/span[1]/text()").get()
+            unrealized_gross_profit_raw = response.xpath("//button[text()='Gross Profit']/../div//p[text()='Unrealized']/following-sibling::p/span[1]/text()").get()
+            unrealized_gross_profit = normalize_number(value=unrealized_gross_profit_raw)
 
             # Extract the wallet's total ROI
-            tot_roi = response.xpath("//button[text()='Total ROI']/following-sibling::p/text()[1]").get()
+            tot_roi_raw = response.xpath("//button[text()='Total ROI']/following-sibling::p/text()[1]").get()
+            tot_roi = normalize_number(value=tot_roi_raw)
 
             # Extract the realized ROI
-            realized_roi = response.xpath("//button[text()='Total ROI']/../div//p[text()='Realized']/following-sibling::p/text()[1]").get()
+            realized_roi_raw = response.xpath("//button[text()='Total ROI']/../div//p[text()='Realized']/following-sibling::p/text()[1]").get()
+            realized_roi = normalize_number(value=realized_roi_raw)
             
             # Extract the unrealized ROI
-            unrealized_roi = response.xpath("//button[text()='Total ROI']/../div//p[text()='Unrealized']/following-sibling::p/text()[1]").get()
+            unrealized_roi_raw = response.xpath("//button[text()='Total ROI']/../div//p[text()='Unrealized']/following-sibling::p/text()[1]").get()
+            unrealized_roi = normalize_number(value=unrealized_roi_raw)
 
             # Extract the win rate
-            win_rate = response.xpath("//button[text()='Win Rate']/following-sibling::div/p/text()").get()
+            win_rate_raw = response.xpath("//button[text()='Win Rate']/following-sibling::div/p/text()").get()
+            win_rate = normalize_number(value=win_rate_raw)
 
             # Extract the number of wins
-            num_wins = response.xpath("//button[text()='Win Rate']/following-sibling::div//p[text()='Win']/following-sibling::p/text()").get()
+            num_wins_raw = response.xpath("//button[text()='Win Rate']/following-sibling::div//p[text()='Win']/following-sibling::p/text()").get()
+            num_wins = helper_treat_none_before_data_type_change(value=normalize_number(value=num_wins_raw), data_type="int")
 
             # Extract the number of losses
-            num_losses = response.xpath("//button[text()='Win Rate']/following-sibling::div//p[text()='Lose']/following-sibling::p/text()").get()
+            num_losses_raw = response.xpath("//button[text()='Win Rate']/following-sibling::div//p[text()='Lose']/following-sibling::p/text()").get()
+            num_losses = helper_treat_none_before_data_type_change(value=normalize_number(value=num_losses_raw), data_type="int")
 
             # Extract the trading volume
-            trading_volume = response.xpath("//button[text()='Trading Volume']/following-sibling::p/text()").get()
+            trading_volume_raw = response.xpath("//button[text()='Trading Volume']/following-sibling::p/text()").get()
+            trading_volume = normalize_number(value=trading_volume_raw)
 
             # Extract the number of trades
-            num_trades = response.xpath("//button[text()='Trades']/following-sibling::p/text()").get()
+            num_trades_raw = response.xpath("//button[text()='Trades']/following-sibling::p/text()").get()
+            num_trades = helper_treat_none_before_data_type_change(value=normalize_number(value=num_trades_raw), data_type="int")
 
             # Extract the average trade size
-            avg_trade_size = response.xpath("//button[text()='Avg. Trade Size']/following-sibling::p/span[1]/text()").get()
+            avg_trade_size_raw = response.xpath("//button[text()='Avg. Trade Size']/following-sibling::p/span[1]/text()").get()
+            avg_trade_size = normalize_number(value=avg_trade_size_raw)
 
             # Create the output dictionary
             output_dict = {
+                "chain": resp_chain,
                 "wallet_address": resp_wallet_address,
+                "tot_gross_profit_raw": tot_gross_profit_raw,
                 "tot_gross_profit": tot_gross_profit,
+                "realized_gross_profit_raw": realized_gross_profit_raw,
                 "realized_gross_profit": realized_gross_profit,
+                "unrealized_gross_profit_raw": unrealized_gross_profit_raw,
                 "unrealized_gross_profit": unrealized_gross_profit,
+                "tot_roi_raw": tot_roi_raw,
                 "tot_roi": tot_roi,
+                "realized_roi_raw": realized_roi_raw,
                 "realized_roi": realized_roi,
+                "unrealized_roi_raw": unrealized_roi_raw,
                 "unrealized_roi": unrealized_roi,
+                "win_rate_raw": win_rate_raw,
                 "win_rate": win_rate,
+                "num_wins_raw": num_wins_raw,
                 "num_wins": num_wins,
+                "num_losses_raw": num_losses_raw,
                 "num_losses": num_losses,
+                "trading_volume_raw": trading_volume_raw,
                 "trading_volume": trading_volume,
+                "num_trades_raw": num_trades_raw,
                 "num_trades": num_trades,
-                "avg_trade_size": avg_trade_size
+                "avg_trade_size_raw": avg_trade_size_raw,
+                "avg_trade_size": avg_trade_size,
+                "scraped_at": time.time()
             }
 
             # Yield the output dictionary
-            yield output_dict
\ No newline at end of file
+            yield DexCheckWalletScreener(**output_dict)
+            self.screened_wallet_counts.add(resp_wallet_count)
+            self.mark_work_done(stage=self.wallet_source, key=build_wallet_key(chain=resp_chain, wallet_address=resp_wallet_address))
+
+    def closed(self, reason):
+        # Report how much of the ranked wallet list was screened
+        from wallet_selection import report_screening_coverage
+        if self.tot_num_wallets is not None:
+            report_screening_coverage(spider=self, wallet_source=self.wallet_source, screened_wallet_counts=self.screened_wallet_counts, tot_num_wallets=self.tot_num_wallets)
@@ -1,111 +1,288 @@
 # Import libraries
+import time
 import scrapy
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
 from inputs import custom_scrapy_settings
-from helper_functions import *
-import re
+from feeds import build_feed
+from crawl_checkpoints import CheckpointedSpiderMixin
+from helper_functions import helper_treat_none_before_data_type_change
+from number_normalization import normalize_number
+from wallet_analyzer.items import DexScreenerTopGainers, DexScreenerTopGainersDelta
+from chains import build_top_gainers_url, parse_chains
+from lxml import etree
 
+# The rows of the top gainers table, compiled once
+TOP_GAINERS_ROWS_XPATH = etree.XPath("//div[@class='ds-dex-table ds-dex-table-top']/a")
 
-class DexScreenerTopGainersSpider(scrapy.Spider):
+# The prefix of the class that identifies the column of every cell of a row (e.g., "ds-dex-table-row-col-volume")
+COLUMN_CLASS_PREFIX = "ds-dex-table-row-col-"
+
+# The columns whose value is a text node of the cell itself, with the position of that text node.
+# A value rendered after a "$" (e.g., "$<!-- -->2.6M") is the second text node of its cell
+CELL_TEXT_COLUMNS = {
+    "price": ("asset_price_raw", 1),
+    "txns": ("asset_24_hr_txns_raw", 0),
+    "volume": ("asset_24_hr_volume_in_mil_raw", 1),
+    "makers": ("num_makers_raw", 0),
+    "liquidity": ("asset_liquidity_in_mil_raw", 1),
+    "market-cap": ("asset_market_cap_in_mil_raw", 1)
+}
+
+# The columns whose value is the first text node of the span inside the cell
+CELL_SPAN_TEXT_COLUMNS = {
+    "pair-age": "asset_age",
+    "price-change-m5": "asset_price_change_l5m_raw",
+    "price-change-h1": "asset_price_change_l1h_raw",
+    "price-change-h6": "asset_price_change_l6h_raw",
+    "price-change-h24": "asset_price_change_l24h_raw"
+}
+
+# The fields of a row that are not in a numeric column
+TOKEN_FIELDS = ["asset_name", "asset_name_text", "asset_gain_rank_raw", "asset_network", "dex"]
+
+# An empty row, copied for every row so that the fields of the missing cells are None
+EMPTY_TOP_GAINERS_ROW = dict.fromkeys(
+    TOKEN_FIELDS + [field for field, _ in CELL_TEXT_COLUMNS.values()] + list(CELL_SPAN_TEXT_COLUMNS.values())
+)
+
+## Row extraction
+def helper_text_node(element, position: int = 0):
+    """
+    A function to return the text node at a position among the text nodes that are direct children of an lxml element (i.e., what the XPath text()[position + 1] selects).
+    """
+    if element is None:
+        return None
+    if position == 0 and element.text is not None:
+        return element.text
+    text_nodes = [] if element.text is None else [element.text]
+    for child in element:
+        if child.tail is not None:
+            text_nodes.append(child.tail)
+    return text_nodes[position] if len(text_nodes) > position else None
+
+def helper_first_child(element, tag: str):
+    return next((child for child in element if child.tag == tag), None)
+
+def extract_top_gainers_row(row) -> dict:
+    """
+    A function to extract the displayed values of a row of the top gainers table. Every cell is visited once and mapped to its fields by its column class.
+    """
+    output_dict = EMPTY_TOP_GAINERS_ROW.copy()
+    for cell in row:
+        # Find the column of the cell from its class (e.g., "ds-table-data-cell ds-dex-table-row-col-volume" -> "volume")
+        cell_class = cell.get("class")
+        prefix_start = -1 if cell_class is None else cell_class.find(COLUMN_CLASS_PREFIX)
+        if prefix_start == -1:
+            continue
+        column = cell_class[prefix_start + len(COLUMN_CLASS_PREFIX):].split(" ", 1)[0]
+
+        if column in CELL_TEXT_COLUMNS:
+            field, position = CELL_TEXT_COLUMNS[column]
+            output_dict[field] = helper_text_node(cell, position)
+        elif column in CELL_SPAN_TEXT_COLUMNS:
+            output_dict[CELL_SPAN_TEXT_COLUMNS[column]] = helper_text_node(helper_first_child(cell, "span"))
+        elif column == "token":
+            # The token cell holds the gain rank badge, the chain and DEX icons, the token symbol and the token name
+            for child in cell:
+                child_classes = (child.get("class") or "").split()
+                if "ds-dex-table-row-badge-pair-no" in child_classes:
+                    output_dict["asset_gain_rank_raw"] = helper_text_node(child, 1) # "#<!-- -->1"
+                elif "ds-dex-table-row-chain-icon" in child_classes:
+                    output_dict["asset_network"] = child.get("title")
+                elif "ds-dex-table-row-dex-icon" in child_classes:
+                    output_dict["dex"] = child.get("title")
+                elif "ds-dex-table-row-base-token-symbol" in child_classes:
+                    output_dict["asset_name"] = helper_text_node(child)
+                elif "ds-dex-table-row-base-token-name" in child_classes:
+                    output_dict["asset_name_text"] = helper_text_node(helper_first_child(child, "span"))
+    return output_dict
+
+## Snapshot diffs
+def diff_top_gainers_snapshots(previous_snapshot: dict, current_snapshot: dict, min_rank_change: int, min_price_change_pct: float) -> list:
+    """
+    A function to compare two polls of the top gainers list of a chain, both keyed by asset URL with (asset_name, asset_gain_rank, asset_price) values.
+    Returns the new assets, the dropped assets, and the assets whose gain rank moved by at least min_rank_change places or whose price moved by at least min_price_change_pct percent.
+    An asset whose rank and price both changed is reported once, as a rank change that also holds its price change.
+    """
+    deltas = []
+    for asset_url, (asset_name, asset_gain_rank, asset_price) in current_snapshot.items():
+        delta = {"asset_name": asset_name, "asset_url": asset_url, "asset_gain_rank": asset_gain_rank, "asset_price": asset_price}
+        if asset_url not in previous_snapshot:
+            deltas.append({**delta, "change_type": "new"})
+            continue
+
+        _, previous_gain_rank, previous_price = previous_snapshot[asset_url]
+        price_change_pct = (asset_price - previous_price) / previous_price * 100 if asset_price is not None and previous_price else None
+        rank_changed = asset_gain_rank is not None and previous_gain_rank is not None and abs(asset_gain_rank - previous_gain_rank) >= min_rank_change
+        price_changed = price_change_pct is not None and abs(price_change_pct) >= min_price_change_pct
+        if rank_changed or price_changed:
+            deltas.append({
+                **delta,
+                "change_type": "rank_change" if rank_changed else "price_change",
+                "previous_gain_rank": previous_gain_rank,
+                "previous_price": previous_price,
+                "price_change_pct": round(price_change_pct, 2) if price_change_pct is not None else None
+            })
+
+    for asset_url, (asset_name, previous_gain_rank, previous_price) in previous_snapshot.items():
+        if asset_url not in current_snapshot:
+            deltas.append({"asset_name": asset_name, "asset_url": asset_url, "change_type": "dropped", "previous_gain_rank": previous_gain_rank, "previous_price": previous_price})
+    return deltas
+
+
+class DexScreenerTopGainersSpider(CheckpointedSpiderMixin, scrapy.Spider):
     name = "dex_screener_top_gainers"
     custom_settings = custom_scrapy_settings.copy() # Define the custom settings of the spider
     custom_settings["LOG_FILE"] = "dex_screener_top_gainers.log"
     custom_settings["FEEDS"] = {
-        'dex_screener_top_gainers.json': {
-            'format': 'json',
-            'overwrite': True
-        }
+        **build_feed(feed_name="dex_screener_top_gainers", item_classes=['wallet_analyzer.items.DexScreenerTopGainers']),
+        **build_feed(feed_name="dex_screener_top_gainers_deltas", item_classes=['wallet_analyzer.items.DexScreenerTopGainersDelta'])
     }
-    base_url = "https://dexscreener.com/gainers/solana?min24HSells=30&min24HTxns=300&min24HVol=500000&minLiq=250000&minMarketCap=1000000&order=desc&rankBy=priceChangeH24" # Volume > 500k, Liquidity > 250k, MCap > 1M
+    poll_callback = None # The callback of the polls of the watch mode, if another spider runs this one as a stage (see WalletAnalyzerPipelineSpider)
+
+    def __init__(
+        self, chains: str = "solana", min_24h_sells: int = None, min_24h_txns: int = None, min_24h_vol: int = None, min_liq: int = None, min_market_cap: int = None,
+        watch_interval: float = 0, watch_max_polls: int = 0, min_rank_change: int = 5, min_price_change_pct: float = 10, *args, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+
+        # The watch mode (e.g., -a watch_interval=300): the top gainers page of every chain is polled again watch_interval seconds after the previous poll was parsed,
+        # until watch_max_polls polls were parsed (0 = until the crawl is stopped). Only the assets that were never seen before are yielded as top gainers (and trigger the top traders
+        # stage of the pipeline spider), and the changes between two polls are yielded as deltas. 0 parses the pages once, as a cron run does
+        self.watch_interval = helper_treat_none_before_data_type_change(value=watch_interval, data_type="float") or 0
+        self.watch_max_polls = helper_treat_none_before_data_type_change(value=watch_max_polls, data_type="int") or 0
+        self.min_rank_change = helper_treat_none_before_data_type_change(value=min_rank_change, data_type="int")
+        self.min_price_change_pct = helper_treat_none_before_data_type_change(value=min_price_change_pct, data_type="float")
+        self.snapshots = {} # chain -> {asset_url: (asset_name, asset_gain_rank, asset_price)} of the previous poll
+        self.poll_numbers = {} # chain -> number of polls parsed
+        self.pending_polls = {} # chain -> the delayed call of its next poll
+        self.seen_asset_urls = set()
+
+        # The chains to crawl (e.g., -a chains=solana,ethereum,base,bsc) and the filters of their top gainers pages (spider arguments are passed as strings)
+        self.chains = parse_chains(chains=chains)
+        filters = {
+            "min24HSells": helper_treat_none_before_data_type_change(value=min_24h_sells, data_type="int"),
+            "min24HTxns": helper_treat_none_before_data_type_change(value=min_24h_txns, data_type="int"),
+            "min24HVol": helper_treat_none_before_data_type_change(value=min_24h_vol, data_type="int"),
+            "minLiq": helper_treat_none_before_data_type_change(value=min_liq, data_type="int"),
+            "minMarketCap": helper_treat_none_before_data_type_change(value=min_market_cap, data_type="int")
+        }
+        self.top_gainers_urls = {
+            chain: build_top_gainers_url(chain=chain, filters={k: v for k, v in filters.items() if v is not None})
+            for chain in self.chains
+        }
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
 
     ## Start scraping
     def start_requests(self):
-        # Send a request to the base URL
-        self.logger.info("Sending a request to the base URL")
-        yield scrapy.Request(
-            url=self.base_url,
+        # Send the requests of all the chains at once, so that their top gainers pages are rendered in parallel
+        for chain, top_gainers_url in self.top_gainers_urls.items():
+            # Skip the top gainers pages that the run that is being resumed already parsed
+            if self.is_work_done(stage="top_gainers", key=top_gainers_url):
+                self.logger.info(f"The top gainers page of the chain {chain} was already parsed by the resumed run")
+                continue
+
+            self.logger.info(f"Sending a request to the top gainers page of the chain {chain}")
+            self.mark_work_pending(stage="top_gainers", key=top_gainers_url, payload={"chain": chain})
+            yield self.build_top_gainers_request(chain=chain)
+
+    def build_top_gainers_request(self, chain: str):
+        """
+        A function to build the request that renders the top gainers page of a chain.
+        """
+        return scrapy.Request(
+            url=self.top_gainers_urls[chain],
             callback=self.parse_top_gainers,
             meta={
                 "zyte_api_automap": {
                     "browserHtml": True,
                 },
-            }
+                "chain": chain,
+                "dont_cache": self.watch_interval > 0 # Every poll of the watch mode needs a fresh render, not the cached response
+            },
+            errback=self.handle_poll_error if self.watch_interval > 0 else None,
+            dont_filter=self.watch_interval > 0 # The polls request the same URL again
         )
 
     def parse_top_gainers(self, response):
         # Log a status message
-        self.logger.info("Parsing the response from the base URL")
+        chain = response.meta["chain"]
+        self.logger.info(f"Parsing the response from the top gainers page of the chain {chain}")
+
+        # Extract the rows of the top gainers table
+        results = TOP_GAINERS_ROWS_XPATH(response.selector.root)
+        poll_number = self.poll_numbers[chain] = self.poll_numbers.get(chain, 0) + 1
+        current_snapshot = {}
 
-        # Extract a list of results
-        results = response.xpath("//div[@class='ds-dex-table ds-dex-table-top']/a")
+        # A poll that did not render the table would report every asset as dropped, so it is skipped and the page is polled again
+        if not results and chain in self.snapshots:
+            self.logger.warning(f"The poll {poll_number} of the top gainers page of the chain {chain} has no rows. Keeping the previous snapshot")
+            self.schedule_next_poll(chain=chain)
+            return
 
         # Parse the response
         for res in results:
-            # Extract the asset name
-            asset_name = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-token']/span[contains(@class, 'ds-dex-table-row-base-token-symbol')]/text()").get()
-            
-            # Extract the asset name text
-            asset_name_text = res.xpath(".//div[@class='ds-table-data-cell ds-dex-table-row-col-token']/div[@class='ds-dex-table-row-base-token-name']/span/text()[1]").get()
-            
+            # Extract the displayed values of all the columns in a single pass over the cells of the row
+            row = extract_top_gainers_row(res)
+
+            # Extract the asset name, the asset name text, the network and the DEX
+            asset_name = row["asset_name"]
+            asset_name_text = row["asset_name_text"]
+            asset_network = row["asset_network"]
+            dex = row["dex"]
+
             # Extract the asset URL
-            asset_url = "https://dexscreener.com" + res.xpath("./@href").get()
+            asset_url = "https://dexscreener.com" + res.get("href")
 
             # Extract the 24-hour gain rank
-            asset_gain_rank_raw = res.xpath(".//span[@class='ds-dex-table-row-badge-pair-no']/text()[2]").get()
+            asset_gain_rank_raw = row["asset_gain_rank_raw"]
             asset_gain_rank = helper_treat_none_before_data_type_change(value=asset_gain_rank_raw, data_type="int")
-            
-            # Extract the network
-            asset_network = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-token']/img[@class='ds-dex-table-row-chain-icon']/@title").get()
 
-            # Extract the DEX
-            dex = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-token']/img[@class='ds-dex-table-row-dex-icon']/@title").get()
-            
             # Extract the latest price in dollars
-            asset_price_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price']/text()[2]").get()
-            if asset_price_raw is not None:
-                asset_price = re.sub(pattern=",", repl="", string=asset_price_raw)
-                asset_price = helper_treat_none_before_data_type_change(value=asset_price, data_type="float")
-            
+            asset_price_raw = row["asset_price_raw"]
+            asset_price = normalize_number(value=asset_price_raw)
+
             # Extract the asset age in hours
-            asset_age = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-pair-age']/span/text()").get()
-            
+            asset_age = row["asset_age"]
+
             # Extract the asset's number of transactions in the last 24 hours
-            asset_24_hr_txns_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-txns']/text()").get()
-            asset_24_hr_txns = helper_treat_none_before_data_type_change(value=re.sub(pattern=",", repl="", string=asset_24_hr_txns_raw), data_type="int")
-            
-            # Extract the asset's volume in the last 24 hours
-            asset_24_hr_volume_in_mil_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-volume']/text()[2]").get()
-            asset_24_hr_volume_in_mil = helper_normalize_numbers_in_vol_liq_mcap(value=asset_24_hr_volume_in_mil_raw)
-            
+            asset_24_hr_txns_raw = row["asset_24_hr_txns_raw"]
+            asset_24_hr_txns = helper_treat_none_before_data_type_change(value=normalize_number(value=asset_24_hr_txns_raw), data_type="int")
+
             # Extract the asset's volume in the last 24 hours
-            num_makers_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-makers']/text()").get()
-            num_makers = helper_treat_none_before_data_type_change(value=re.sub(pattern=",", repl="", string=num_makers_raw), data_type="int")
-            
-            # Extract the asset's price change in the last 5 minutes
-            asset_price_change_l5m_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-m5']/span/text()").get()
-            asset_price_change_l5m = helper_normalize_numbers_in_pct_gains(value=asset_price_change_l5m_raw)
-            
-            # Extract the asset's price change in the last hour
-            asset_price_change_l1h_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-h1']/span/text()").get()
-            asset_price_change_l1h = helper_normalize_numbers_in_pct_gains(value=asset_price_change_l1h_raw)
-            
-            # Extract the asset's price change in the last 6 hours
-            asset_price_change_l6h_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-h6']/span/text()").get()
-            asset_price_change_l6h = helper_normalize_numbers_in_pct_gains(value=asset_price_change_l6h_raw)
-            
-            # Extract the asset's price change in the last 24 hours
-            asset_price_change_l24h_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-price-change-h24']/span/text()").get()
-            asset_price_change_l24h = helper_normalize_numbers_in_pct_gains(value=asset_price_change_l24h_raw)
-            
+            asset_24_hr_volume_in_mil_raw = row["asset_24_hr_volume_in_mil_raw"]
+            asset_24_hr_volume_in_mil = normalize_number(value=asset_24_hr_volume_in_mil_raw, unit="millions")
+
+            # Extract the asset's number of makers in the last 24 hours
+            num_makers_raw = row["num_makers_raw"]
+            num_makers = helper_treat_none_before_data_type_change(value=normalize_number(value=num_makers_raw), data_type="int")
+
+            # Extract the asset's price changes in the last 5 minutes, hour, 6 hours and 24 hours
+            asset_price_change_l5m_raw = row["asset_price_change_l5m_raw"]
+            asset_price_change_l5m = normalize_number(value=asset_price_change_l5m_raw)
+            asset_price_change_l1h_raw = row["asset_price_change_l1h_raw"]
+            asset_price_change_l1h = normalize_number(value=asset_price_change_l1h_raw)
+            asset_price_change_l6h_raw = row["asset_price_change_l6h_raw"]
+            asset_price_change_l6h = normalize_number(value=asset_price_change_l6h_raw)
+            asset_price_change_l24h_raw = row["asset_price_change_l24h_raw"]
+            asset_price_change_l24h = normalize_number(value=asset_price_change_l24h_raw)
+
             # Extract the asset's liquidity
-            asset_liquidity_in_mil_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-liquidity']/text()[2]").get()
-            asset_liquidity_in_mil = helper_normalize_numbers_in_vol_liq_mcap(value=asset_liquidity_in_mil_raw)
-            
-            # Extract the asset's market cap
-            asset_market_cap_in_mil_raw = res.xpath("./div[@class='ds-table-data-cell ds-dex-table-row-col-market-cap']/text()[2]").get()
-            asset_market_cap_in_mil = helper_normalize_numbers_in_vol_liq_mcap(value=asset_market_cap_in_mil_raw)
+            asset_liquidity_in_mil_raw = row["asset_liquidity_in_mil_raw"]
+            asset_liquidity_in_mil = normalize_number(value=asset_liquidity_in_mil_raw, unit="millions")
 
+            # Extract the asset's market cap
+            asset_market_cap_in_mil_raw = row["asset_market_cap_in_mil_raw"]
+            asset_market_cap_in_mil = normalize_number(value=asset_market_cap_in_mil_raw, unit="millions")
             # Yield the output dictionary
             output_dict = {
+                "chain": chain,
                 "asset_name": asset_name,
                 "asset_name_text": asset_name_text,
                 "asset_url": asset_url,
@@ -136,4 +313,59 @@ class DexScreenerTopGainersSpider(scrapy.Spider):
                 "asset_market_cap_in_mil": asset_market_cap_in_mil
             }
 
-            yield output_dict
\ No newline at end of file
+            # In watch mode, only yield the assets that were never seen before
+            current_snapshot[asset_url] = (asset_name, asset_gain_rank, asset_price)
+            if asset_url not in self.seen_asset_urls:
+                yield DexScreenerTopGainers(**output_dict)
+            if self.watch_interval > 0:
+                self.seen_asset_urls.add(asset_url)
+
+        # Yield the changes since the previous poll (the first poll is the baseline), then schedule the next poll
+        if self.watch_interval > 0:
+            if chain in self.snapshots:
+                deltas = diff_top_gainers_snapshots(previous_snapshot=self.snapshots[chain], current_snapshot=current_snapshot, min_rank_change=self.min_rank_change, min_price_change_pct=self.min_price_change_pct)
+                self.logger.info(f"The poll {poll_number} of the top gainers page of the chain {chain} has {len(deltas)} changes: {sum(delta['change_type'] == 'new' for delta in deltas)} new and {sum(delta['change_type'] == 'dropped' for delta in deltas)} dropped assets")
+                polled_at = time.time()
+                for delta in deltas:
+                    yield DexScreenerTopGainersDelta(chain=chain, poll_number=poll_number, polled_at=polled_at, **delta)
+            self.snapshots[chain] = current_snapshot
+            self.schedule_next_poll(chain=chain)
+
+        # Record that the top gainers page of the chain has been parsed
+        self.mark_work_done(stage="top_gainers", key=self.top_gainers_urls[chain])
+
+    ## Watch mode
+    def schedule_next_poll(self, chain: str):
+        """
+        A function to poll the top gainers page of a chain again in watch_interval seconds, unless watch_max_polls polls were parsed.
+        """
+        if self.watch_interval <= 0 or (self.watch_max_polls > 0 and self.poll_numbers.get(chain, 0) >= self.watch_max_polls):
+            return
+        from twisted.internet import reactor # Imported here, as importing it outside of a crawl installs the default reactor
+        self.pending_polls[chain] = reactor.callLater(self.watch_interval, self.poll_top_gainers, chain)
+
+    def poll_top_gainers(self, chain: str):
+        self.pending_polls.pop(chain, None)
+        self.logger.info(f"Polling the top gainers page of the chain {chain} again")
+        request = self.build_top_gainers_request(chain=chain)
+        self.crawler.engine.crawl(request if self.poll_callback is None else request.replace(callback=self.poll_callback))
+
+    def handle_poll_error(self, failure):
+        # A failed poll does not stop the watch mode of its chain
+        chain = failure.request.meta["chain"]
+        self.logger.error(f"The poll of the top gainers page of the chain {chain} failed: {failure.value!r}. Polling it again in {self.watch_interval} seconds")
+        self.schedule_next_poll(chain=chain)
+
+    def spider_idle(self):
+        # Keep the crawl open between two polls of the watch mode
+        if self.pending_polls:
+            raise DontCloseSpider
+
+    def stop_watching(self):
+        for delayed_call in self.pending_polls.values():
+            if delayed_call.active():
+                delayed_call.cancel()
+        self.pending_polls.clear()
+
+    def closed(self, reason):
+        self.stop_watching()
\ No newline at end of file
@@ -1,131 +1,187 @@
 # Import libraries
 import scrapy
 from inputs import custom_scrapy_settings
-from helper_functions import *
-import re
-import json
-import pandas as pd
+from feeds import build_feed, iter_feed_items
+from crawl_checkpoints import CheckpointedSpiderMixin
+from helper_functions import helper_treat_none_before_data_type_change
+from number_normalization import normalize_number
+from wallet_analyzer.items import DexScreenerTopTraders
+from chains import chain_from_asset_url, extract_wallet_address
+from crawl_metrics import metrics
 
+# The rows of the top traders tab (i.e., the siblings that follow its header row)
+TOP_TRADERS_ROWS_XPATH = "//span[text() = 'bought']/../../following-sibling::div"
 
-class DexScreenerTopTradersSpider(scrapy.Spider):
+# The script that scrolls the last rendered trader into view, so that the page loads the next traders of the list.
+# Scrolling the row itself works whether the list scrolls with the window or inside its own container
+SCROLL_TO_LAST_TRADER_SCRIPT = (
+    f'const rows = document.evaluate("{TOP_TRADERS_ROWS_XPATH}", document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);'
+    " if (rows.snapshotLength > 0) { rows.snapshotItem(rows.snapshotLength - 1).scrollIntoView({block: 'end'}); }"
+)
+
+# The buckets of the number of traders extracted from a single render of a top traders tab
+TRADERS_PER_RENDER_BUCKETS = (10, 25, 50, 100, 200, 500, 1000)
+
+
+class DexScreenerTopTradersSpider(CheckpointedSpiderMixin, scrapy.Spider):
     name = "dex_screener_top_traders"
     custom_settings = custom_scrapy_settings.copy() # Define the custom settings of the spider
     custom_settings["LOG_FILE"] = "dex_screener_top_traders.log"
-    custom_settings["FEEDS"] = {
-        'dex_screener_top_traders.json': {
-            'format': 'json',
-            'overwrite': True
-        }
-    }
-    
+    custom_settings["FEEDS"] = build_feed(feed_name="dex_screener_top_traders")
+    scroll_wait_secs = 1 # The time given to the page to load the next traders after every scroll
+
+    def __init__(self, trader_scroll_depth: int = 0, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # The number of times the top traders list is scrolled to its last trader within the browser session (spider arguments are passed as strings).
+        # 0 only parses the traders of the first render. Every scroll adds about scroll_wait_secs to the render, which Zyte caps per request
+        self.trader_scroll_depth = helper_treat_none_before_data_type_change(value=trader_scroll_depth, data_type="int") or 0
+
     def start_requests(self):
-        # Open the JSON file dex_screener_top_gainers.json
-        self.logger.info("Opening the JSON file dex_screener_top_gainers.json")
-        with open("dex_screener_top_gainers.json", "r") as f:
-            # Load the JSON file
-            df_top_gainers = json.load(f)
-        
-            # Change the top_gainers to a pandas data frame
-            df_top_gainers = pd.DataFrame(df_top_gainers)
+        # Stream the assets of the top gainers feed, so that the first request is sent as soon as the first asset is read
+        self.logger.info("Reading the top gainers feed dex_screener_top_gainers")
+        for asset in iter_feed_items(feed_name="dex_screener_top_gainers"):
+            asset_name, asset_url = asset["asset_name"], asset["asset_url"]
+            chain = asset.get("chain") or chain_from_asset_url(asset_url=asset_url) # The feeds written before the crawls became multi-chain have no chain
+
+            # Skip the assets whose top traders were already parsed by the run that is being resumed
+            if self.is_work_done(stage="top_traders", key=asset_url):
+                self.logger.info(f"Skipping the asset name {asset_name} with URL: {asset_url}, which was already parsed by the resumed run")
+                continue
 
-        # Send a request to each individual asset URL
-        for asset_name, asset_url in zip(df_top_gainers["asset_name"], df_top_gainers["asset_url"]):
             # Send a request to the asset URL
             self.logger.info(f"Sending a request to the asset name {asset_name} with URL: {asset_url}")
-            yield scrapy.Request(
-                url=asset_url,
-                callback=self.parse_top_traders,
-                meta={
-                    "zyte_api_automap": {
-                        "browserHtml": True,
-                        "javascript": True,
-                        "actions": [
-                            # Wait for the Top Traders Button
-                            {
-                                "action": "waitForSelector",
-                                "timeout": 10,
-                                "onError": "return",
-                                "selector": {
-                                    "type": "xpath",
-                                    "value": "//button[text() = 'Top Traders']",
-                                    "state": "attached"
-                                }
-                            },
-                            # Click on the Top Traders Button
-                            {
-                                "action": "click",
-                                "delay": 0,
-                                "button": "left",
-                                "onError": "return",
-                                "selector": {
-                                    "type": "xpath",
-                                    "value": "//button[text() = 'Top Traders']",
-                                    "state": "attached"
-                                }
-                            },
-                        ]
-                    },
-
-                    # Meta data
-                    "asset_name": asset_name,
-                    "asset_url": asset_url
+            self.mark_work_pending(stage="top_traders", key=asset_url, payload={"asset_name": asset_name, "chain": chain})
+            yield self.build_top_traders_request(asset_name=asset_name, asset_url=asset_url, chain=chain)
+
+    def build_top_traders_request(self, asset_name: str, asset_url: str, chain: str):
+        """
+        A function to build the request that renders the top traders tab of an asset.
+        """
+        return scrapy.Request(
+            url=asset_url,
+            callback=self.parse_top_traders,
+            meta={
+                "zyte_api_automap": {
+                    "browserHtml": True,
+                    "javascript": True,
+                    "actions": [
+                        # Wait for the Top Traders Button
+                        {
+                            "action": "waitForSelector",
+                            "timeout": 10,
+                            "onError": "return",
+                            "selector": {
+                                "type": "xpath",
+                                "value": "//button[text() = 'Top Traders']",
+                                "state": "attached"
+                            }
+                        },
+                        # Click on the Top Traders Button
+                        {
+                            "action": "click",
+                            "delay": 0,
+                            "button": "left",
+                            "onError": "return",
+                            "selector": {
+                                "type": "xpath",
+                                "value": "//button[text() = 'Top Traders']",
+                                "state": "attached"
+                            }
+                        },
+                        # Scroll the traders list to load the traders beyond the first page
+                        *self.build_scroll_actions()
+                    ]
+                },
+
+                # Meta data
+                "asset_name": asset_name,
+                "asset_url": asset_url,
+                "chain": chain
+            }
+        )
+
+    def build_scroll_actions(self) -> list:
+        """
+        A function to build the Zyte actions that scroll the top traders list trader_scroll_depth times, waiting for the next traders to load after every scroll.
+        All the traders are then extracted from the final DOM of the same render, so the extra traders do not cost extra requests.
+        """
+        if self.trader_scroll_depth <= 0:
+            return []
+
+        scroll_actions = [
+            # Wait for the first traders to be rendered after the click on the Top Traders Button
+            {
+                "action": "waitForSelector",
+                "timeout": 10,
+                "onError": "return",
+                "selector": {
+                    "type": "xpath",
+                    "value": TOP_TRADERS_ROWS_XPATH,
+                    "state": "attached"
                 }
-            )
+            }
+        ]
+        for _ in range(self.trader_scroll_depth):
+            scroll_actions.append({"action": "evaluate", "source": SCROLL_TO_LAST_TRADER_SCRIPT, "onError": "return"})
+            scroll_actions.append({"action": "waitForTimeout", "timeout": self.scroll_wait_secs, "onError": "return"})
+        return scroll_actions
 
     def parse_top_traders(self, response):
         # Log a status message
         self.logger.info(f"Parsing the response of the asset {response.meta['asset_name']} with URL {response.meta['asset_url']}")
         
         # Extract the top traders list of results
-        top_trader_results = response.xpath("//span[text() = 'bought']/../../following-sibling::div")
+        top_trader_results = response.xpath(TOP_TRADERS_ROWS_XPATH)
+        self.logger.info(f"Found {len(top_trader_results)} traders for the asset {response.meta['asset_name']} after scrolling the list {self.trader_scroll_depth} times")
+        metrics.observe("top_traders_per_render", len(top_trader_results), buckets=TRADERS_PER_RENDER_BUCKETS, scroll_depth=self.trader_scroll_depth)
 
         # Extract the meta data
         asset_name = response.meta["asset_name"]
         asset_url = response.meta["asset_url"]
+        chain = response.meta["chain"]
 
         # Parse the response
         for tr in top_trader_results:
             # Extract the trader bought amount in USD
             trader_bought_usd_raw = tr.xpath(".//span[@class='chakra-text custom-rcecxm']/text()").get()
-            trader_bought_usd = helper_normalize_numbers_in_txn_data(value=trader_bought_usd_raw)
+            trader_bought_usd = normalize_number(value=trader_bought_usd_raw)
 
             # Extract the trader bought amount in crypto units
             trader_bought_crypto_raw = tr.xpath(".//span[@class='chakra-text custom-rcecxm']/following-sibling::span/span[1]/text()").get()
-            trader_bought_crypto = helper_normalize_numbers_in_txn_data(value=trader_bought_crypto_raw)
+            trader_bought_crypto = normalize_number(value=trader_bought_crypto_raw)
             
             # Extract the number of buy TXNs
             trader_buy_txns_raw = tr.xpath(".//span[@class='chakra-text custom-rcecxm']/following-sibling::span/span[3]/text()").get()
-            trader_buy_txns = helper_normalize_numbers_in_txn_data(value=trader_buy_txns_raw)
+            trader_buy_txns = normalize_number(value=trader_buy_txns_raw)
             trader_buy_txns = helper_treat_none_before_data_type_change(value=trader_buy_txns, data_type="int")
 
             # Extract the trader sold amount in USD
             trader_sold_usd_raw = tr.xpath(".//span[@class='chakra-text custom-dv3t8y']/text()").get()
-            trader_sold_usd = helper_normalize_numbers_in_txn_data(value=trader_sold_usd_raw)
+            trader_sold_usd = normalize_number(value=trader_sold_usd_raw)
             
             # Extract the trader sold amount in crypto units
             trader_sold_crypto_raw = tr.xpath(".//span[@class='chakra-text custom-dv3t8y']/following-sibling::span/span[1]/text()").get()
-            trader_sold_crypto = helper_normalize_numbers_in_txn_data(value=trader_sold_crypto_raw)
+            trader_sold_crypto = normalize_number(value=trader_sold_crypto_raw)
             
             # Extract the number of sell TXNs
             trader_sell_txns_raw = tr.xpath(".//span[@class='chakra-text custom-dv3t8y']/following-sibling::span/span[3]/text()").get()
-            trader_sell_txns = helper_normalize_numbers_in_txn_data(value=trader_sell_txns_raw)
+            trader_sell_txns = normalize_number(value=trader_sell_txns_raw)
             trader_sell_txns = helper_treat_none_before_data_type_change(value=trader_sell_txns, data_type="int")
             
             # Extract the PnL
             trader_pnl_raw = tr.xpath(".//div[@class='custom-1e9y0rl']/text()").get()
-            trader_pnl = helper_normalize_numbers_in_txn_data(value=trader_pnl_raw)
+            trader_pnl = normalize_number(value=trader_pnl_raw)
 
-            # Extract the SOL scan URL
+            # Extract the block explorer URL of the trader (e.g., solscan.io on Solana, etherscan.io on Ethereum)
             sol_scan_url = tr.xpath(".//a[@aria-label='Open in block explorer']/@href").get()
 
-            # Extract the wallet_address
-            if sol_scan_url is not None:
-                wallet_address = re.findall(pattern=r"(?<=account\/).*", string=sol_scan_url)[0]
-            else:
-                wallet_address = None
+            # Extract the wallet_address from the block explorer URL of the chain
+            wallet_address = extract_wallet_address(explorer_url=sol_scan_url, chain=chain)
 
             # Yield the output dictionary
             output_dict = {
+                "chain": chain,
                 "asset_name": asset_name,
                 "asset_url": asset_url,
                 "trader_bought_usd_raw": trader_bought_usd_raw,
@@ -135,7 +191,6 @@ class DexScreenerTopTradersSpider(scrapy.Spider):
                 "trader_buy_txns_raw": trader_buy_txns_raw,
                 "trader_buy_txns": trader_buy_txns,
                 "trader_sold_usd_raw": trader_sold_usd_raw,
-                "trader_sold_usd_raw": trader_sold_usd_raw,
                 "trader_sold_usd": trader_sold_usd,
                 "trader_sold_crypto_raw": trader_sold_crypto_raw,
                 "trader_sold_crypto": trader_sold_crypto,
@@ -147,4 +202,7 @@ class DexScreenerTopTradersSpider(scrapy.Spider):
                 "wallet_address": wallet_address
             }
 
-            yield output_dict
\ No newline at end of file
+            yield DexScreenerTopTraders(**output_dict)
+
+        # Record that the top traders of the asset have been parsed
+        self.mark_work_done(stage="top_traders", key=asset_url)
\ No newline at end of file
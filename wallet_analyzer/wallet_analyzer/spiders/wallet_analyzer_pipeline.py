@@ -0,0 +1,228 @@
+# Import libraries
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from inputs import custom_scrapy_settings
+from feeds import build_feed, iter_feed_items
+from crawl_checkpoints import CheckpointedSpiderMixin
+from chains import DEFAULT_CHAIN, build_wallet_key
+from wallet_fetch import API_FETCH_MODE
+from wallet_aggregation import WalletAggregationIndex, helper_screening_priority, write_wallet_aggregates
+from wallet_analyzer.items import DexScreenerTopGainers
+from wallet_analyzer.spiders.dex_screener_top_gainers import DexScreenerTopGainersSpider
+from wallet_analyzer.spiders.dex_screener_top_traders import DexScreenerTopTradersSpider
+from wallet_analyzer.spiders.dex_check_wallet_screener import DexCheckWalletScreenerSpider
+from wallet_analyzer.spiders.gmgn_ai_wallet_screener import GmgnAiWalletScreenerSpider
+
+
+class WalletAnalyzerPipelineSpider(CheckpointedSpiderMixin, scrapy.Spider):
+    """
+    A spider that runs the four stages (top gainers -> top traders -> wallet screeners) in a single crawl, over one or more chains.
+    Every asset parsed from the top gainers page is scheduled right away for top-trader scraping, and every wallet
+    parsed from a top traders tab is scheduled right away for wallet screening, so there are no barriers between the stages.
+    """
+    name = "wallet_analyzer_pipeline"
+    custom_settings = custom_scrapy_settings.copy() # Define the custom settings of the spider
+    custom_settings["LOG_FILE"] = "wallet_analyzer_pipeline.log"
+    custom_settings["FEEDS"] = {
+        **build_feed(feed_name="dex_screener_top_gainers", item_classes=['wallet_analyzer.items.DexScreenerTopGainers']),
+        **build_feed(feed_name="dex_screener_top_gainers_deltas", item_classes=['wallet_analyzer.items.DexScreenerTopGainersDelta']),
+        **build_feed(feed_name="dex_screener_top_traders", item_classes=['wallet_analyzer.items.DexScreenerTopTraders']),
+        **build_feed(feed_name="dex_check_wallet_screener", item_classes=['wallet_analyzer.items.DexCheckWalletScreener']),
+        **build_feed(feed_name="gmgn_ai_wallet_screener", item_classes=['wallet_analyzer.items.GmgnAiWalletScreener'])
+    }
+    wallet_screener_stages = {
+        "dex_check": DexCheckWalletScreenerSpider,
+        "gmgn_ai": GmgnAiWalletScreenerSpider
+    }
+
+    def __init__(self, wallet_screeners: str = "dex_check,gmgn_ai", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Instantiate the stage spiders. They are only used for their request builders and parse callbacks.
+        # The chains and the filters of the top gainers pages (e.g., -a chains=solana,base -a min_liq=100000) are passed on to the top gainers stage, and so is its watch mode
+        # (e.g., -a watch_interval=300), in which only the assets that appear in a poll for the first time are sent to the top traders stage
+        self.top_gainers_stage = DexScreenerTopGainersSpider(*args, **kwargs)
+        self.top_traders_stage = DexScreenerTopTradersSpider(*args, **kwargs)
+        self.wallet_stages = {
+            stage_name: self.wallet_screener_stages[stage_name](*args, **kwargs)
+            for stage_name in wallet_screeners.split(",")
+        }
+
+        # Keep track of the wallets that have already been scheduled for screening, keyed by their chain and address
+        self.scheduled_wallets = set()
+
+        # Index the positions of every wallet across the assets as the top traders stream in. The consolidated record of every wallet is written when the crawl closes
+        self.wallet_index = WalletAggregationIndex()
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+
+        # Share the crawler and the checkpoint with the stage spiders without connecting their signals a second time
+        for stage in [spider.top_gainers_stage, spider.top_traders_stage, *spider.wallet_stages.values()]:
+            stage.crawler = crawler
+            stage.settings = crawler.settings
+            stage.checkpoint = spider.checkpoint
+            stage.resume_crawl = spider.resume_crawl
+
+        # Route the polls of the watch mode of the top gainers stage through this spider, and keep the crawl open between them
+        spider.top_gainers_stage.poll_callback = spider.parse_top_gainers
+        crawler.signals.connect(spider.top_gainers_stage.spider_idle, signal=signals.spider_idle)
+
+        # Send the wallet batches of the JSON endpoints that are not full once no more wallets are coming
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def start_requests(self):
+        # Send the requests to the top gainers pages of all the chains at once, skipping the pages that the run that is being resumed already parsed
+        for request in self.top_gainers_stage.start_requests():
+            yield request.replace(callback=self.parse_top_gainers)
+
+        if not self.resume_crawl:
+            return
+
+        # Rebuild the wallet index from the top traders that the resumed run already parsed (its feed is appended to)
+        try:
+            for trader in iter_feed_items(feed_name="dex_screener_top_traders"):
+                self.wallet_index.add_trader(trader)
+        except FileNotFoundError:
+            pass
+
+        # Re-issue the outstanding top traders requests of the resumed run
+        for asset_url, payload, _ in self.checkpoint.pending_units(stage="top_traders"):
+            self.logger.info(f"Resuming the top traders request of the asset name {payload['asset_name']} with URL: {asset_url}")
+            yield self.top_traders_stage.build_top_traders_request(
+                asset_name=payload["asset_name"],
+                asset_url=asset_url,
+                chain=payload.get("chain", DEFAULT_CHAIN) # The checkpoints written before the crawls became multi-chain have no chain
+            ).replace(callback=self.parse_top_traders)
+
+        # Re-issue the outstanding wallet screening requests of the resumed run with the retries they already spent
+        for stage_name, stage in self.wallet_stages.items():
+            self.scheduled_wallets.update(self.checkpoint.keys(stage=stage.wallet_source))
+            for wallet_key, payload, request_counter in self.checkpoint.pending_units(stage=stage.wallet_source):
+                # The checkpoints written before the crawls became multi-chain are keyed by the Solana wallet address alone
+                chain, wallet_address = (payload["chain"], payload["wallet_address"]) if payload else (DEFAULT_CHAIN, wallet_key)
+                self.scheduled_wallets.add(build_wallet_key(chain=chain, wallet_address=wallet_address))
+                self.logger.info(f"Resuming the {stage_name} screening request of the wallet address: {wallet_address} on {chain}. Try {request_counter} out of {stage.max_retries}.")
+                for request in stage.add_wallet_to_screen(wallet={
+                    "wallet_address": wallet_address,
+                    "chain": chain,
+                    "request_counter": request_counter,
+                    "wallet_count": len(self.scheduled_wallets),
+                    "tot_num_wallets": None
+                }):
+                    yield self.route_wallet_request(stage_name=stage_name, request=request)
+
+    def parse_top_gainers(self, response):
+        for result in self.delegate_to_stage(stage_callback=self.top_gainers_stage.parse_top_gainers, response=response, callback=self.parse_top_gainers):
+            yield result
+
+            # Schedule the top traders request of the asset as soon as it is parsed (unless the resumed run already scheduled it)
+            if isinstance(result, DexScreenerTopGainers) and not self.is_work_scheduled(stage="top_traders", key=result["asset_url"]):
+                self.mark_work_pending(stage="top_traders", key=result["asset_url"], payload={"asset_name": result["asset_name"], "chain": result["chain"]})
+                self.logger.info(f"Scheduling the top traders request of the asset name {result['asset_name']} with URL: {result['asset_url']}")
+                yield self.top_traders_stage.build_top_traders_request(
+                    asset_name=result["asset_name"],
+                    asset_url=result["asset_url"],
+                    chain=result["chain"]
+                ).replace(callback=self.parse_top_traders)
+
+    def parse_top_traders(self, response):
+        for result in self.delegate_to_stage(stage_callback=self.top_traders_stage.parse_top_traders, response=response, callback=self.parse_top_traders):
+            yield result
+
+            # Only screen traders that both bought and sold the asset, and screen each wallet once per chain
+            if not isinstance(result, scrapy.Item):
+                continue
+            if self.wallet_index.add_trader(result) is None:
+                continue
+            wallet_address, chain = result["wallet_address"], result["chain"]
+            wallet_key = build_wallet_key(chain=chain, wallet_address=wallet_address)
+            if wallet_key in self.scheduled_wallets:
+                continue
+            self.scheduled_wallets.add(wallet_key)
+
+            # Schedule the wallet screening requests as soon as the wallet is parsed, ahead of the wallets that made a profit on fewer of the assets parsed so far
+            priority = helper_screening_priority(self.wallet_index.get_aggregate(chain=chain, wallet_address=wallet_address))
+            for stage_name, stage in self.wallet_stages.items():
+                self.logger.info(f"Scheduling the {stage_name} screening request of the wallet address: {wallet_address} on {chain}, which is wallet {len(self.scheduled_wallets)} so far.")
+                self.mark_work_pending(stage=stage.wallet_source, key=wallet_key, payload={"chain": chain, "wallet_address": wallet_address})
+
+                # The fetch mode is selected per wallet (see WalletFetchModeMixin), so the wallets of the JSON endpoints are sent in batches
+                for request in stage.add_wallet_to_screen(wallet={
+                    "wallet_address": wallet_address,
+                    "chain": chain,
+                    "request_counter": 1,
+                    "wallet_count": len(self.scheduled_wallets),
+                    "tot_num_wallets": None,
+                    "priority": priority
+                }):
+                    yield self.route_wallet_request(stage_name=stage_name, request=request)
+
+    def parse_dex_check_wallet_data(self, response):
+        yield from self.delegate_to_stage(stage_callback=self.wallet_stages["dex_check"].parse_wallet_data, response=response, callback=self.parse_dex_check_wallet_data)
+
+    def parse_gmgn_ai_wallet_data(self, response):
+        yield from self.delegate_to_stage(stage_callback=self.wallet_stages["gmgn_ai"].parse_wallet_data, response=response, callback=self.parse_gmgn_ai_wallet_data)
+
+    def parse_dex_check_api_batch(self, response):
+        yield from self.delegate_to_wallet_stage(stage_name="dex_check", results=self.wallet_stages["dex_check"].parse_api_batch(response))
+
+    def handle_dex_check_api_error(self, failure):
+        yield from self.delegate_to_wallet_stage(stage_name="dex_check", results=self.wallet_stages["dex_check"].handle_api_error(failure))
+
+    def parse_gmgn_ai_api_batch(self, response):
+        yield from self.delegate_to_wallet_stage(stage_name="gmgn_ai", results=self.wallet_stages["gmgn_ai"].parse_api_batch(response))
+
+    def handle_gmgn_ai_api_error(self, failure):
+        yield from self.delegate_to_wallet_stage(stage_name="gmgn_ai", results=self.wallet_stages["gmgn_ai"].handle_api_error(failure))
+
+    def spider_idle(self):
+        # No more wallets are coming until the scheduled ones are screened, so send the JSON requests of the wallet batches that are not full
+        num_flushed_batches = 0
+        for stage_name, stage in self.wallet_stages.items():
+            for request in stage.flush_wallet_batches():
+                self.crawler.engine.crawl(self.route_wallet_request(stage_name=stage_name, request=request))
+                num_flushed_batches += 1
+        if num_flushed_batches > 0:
+            raise DontCloseSpider
+
+    def closed(self, reason):
+        self.top_gainers_stage.stop_watching()
+
+        # Report how much of the scheduled wallets every wallet screener completed (e.g., when a budget cut the run short). wallet_selection imports pandas, which the crawl itself does not need
+        from wallet_selection import report_screening_coverage
+        for stage in self.wallet_stages.values():
+            report_screening_coverage(spider=self, wallet_source=stage.wallet_source, screened_wallet_counts=stage.screened_wallet_counts, tot_num_wallets=len(self.scheduled_wallets))
+
+        # Write one consolidated record per wallet, with its aggregates across all the assets it is a top trader of
+        if len(self.wallet_index) > 0:
+            self.logger.info(f"Writing the aggregates of {len(self.wallet_index)} wallets to {write_wallet_aggregates(index=self.wallet_index)}")
+
+    def route_wallet_request(self, stage_name: str, request: scrapy.Request) -> scrapy.Request:
+        """
+        A function to route a request of a wallet stage through this spider: the JSON requests of a batch of wallets to the batch callbacks, the page requests to the page callback.
+        """
+        if request.meta.get("fetch_mode") == API_FETCH_MODE:
+            return request.replace(callback=getattr(self, f"parse_{stage_name}_api_batch"), errback=getattr(self, f"handle_{stage_name}_api_error"))
+        return request.replace(callback=getattr(self, f"parse_{stage_name}_wallet_data"))
+
+    def delegate_to_wallet_stage(self, stage_name: str, results):
+        """
+        A function to route the follow-up requests of a wallet stage (e.g., the browser renders of the wallets missing from a JSON response, or the halves of a refused batch) back through this spider.
+        """
+        for result in results:
+            if isinstance(result, scrapy.Request):
+                result = self.route_wallet_request(stage_name=stage_name, request=result)
+            yield result
+
+    def delegate_to_stage(self, stage_callback, response, callback):
+        """
+        A function to run the parse callback of a stage spider and route the follow-up requests (e.g., retries) back through this spider.
+        """
+        for result in stage_callback(response):
+            if isinstance(result, scrapy.Request):
+                result = result.replace(callback=callback)
+            yield result
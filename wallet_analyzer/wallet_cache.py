@@ -0,0 +1,60 @@
+# Import libraries
+import json
+import sqlite3
+import time
+from typing import Optional
+
+class WalletStatsCache:
+    """
+    A persistent SQLite store of the scraped wallet stats, keyed by the wallet address, the chain and the source (e.g., dex_check or gmgn_ai).
+    The chain is part of the key because the same EVM address can be a different wallet on Ethereum, Base and BSC.
+    A row is considered fresh if it was scraped less than `ttl` seconds ago.
+    """
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+
+        # Drop the cache files that were created before the chain was part of the key. It is only a cache, so the wallets are simply screened again
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(wallet_stats)")]
+        if columns and "chain" not in columns:
+            self.conn.execute("DROP TABLE wallet_stats")
+
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS wallet_stats (
+                wallet_address TEXT NOT NULL,
+                chain TEXT NOT NULL,
+                source TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (wallet_address, chain, source)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get_fresh(self, wallet_address: str, chain: str, source: str) -> Optional[dict]:
+        """
+        A function to return the cached stats of a wallet if they are fresher than the TTL, otherwise None.
+        """
+        row = self.conn.execute(
+            "SELECT payload FROM wallet_stats WHERE wallet_address = ? AND chain = ? AND source = ? AND scraped_at >= ?",
+            (wallet_address, chain, source, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def upsert(self, wallet_address: str, chain: str, source: str, payload: dict):
+        """
+        A function to insert or refresh the cached stats of a wallet.
+        """
+        self.conn.execute(
+            "INSERT OR REPLACE INTO wallet_stats (wallet_address, chain, source, scraped_at, payload) VALUES (?, ?, ?, ?, ?)",
+            (wallet_address, chain, source, time.time(), json.dumps(payload))
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
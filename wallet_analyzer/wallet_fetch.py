@@ -0,0 +1,217 @@
+# Import packages
+import copy
+import json
+import time
+from typing import Iterable, Optional
+import scrapy
+from scrapy.exceptions import IgnoreRequest
+from scrapy.spidermiddlewares.httperror import HttpError
+from chains import CHAINS, build_wallet_key
+from crawl_metrics import metrics
+
+# The fetch modes of the wallet pages
+LIGHT_FETCH_MODE = "light" # A plain HTTP request through Zyte (httpResponseBody), without a browser: much cheaper and faster, but only works when the stats are in the server-rendered HTML
+BROWSER_FETCH_MODE = "browser" # A browser render with the actions of the spider (browserHtml)
+API_FETCH_MODE = "api" # The JSON data endpoint behind the wallet page (see WALLET_API_ENDPOINTS), with several wallets per request where the endpoint takes a batch: no browser and no DOM
+
+# The buckets of the elapsed time of the Zyte actions, in seconds (the waitForSelector actions time out after 10 seconds by default)
+ACTION_SECONDS_BUCKETS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 30)
+
+class WalletFetchModeMixin:
+    """
+    A mixin that lets the wallet screeners try a cheaper request first and fall back to a browser render only for the wallets whose cheap response
+    does not hold their stats. WALLET_FETCH_MODE selects "api_first" (the JSON endpoint of WALLET_API_ENDPOINTS), "light_first" (the page without a browser)
+    or "browser" (the browser render only, as before).
+    The JSON and light requests are stopped for the rest of the crawl once their success rate falls below WALLET_LIGHT_FETCH_MIN_SUCCESS_RATE
+    after WALLET_LIGHT_FETCH_MIN_SAMPLES wallets, so a site that blocks its endpoint or only renders its stats in the browser costs at most a few extra requests.
+    The outcome and elapsed time of every Zyte action are recorded, so the timeouts of WALLET_ACTION_TIMEOUTS can be tuned to the ones that actually succeed.
+    The spiders that support the JSON endpoint set wallet_item_class and implement parse_api_payload(payload, wallets), which returns the item fields
+    (without chain, wallet_address and scraped_at) of every wallet whose stats are in the payload, keyed by wallet address.
+    """
+    spider_actions = []
+    supports_light_fetch = True # False for the pages whose stats need the actions (e.g., a click) before they are read
+    api_max_batch_size = 100 # The number of wallets the JSON endpoint of the site can take per request (1 for the endpoints that take a single wallet)
+    wallet_item_class = None
+    num_light_fetches = 0
+    num_light_fetch_successes = 0
+    num_api_fetches = 0
+    num_api_fetch_successes = 0
+    wallet_batches = None
+
+    def helper_fetch_setting(self, name: str, default):
+        # The spiders that are built without a crawler (e.g., in the benchmarks) use the defaults
+        settings = getattr(self, "settings", None)
+        return default if settings is None else settings.get(name, default)
+
+    def helper_api_endpoint(self) -> Optional[dict]:
+        # The JSON endpoint of the spider's wallet source, if one is configured (e.g., {"url": "https://.../{wallet_addresses}", "batch_size": 20})
+        endpoint = self.helper_fetch_setting("WALLET_API_ENDPOINTS", {}).get(self.wallet_source) or {}
+        return endpoint if endpoint.get("url") else None
+
+    def helper_fetch_mode_failing(self, num_fetches: int, num_successes: int) -> bool:
+        # Whether the success rate of a cheap fetch mode is too low to keep using it for the rest of the crawl
+        min_samples = int(self.helper_fetch_setting("WALLET_LIGHT_FETCH_MIN_SAMPLES", 20))
+        min_success_rate = float(self.helper_fetch_setting("WALLET_LIGHT_FETCH_MIN_SUCCESS_RATE", 0.2))
+        return num_fetches >= min_samples and num_successes < min_success_rate * num_fetches
+
+    def select_fetch_mode(self) -> str:
+        """
+        A function to select the fetch mode of the next wallet request.
+        """
+        fetch_mode_setting = self.helper_fetch_setting("WALLET_FETCH_MODE", "browser")
+        if fetch_mode_setting == "api_first" and self.wallet_item_class is not None and hasattr(self, "parse_api_payload") and self.helper_api_endpoint() is not None:
+            if not self.helper_fetch_mode_failing(num_fetches=self.num_api_fetches, num_successes=self.num_api_fetch_successes):
+                return API_FETCH_MODE
+        if not self.supports_light_fetch or fetch_mode_setting != "light_first":
+            return BROWSER_FETCH_MODE
+        if self.helper_fetch_mode_failing(num_fetches=self.num_light_fetches, num_successes=self.num_light_fetch_successes):
+            return BROWSER_FETCH_MODE
+        return LIGHT_FETCH_MODE
+
+    def build_zyte_api_params(self, fetch_mode: str) -> dict:
+        """
+        A function to build the Zyte API parameters of a wallet request. The waitForSelector actions of the browser renders get the timeout of WALLET_ACTION_TIMEOUTS, if any.
+        """
+        if fetch_mode == LIGHT_FETCH_MODE:
+            return {"httpResponseBody": True}
+
+        actions = copy.deepcopy(self.spider_actions if isinstance(self.spider_actions, list) else [self.spider_actions])
+        action_timeout = self.helper_fetch_setting("WALLET_ACTION_TIMEOUTS", {}).get(self.wallet_source)
+        for action in actions:
+            if action_timeout is not None and action["action"] == "waitForSelector":
+                action["timeout"] = action_timeout
+        return {"browserHtml": True, "javascript": True, "actions": actions}
+
+    def record_wallet_fetch(self, response, page_loaded: bool):
+        """
+        A function to record the outcome of a wallet request: its latency per fetch mode and outcome, the success rate of the light requests,
+        and the outcome and elapsed time of every Zyte action of the browser renders.
+        """
+        fetch_mode = response.meta.get("fetch_mode", BROWSER_FETCH_MODE)
+        outcome = "loaded" if page_loaded else "not_loaded"
+        metrics.increment("wallet_fetches", source=self.wallet_source, fetch_mode=fetch_mode, outcome=outcome)
+        if "download_latency" in response.meta:
+            metrics.observe("wallet_fetch_seconds", response.meta["download_latency"], source=self.wallet_source, fetch_mode=fetch_mode, outcome=outcome)
+
+        if fetch_mode == LIGHT_FETCH_MODE:
+            self.num_light_fetches += 1
+            self.num_light_fetch_successes += page_loaded
+            return
+        if fetch_mode == API_FETCH_MODE:
+            self.num_api_fetches += 1
+            self.num_api_fetch_successes += page_loaded
+            return
+
+        # The action logs of Zyte, e.g., {"action": "waitForSelector", "elapsedTime": 3.2, "status": "success"} or {..., "status": "returned", "error": "Timed out..."}
+        for action_log in (getattr(response, "raw_api_response", None) or {}).get("actions", []):
+            action_status = action_log.get("status", "unknown")
+            metrics.increment("wallet_action_outcomes", source=self.wallet_source, action=action_log.get("action"), status=action_status, page_loaded=page_loaded)
+            if action_log.get("elapsedTime") is not None:
+                metrics.observe("wallet_action_seconds", action_log["elapsedTime"], buckets=ACTION_SECONDS_BUCKETS, source=self.wallet_source, action=action_log.get("action"), status=action_status)
+
+    ## JSON endpoints
+    def build_wallet_requests(self, wallets: Iterable[dict]):
+        """
+        A function to yield the requests that screen the wallets (dicts of the arguments of build_wallet_request, in screening order): batches of wallets
+        of the same chain for the JSON endpoint in api_first mode, else one page request per wallet. Scrapy consumes the start requests lazily,
+        so the fetch mode is selected wallet by wallet and the JSON requests stop as soon as their success rate is too low.
+        """
+        for wallet in wallets:
+            yield from self.add_wallet_to_screen(wallet=wallet)
+        yield from self.flush_wallet_batches()
+
+    def add_wallet_to_screen(self, wallet: dict):
+        """
+        A function to yield the request of a wallet in the fetch mode that is selected for it: a page request, or the JSON request of its batch once the batch is full.
+        The wallets of the batches that are not full yet are sent by flush_wallet_batches (e.g., when the crawl gets idle).
+        """
+        fetch_mode = self.select_fetch_mode()
+        if fetch_mode != API_FETCH_MODE:
+            yield self.build_wallet_request(**wallet, fetch_mode=fetch_mode)
+            return
+        if self.wallet_batches is None:
+            self.wallet_batches = {} # chain -> the wallets of the batch being filled
+        batch = self.wallet_batches.setdefault(wallet["chain"], [])
+        batch.append(wallet)
+        if len(batch) >= min(int(self.helper_api_endpoint().get("batch_size", 1)), self.api_max_batch_size):
+            yield self.build_api_request(wallets=self.wallet_batches.pop(wallet["chain"]))
+
+    def flush_wallet_batches(self):
+        """
+        A function to yield the JSON requests of the batches that are not full.
+        """
+        while self.wallet_batches:
+            _, batch = self.wallet_batches.popitem()
+            yield self.build_api_request(wallets=batch)
+
+    def build_api_request(self, wallets: list):
+        """
+        A function to build the request of a batch of wallets to the JSON endpoint. The URL template of the endpoint is filled with {wallet_address} (the first wallet),
+        {wallet_addresses} (comma-separated), {chain} and the chain IDs of CHAINS (e.g., {gmgn_ai_chain}).
+        The request goes through Zyte without a browser (httpResponseBody), unless WALLET_API_VIA_ZYTE is off (e.g., for a local stub of the endpoints).
+        """
+        chain = wallets[0]["chain"]
+        wallet_addresses = [wallet["wallet_address"] for wallet in wallets]
+        return scrapy.Request(
+            url=self.helper_api_endpoint()["url"].format(**CHAINS[chain], chain=chain, wallet_address=wallet_addresses[0], wallet_addresses=",".join(wallet_addresses)),
+            callback=self.parse_api_batch,
+            errback=self.handle_api_error,
+            headers={"Accept": "application/json"},
+            meta={
+                "zyte_api_automap": {"httpResponseBody": True} if self.helper_fetch_setting("WALLET_API_VIA_ZYTE", True) else False,
+                "fetch_mode": API_FETCH_MODE,
+                "wallet_source": self.wallet_source,
+                "wallet_batch": wallets
+            },
+            priority=max(wallet.get("priority", 0) for wallet in wallets),
+            dont_filter=True
+        )
+
+    def parse_api_batch(self, response):
+        """
+        A function to yield the stats of every wallet of a batch from the JSON response, and a browser render for the wallets whose stats are not in it. The fallback does not count as a retry.
+        The wallets that were screened recently are served from the wallet stats cache (see WalletStatsCacheDownloaderMiddleware).
+        """
+        wallets = response.meta["wallet_batch"]
+        cached_rows = response.meta.get("wallet_cache_rows", {})
+        try:
+            api_rows = self.parse_api_payload(payload=json.loads(response.body), wallets=wallets) if len(cached_rows) < len(wallets) else {}
+        except ValueError: # Not JSON (e.g., a bot check page)
+            api_rows = {}
+
+        for wallet in wallets:
+            wallet_key = build_wallet_key(chain=wallet["chain"], wallet_address=wallet["wallet_address"])
+            if wallet_key in cached_rows:
+                yield self.wallet_item_class(**cached_rows[wallet_key])
+            else:
+                api_row = api_rows.get(wallet["wallet_address"])
+                self.record_wallet_fetch(response=response, page_loaded=api_row is not None)
+                if api_row is None:
+                    self.logger.info(f"The JSON response of the wallet address: {wallet['wallet_address']} does not hold its stats, falling back to the browser render. URL: {response.url}")
+                    yield self.build_wallet_request(**wallet, dont_filter=True, fetch_mode=BROWSER_FETCH_MODE)
+                    continue
+                yield self.wallet_item_class(chain=wallet["chain"], wallet_address=wallet["wallet_address"], **api_row, scraped_at=time.time())
+            self.screened_wallet_counts.add(wallet["wallet_count"])
+            self.mark_work_done(stage=self.wallet_source, key=wallet_key)
+
+    def handle_api_error(self, failure):
+        """
+        A function to handle a JSON request that failed. A batch that the endpoint refused (e.g., a 403 or a 400) may have been refused because of one of its wallets,
+        so it is split in two until the wallets that fail are alone, which costs at most two extra requests per failing wallet and level of the split.
+        The wallets that still fail, and all the wallets of a request that failed in the network (e.g., a timeout), fall back to the browser render
+        and count towards the success rate of the JSON requests.
+        """
+        if failure.check(IgnoreRequest) and not failure.check(HttpError):
+            return # The wallet screening budget is exhausted, so the browser renders would be skipped too
+        wallets = failure.request.meta["wallet_batch"]
+        metrics.increment("wallet_api_errors", source=self.wallet_source, error=type(failure.value).__name__)
+        if failure.check(HttpError) and len(wallets) > 1:
+            self.logger.info(f"The JSON request of {len(wallets)} wallets was refused ({failure.value!r}), splitting the batch. URL: {failure.request.url}")
+            yield self.build_api_request(wallets=wallets[:len(wallets) // 2])
+            yield self.build_api_request(wallets=wallets[len(wallets) // 2:])
+            return
+
+        self.logger.warning(f"The JSON request of {len(wallets)} wallets failed ({failure.value!r}), falling back to the browser render. URL: {failure.request.url}")
+        self.num_api_fetches += len(wallets)
+        for wallet in wallets:
+            yield self.build_wallet_request(**wallet, dont_filter=True, fetch_mode=BROWSER_FETCH_MODE)
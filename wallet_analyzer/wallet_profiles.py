@@ -0,0 +1,179 @@
+# Import packages
+import logging
+import os
+import sys
+from typing import Iterator, Optional
+from chains import DEFAULT_CHAIN
+from feeds import helper_resolve_feed_path, iter_feed_items, write_feed_items
+from number_normalization import normalize_number
+
+logger = logging.getLogger(__name__)
+
+# The sources of the wallet profiles, in order of preference: the feed of every source and the source field of every profile field.
+# When several sources have a value for a profile field, the most recently scraped one wins, and the order of preference breaks the ties
+PROFILE_SOURCES = {
+    "dex_check": {
+        "feed_name": "dex_check_wallet_screener",
+        "fields": {
+            "tot_gross_profit": "tot_gross_profit",
+            "realized_gross_profit": "realized_gross_profit",
+            "unrealized_gross_profit": "unrealized_gross_profit",
+            "tot_roi": "tot_roi",
+            "realized_roi": "realized_roi",
+            "unrealized_roi": "unrealized_roi",
+            "win_rate": "win_rate",
+            "num_wins": "num_wins",
+            "num_losses": "num_losses",
+            "trading_volume": "trading_volume",
+            "num_trades": "num_trades",
+            "avg_trade_size": "avg_trade_size"
+        }
+    },
+    "gmgn_ai": {
+        "feed_name": "gmgn_ai_wallet_screener",
+        "fields": {
+            "tot_gross_profit": "tot_gross_profit", # The 'Total PnL' card
+            "win_rate": "win_rate",
+            "last_7d_pnl": "tot_roi" # The gmgn.ai screener stores the 'Last 7D PnL' card in tot_roi, so it is not merged with the ROI of DexCheck
+        }
+    },
+    "dex_screener": {
+        "feed_name": "wallet_aggregates", # The aggregates of the wallet across the top traders tabs (see wallet_aggregation.py)
+        "fields": {
+            "num_assets": "num_assets",
+            "num_winning_assets": "num_winning_assets",
+            "top_traders_tot_pnl": "tot_pnl",
+            "top_traders_tot_bought_usd": "tot_bought_usd",
+            "top_traders_tot_sold_usd": "tot_sold_usd",
+            "top_traders_mean_pct_pnl": "mean_pct_pnl"
+        }
+    }
+}
+
+# The fields of a profile, in the order of their first source
+PROFILE_FIELDS = list(dict.fromkeys(field for source in PROFILE_SOURCES.values() for field in source["fields"]))
+
+## Helper functions
+def helper_to_number(value) -> Optional[float]:
+    """
+    A function to return the numeric value of a field, whether the feed stored it typed (e.g., 33.09) or as displayed (e.g., "33.09%" in the older feeds and the gmgn.ai feed).
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return normalize_number(value=value)
+    except ValueError:
+        return None
+
+def helper_read_source(source_name: str) -> Iterator[tuple]:
+    """
+    A function to stream the rows of a source as ((chain, wallet_address), (scraped_at, values)) pairs, with the values in the order of the source's fields.
+    The rows without a scraped_at timestamp (e.g., the feeds written before it was added) get the time their feed was last written.
+    """
+    source = PROFILE_SOURCES[source_name]
+    feed_written_at = os.path.getmtime(helper_resolve_feed_path(feed_name=source["feed_name"]))
+    source_fields = list(source["fields"].values())
+    for row in iter_feed_items(feed_name=source["feed_name"]):
+        if row.get("wallet_address") is None:
+            continue
+        wallet_key = (row.get("chain") or DEFAULT_CHAIN, row["wallet_address"])
+        yield wallet_key, (row.get("scraped_at") or feed_written_at, tuple(helper_to_number(row.get(field)) for field in source_fields))
+
+def helper_available_sources(source_names: list) -> list:
+    # Skip the sources whose feed has not been written yet or is empty
+    available_sources = []
+    for source_name in source_names:
+        try:
+            path = helper_resolve_feed_path(feed_name=PROFILE_SOURCES[source_name]["feed_name"])
+        except FileNotFoundError:
+            logger.warning(f"Skipping the source {source_name}, whose feed does not exist")
+            continue
+        if os.path.getsize(path) > 0:
+            available_sources.append((source_name, os.path.getsize(path)))
+    return available_sources
+
+## Profile resolution
+def build_wallet_profile(wallet_key: tuple, source_records: dict) -> dict:
+    """
+    A function to merge the records of a wallet from every source into its profile. Every field is taken from the most recently scraped source that has a value for it,
+    and is followed by the name of that source. The profile ends with the scrape timestamp of every source, so the freshness of every field can be checked.
+    """
+    profile = {"chain": wallet_key[0], "wallet_address": wallet_key[1], "sources": ",".join(source_name for source_name in PROFILE_SOURCES if source_name in source_records)}
+
+    # The candidate values of every profile field, freshest first (sorted() is stable, so the order of preference breaks the ties)
+    candidates = {}
+    for source_name in sorted(source_records, key=lambda source_name: -source_records[source_name][0]):
+        for profile_field, value in zip(PROFILE_SOURCES[source_name]["fields"], source_records[source_name][1]):
+            if value is not None and profile_field not in candidates:
+                candidates[profile_field] = (value, source_name)
+
+    for profile_field in PROFILE_FIELDS:
+        profile[profile_field], profile[f"{profile_field}_source"] = candidates.get(profile_field, (None, None))
+    for source_name in PROFILE_SOURCES:
+        profile[f"{source_name}_scraped_at"] = source_records[source_name][0] if source_name in source_records else None
+    return profile
+
+def join_wallet_profiles(source_names: Optional[list] = None) -> Iterator[dict]:
+    """
+    A function to join the wallet stats of every source into one profile per wallet (keyed by its chain and address), without loading the feeds in DataFrames.
+    A hash index on the wallet key is built over every source except the largest one, which is then streamed and probed against the indexes
+    (after a first streaming pass that only keeps the position of the freshest row of every wallet).
+    The indexes only hold the typed values of the profile fields, and every matched wallet is removed from them, so the wallets that are missing from the
+    largest source are the ones left in the indexes at the end. Yields the profiles in the order of the largest source, then the remaining wallets.
+    """
+    available_sources = helper_available_sources(source_names=list(PROFILE_SOURCES) if source_names is None else source_names)
+    if not available_sources:
+        return
+    probe_source = max(available_sources, key=lambda source: source[1])[0]
+    build_sources = [source_name for source_name, _ in available_sources if source_name != probe_source]
+
+    # Build the hash index of every smaller source, keeping the most recently scraped row of the wallets that were screened more than once
+    indexes = {}
+    for source_name in build_sources:
+        index = indexes[source_name] = {}
+        for wallet_key, record in helper_read_source(source_name=source_name):
+            if wallet_key not in index or record[0] >= index[wallet_key][0]:
+                index[wallet_key] = record
+        logger.info(f"Indexed {len(index)} wallets of the source {source_name}")
+
+    # Find the row to keep of every wallet of the largest source in a first streaming pass, i.e., its most recently scraped row (the last one on ties),
+    # so that a wallet that was screened more than once (e.g., by two runs appending to the same feed) gets a single profile
+    kept_rows = {}
+    num_probe_rows = 0
+    for row_number, (wallet_key, (scraped_at, _)) in enumerate(helper_read_source(source_name=probe_source)):
+        num_probe_rows += 1
+        if wallet_key not in kept_rows or scraped_at >= kept_rows[wallet_key][0]:
+            kept_rows[wallet_key] = (scraped_at, row_number)
+
+    # Stream the largest source again and probe the indexes
+    for row_number, (wallet_key, record) in enumerate(helper_read_source(source_name=probe_source)):
+        if kept_rows[wallet_key][1] != row_number:
+            continue
+        source_records = {probe_source: record}
+        for source_name, index in indexes.items():
+            if wallet_key in index:
+                source_records[source_name] = index.pop(wallet_key)
+        yield build_wallet_profile(wallet_key=wallet_key, source_records=source_records)
+    if len(kept_rows) < num_probe_rows:
+        logger.info(f"Kept the most recently scraped row of the {num_probe_rows - len(kept_rows)} repeated wallets of the source {probe_source}")
+
+    # Then the wallets that only the smaller sources have
+    for source_name, index in indexes.items():
+        while index:
+            wallet_key, record = index.popitem()
+            source_records = {source_name: record}
+            for other_source_name, other_index in indexes.items():
+                if wallet_key in other_index:
+                    source_records[other_source_name] = other_index.pop(wallet_key)
+            yield build_wallet_profile(wallet_key=wallet_key, source_records=source_records)
+
+def write_wallet_profiles(source_names: Optional[list] = None, feed_name: str = "wallet_profiles") -> str:
+    """
+    A function to stream the joined wallet profiles to a feed in the configured feed format. Returns the path of the feed.
+    """
+    return write_feed_items(feed_name=feed_name, items=join_wallet_profiles(source_names=source_names))
+
+if __name__ == "__main__":
+    # Usage: python wallet_profiles.py [comma-separated list of the sources to join, e.g., dex_check,gmgn_ai]
+    logging.basicConfig(level=logging.INFO)
+    print(f"Wrote the wallet profiles to {write_wallet_profiles(source_names=sys.argv[1].split(',') if len(sys.argv) > 1 else None)}")
@@ -0,0 +1,186 @@
+# Import packages
+import logging
+import sys
+from typing import Callable, Iterable, Mapping, Optional
+import numpy as np
+from feeds import iter_feed_items, write_feed_items
+
+logger = logging.getLogger(__name__)
+
+# The fields of the wallet profiles (see wallet_profiles.py) that the score components read
+PROFILE_SCORE_FIELDS = [
+    "num_assets", "num_winning_assets", "num_wins", "num_losses", "win_rate",
+    "realized_gross_profit", "unrealized_gross_profit", "tot_gross_profit", "realized_roi", "tot_roi",
+    "num_trades", "trading_volume", "avg_trade_size",
+    "top_traders_tot_pnl", "top_traders_tot_bought_usd", "top_traders_mean_pct_pnl"
+]
+
+# The number of trades above which more trades do not make a wallet more trustworthy (e.g., bots that trade all day)
+TRADE_COUNT_CAP = 1000
+
+## Helper functions
+def helper_percentile_rank(values: np.ndarray) -> np.ndarray:
+    """
+    A function to rank the values of an array as percentiles in (0, 1], with the average rank for ties and NaN for missing values (like pandas' rank(pct=True)).
+    """
+    ranks = np.full(len(values), np.nan)
+    is_valid = ~np.isnan(values)
+    num_valid = int(is_valid.sum())
+    if num_valid == 0:
+        return ranks
+
+    # np.unique sorts the values, so the tied values form one group whose ranks run from its first to its last position
+    _, inverse, counts = np.unique(values[is_valid], return_inverse=True, return_counts=True)
+    last_positions = np.cumsum(counts)
+    average_ranks = last_positions - (counts - 1) / 2
+    ranks[is_valid] = average_ranks[inverse] / num_valid
+    return ranks
+
+def helper_safe_divide(numerators: np.ndarray, denominators: np.ndarray) -> np.ndarray:
+    # NaN instead of inf or a warning where the denominator is 0 or missing
+    result = np.full(len(numerators), np.nan)
+    np.divide(numerators, denominators, out=result, where=(denominators != 0) & ~np.isnan(denominators))
+    return result
+
+def helper_first_available(*arrays: np.ndarray) -> np.ndarray:
+    # The value of the first array that has one, per wallet (e.g., the DexCheck stat, else the one from the top traders)
+    result = arrays[0].copy()
+    for array in arrays[1:]:
+        result = np.where(np.isnan(result), array, result)
+    return result
+
+## Score components
+# Every component maps the profile columns to one raw value per wallet (higher is better, NaN if the wallet has no data for it).
+# The values are turned into percentile ranks before they are weighted, so the components are comparable whatever their scale
+def score_consistency(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    The share of the assets a wallet made a profit on and its DexCheck win rate, both smoothed towards 50% for the wallets with few assets or trades
+    (i.e., a wallet that won 1 out of 1 assets is less consistent than one that won 9 out of 10).
+    """
+    smoothed_asset_win_rate = helper_safe_divide(columns["num_winning_assets"] + 1, columns["num_assets"] + 2)
+
+    # The win rate of the wallets without a number of wins and losses (e.g., the gmgn.ai ones) cannot be smoothed
+    smoothed_trade_win_rate = helper_first_available(helper_safe_divide(columns["num_wins"] + 1, columns["num_wins"] + columns["num_losses"] + 2), columns["win_rate"] / 100)
+
+    # The mean of the two rates that are available
+    stacked = np.vstack([smoothed_asset_win_rate, smoothed_trade_win_rate])
+    return helper_safe_divide(np.nansum(stacked, axis=0), (~np.isnan(stacked)).sum(axis=0).astype(np.float64))
+
+def score_realized_profit(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    The share of the gross profit of a wallet that is realized, from -1 (all the realized trades lost) to 1 (all the profit is realized).
+    Realized profits are locked in, while unrealized profits can vanish with the next candle.
+    """
+    return helper_safe_divide(columns["realized_gross_profit"], np.abs(columns["realized_gross_profit"]) + np.abs(columns["unrealized_gross_profit"]))
+
+def score_trade_count(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    The number of trades of a wallet, capped at TRADE_COUNT_CAP: the more trades, the less a good record is down to luck.
+    """
+    return np.log1p(np.minimum(columns["num_trades"], TRADE_COUNT_CAP))
+
+def score_return_on_volume(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    The gross profit of a wallet per dollar it traded (DexCheck), else its PnL per dollar it bought of the top gainers, so that the whales are not ranked first for their size alone.
+    """
+    return helper_first_available(
+        helper_safe_divide(columns["tot_gross_profit"], columns["trading_volume"]),
+        helper_safe_divide(columns["top_traders_tot_pnl"], columns["top_traders_tot_bought_usd"])
+    )
+
+def score_roi(columns: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    The realized ROI of a wallet, else its total ROI, else its mean percentage PnL on the top gainers it traded.
+    """
+    return helper_first_available(columns["realized_roi"], columns["tot_roi"], columns["top_traders_mean_pct_pnl"])
+
+SCORE_COMPONENTS = {
+    "consistency": score_consistency,
+    "realized_profit": score_realized_profit,
+    "trade_count": score_trade_count,
+    "return_on_volume": score_return_on_volume,
+    "roi": score_roi
+}
+
+# The weightings of the components (a weighting can leave components out, and new components can be added to SCORE_COMPONENTS)
+SCORE_WEIGHTINGS = {
+    "balanced": {"consistency": 0.3, "realized_profit": 0.2, "trade_count": 0.15, "return_on_volume": 0.2, "roi": 0.15},
+    "consistency": {"consistency": 0.5, "realized_profit": 0.2, "trade_count": 0.3},
+    "returns": {"return_on_volume": 0.4, "roi": 0.4, "realized_profit": 0.2}
+}
+
+## Scoring
+def load_profile_columns(profiles: Optional[Iterable[Mapping]] = None, feed_name: str = "wallet_profiles") -> dict:
+    """
+    A function to load the wallet profiles as columns: the chain and wallet address as object arrays, and every field of PROFILE_SCORE_FIELDS as a float64 array (NaN for the missing values).
+    The profiles are streamed from the wallet profiles feed if none are given (e.g., join_wallet_profiles() to score them without writing the feed).
+    """
+    chains, wallet_addresses = [], []
+    values = {field: [] for field in PROFILE_SCORE_FIELDS}
+    for profile in (iter_feed_items(feed_name=feed_name) if profiles is None else profiles):
+        chains.append(profile.get("chain"))
+        wallet_addresses.append(profile["wallet_address"])
+        for field in PROFILE_SCORE_FIELDS:
+            values[field].append(profile.get(field))
+
+    columns = {"chain": np.array(chains, dtype=object), "wallet_address": np.array(wallet_addresses, dtype=object)}
+    for field in PROFILE_SCORE_FIELDS:
+        columns[field] = np.array(values[field], dtype=np.float64) # None becomes NaN
+    return columns
+
+def compute_wallet_scores(columns: Mapping[str, np.ndarray], weights: Optional[Mapping[str, float]] = None, components: Optional[Mapping[str, Callable]] = None) -> dict:
+    """
+    A function to compute the composite score of every wallet: the weighted mean of the percentile ranks of its score components.
+    A wallet that has no data for a component is scored on the other components (i.e., the weights are renormalized per wallet), and a wallet with no data for any component gets NaN.
+    Returns the score and the percentile rank of every component, as arrays aligned with the columns.
+    """
+    weights = SCORE_WEIGHTINGS["balanced"] if weights is None else weights
+    components = SCORE_COMPONENTS if components is None else components
+    num_wallets = len(columns["wallet_address"])
+
+    weighted_sum = np.zeros(num_wallets)
+    weight_sum = np.zeros(num_wallets)
+    scores = {}
+    for component_name, weight in weights.items():
+        if weight == 0:
+            continue
+        component_ranks = helper_percentile_rank(components[component_name](columns))
+        scores[f"{component_name}_score"] = component_ranks
+        is_available = ~np.isnan(component_ranks)
+        weighted_sum += np.where(is_available, component_ranks * weight, 0)
+        weight_sum += np.where(is_available, weight, 0)
+
+    scores["score"] = helper_safe_divide(weighted_sum, weight_sum)
+    return scores
+
+def rank_wallet_scores(scores: Mapping[str, np.ndarray]) -> np.ndarray:
+    """
+    A function to return the positions of the wallets from the highest to the lowest score, with the wallets without a score last.
+    """
+    return np.argsort(np.where(np.isnan(scores["score"]), np.inf, -scores["score"]), kind="stable")
+
+def write_wallet_scores(columns: Mapping[str, np.ndarray], scores: Mapping[str, np.ndarray], feed_name: str = "wallet_scores") -> str:
+    """
+    A function to write the wallets ranked by their score to a feed in the configured feed format, with the percentile rank of every component. Returns the path of the feed.
+    """
+    order = rank_wallet_scores(scores=scores)
+    score_names = ["score", *(name for name in scores if name != "score")]
+    rounded_scores = {name: np.round(scores[name], 4) for name in score_names}
+
+    def iter_ranked_wallets():
+        for rank, idx in enumerate(order, start=1):
+            wallet_score = {"rank": rank, "chain": columns["chain"][idx], "wallet_address": columns["wallet_address"][idx]}
+            for name in score_names:
+                value = rounded_scores[name][idx]
+                wallet_score[name] = None if np.isnan(value) else float(value)
+            yield wallet_score
+
+    return write_feed_items(feed_name=feed_name, items=iter_ranked_wallets())
+
+if __name__ == "__main__":
+    # Usage: python wallet_scoring.py [name of the weighting in SCORE_WEIGHTINGS, e.g., returns]
+    logging.basicConfig(level=logging.INFO)
+    weighting = sys.argv[1] if len(sys.argv) > 1 else "balanced"
+    profile_columns = load_profile_columns()
+    wallet_scores = compute_wallet_scores(columns=profile_columns, weights=SCORE_WEIGHTINGS[weighting])
+    print(f"Wrote the scores of {len(profile_columns['wallet_address']):,} wallets ({weighting} weighting) to {write_wallet_scores(columns=profile_columns, scores=wallet_scores)}")
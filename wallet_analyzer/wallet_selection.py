@@ -0,0 +1,156 @@
+# Import packages
+import hashlib
+import os
+from typing import Optional
+import pandas as pd
+from chains import DEFAULT_CHAIN
+from feeds import helper_resolve_feed_path, iter_feed_items
+from wallet_aggregation import build_wallet_index
+
+# The version of the ranked data frame. Bump it when rank_top_traders changes, so that the persisted selections are recomputed
+RANKING_VERSION = 2
+
+## Helper functions
+def helper_hash_file(path: str, chunk_size: int = pow(2, 20)) -> str:
+    """
+    A function to compute the SHA-256 hash of a file without loading it in memory at once.
+    """
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def rank_top_traders(traders_feed: str) -> pd.DataFrame:
+    """
+    A function to load the top traders feed, keep the traders that both bought and sold the asset, and rank them by their absolute and percentage-based PnL.
+    """
+    # Stream the feed into a pandas data frame, dropping all the fields that end with _raw on the way
+    df_raw_data = pd.DataFrame(
+        {k: v for k, v in item.items() if not k.endswith("_raw")}
+        for item in iter_feed_items(feed_name=traders_feed)
+    )
+
+    # The feeds that were written before the crawls became multi-chain have no chain field
+    if "chain" not in df_raw_data.columns:
+        df_raw_data["chain"] = DEFAULT_CHAIN
+    df_raw_data["chain"] = df_raw_data["chain"].fillna(DEFAULT_CHAIN)
+
+    # Change the data types of trader_bought_usd, trader_bought_crypto, trader_buy_txns, trader_sold_usd, trader_sold_crypto, trader_sell_txns, trader_pnl to numeric
+    df_raw_data.loc[:, "trader_bought_usd":"trader_pnl"] = df_raw_data.loc[:, "trader_bought_usd":"trader_pnl"].apply(pd.to_numeric).round(2)
+
+    # Filter the data frame to only include the rows where trader_bought_usd and trader_sold_usd are not null, then sort the data frame by trader_pnl in descending order
+    df_top_traders = df_raw_data[(df_raw_data["trader_bought_usd"].notnull()) & (df_raw_data["trader_sold_usd"].notnull())].sort_values(by="trader_pnl", ascending=False)
+
+    # Fill the NA trader_pnl values with 0
+    df_top_traders["trader_pnl"] = df_top_traders["trader_pnl"].fillna(0)
+
+    # Calculate the trader's percentage pnl
+    df_top_traders["trader_pct_pnl"] = round((df_top_traders["trader_pnl"] / df_top_traders["trader_bought_usd"]) * 100, 2)
+
+    # Rank the traders by their absolute PnL
+    df_top_traders["abs_pnl_rank"] = df_top_traders["trader_pnl"].rank(ascending=False)
+
+    # Rank the traders by their percentage-based PnL
+    df_top_traders["pct_pnl_rank"] = df_top_traders["trader_pct_pnl"].rank(ascending=False)
+
+    return df_top_traders.reset_index(drop=True)
+
+def load_ranked_top_traders(traders_feed: str, cache_dir: str = ".wallet_selection_cache") -> pd.DataFrame:
+    """
+    A function to return the ranked top traders, computing them only once per version of the input file.
+    The ranked data frame is persisted as a Parquet file keyed by the hash of the input file (or a pickle file if pyarrow is not installed).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    file_hash = helper_hash_file(path=helper_resolve_feed_path(feed_name=traders_feed))
+    parquet_path = os.path.join(cache_dir, f"v{RANKING_VERSION}_{file_hash}.parquet")
+    pickle_path = os.path.join(cache_dir, f"v{RANKING_VERSION}_{file_hash}.pkl")
+
+    # Load the persisted selection if the input file has not changed
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    if os.path.exists(pickle_path):
+        return pd.read_pickle(pickle_path)
+
+    # Otherwise, rank the traders and persist the result
+    df_top_traders = rank_top_traders(traders_feed=traders_feed)
+    try:
+        df_top_traders.to_parquet(parquet_path, index=False)
+    except ImportError:
+        df_top_traders.to_pickle(pickle_path)
+    return df_top_traders
+
+def select_wallets_to_analyze(
+    traders_feed: str = "dex_screener_top_traders",
+    top_n_pct_pnl: Optional[float] = pow(10, 6),
+    top_n_abs_pnl: Optional[float] = None,
+    min_bought_usd: Optional[float] = None,
+    priority_weights: Optional[dict] = None
+) -> pd.DataFrame:
+    """
+    A function to select the wallets to screen from the top traders feed. A criterion set to None is not applied.
+    Returns one row per wallet and chain (its best trade by PnL, joined with its aggregates across all the assets it traded) in screening order.
+    The screening order is the weighted mean of the wallet's pct_pnl_rank, abs_pnl_rank and aggregate_rank (see compute_screening_priorities),
+    and the screening_priority column holds the matching Scrapy request priorities (the higher, the sooner).
+    """
+    df_top_traders = load_ranked_top_traders(traders_feed=traders_feed)
+
+    # Filter for the top N traders by percentage-based PnL, by absolute PnL and by the amount they bought
+    mask = pd.Series(True, index=df_top_traders.index)
+    if top_n_pct_pnl is not None:
+        mask &= df_top_traders["pct_pnl_rank"] <= top_n_pct_pnl
+    if top_n_abs_pnl is not None:
+        mask &= df_top_traders["abs_pnl_rank"] <= top_n_abs_pnl
+    if min_bought_usd is not None:
+        mask &= df_top_traders["trader_bought_usd"] >= min_bought_usd
+
+    # Keep one row per wallet and chain
+    df_wallets_to_analyze = df_top_traders[mask].dropna(subset=["wallet_address"]).drop_duplicates(subset=["chain", "wallet_address"], keep="first")
+
+    # Join the aggregates of the selected wallets, so that the expensive wallet screens go to the wallets that matter most first
+    df_aggregates = pd.DataFrame(build_wallet_index(traders=df_top_traders.to_dict("records")).iter_aggregates())
+    if df_aggregates.empty:
+        # No trader both bought and sold an asset, so no wallet is selected. The empty selection still gets the columns that the wallet screeners read
+        df_aggregates = pd.DataFrame(columns=["chain", "wallet_address"])
+    df_aggregates["aggregate_rank"] = range(1, len(df_aggregates) + 1)
+    df_wallets_to_analyze = df_aggregates.merge(df_wallets_to_analyze, on=["chain", "wallet_address"], how="inner")
+    return compute_screening_priorities(df_wallets=df_wallets_to_analyze, priority_weights=priority_weights)
+
+def compute_screening_priorities(df_wallets: pd.DataFrame, priority_weights: Optional[dict] = None) -> pd.DataFrame:
+    """
+    A function to sort the wallets to screen by the weighted mean of their ranks and to add their Scrapy request priorities.
+    Every rank is rescaled to the (0, 1] range among the selected wallets first, so that the weights do not depend on the number of traders or wallets.
+    """
+    priority_weights = {"pct_pnl_rank": 1, "abs_pnl_rank": 1, "aggregate_rank": 1} if priority_weights is None else priority_weights
+    tot_weight = sum(priority_weights.values())
+    if tot_weight <= 0:
+        raise ValueError(f"The priority weights must add up to more than 0: {priority_weights}")
+
+    priority_score = pd.Series(0.0, index=df_wallets.index)
+    for rank_column, weight in priority_weights.items():
+        if weight:
+            priority_score += weight * df_wallets[rank_column].rank(pct=True)
+
+    # The lower the score, the higher the priority. Ties keep the order of the aggregates
+    df_wallets = df_wallets.assign(priority_score=(priority_score / tot_weight).round(6)).sort_values(by="priority_score", kind="stable").reset_index(drop=True)
+    df_wallets["screening_priority"] = len(df_wallets) - df_wallets.index
+    return df_wallets
+
+def report_screening_coverage(spider, wallet_source: str, screened_wallet_counts: set, tot_num_wallets: int):
+    """
+    A function to log and record how much of the ranked wallet list a wallet screener completed (e.g., when a budget cut the run short).
+    The wallet counts are the positions of the wallets in the ranked list, so the top covered wallets are the wallets 1 to N that were all screened.
+    """
+    num_top_covered = 0
+    while num_top_covered + 1 in screened_wallet_counts:
+        num_top_covered += 1
+    coverage_pct = round(len(screened_wallet_counts) / tot_num_wallets * 100, 2) if tot_num_wallets else 0
+
+    spider.logger.info(
+        f"The {wallet_source} screener completed {len(screened_wallet_counts)} out of {tot_num_wallets} ranked wallets ({coverage_pct}%), "
+        f"including all of the top {num_top_covered} wallets"
+    )
+    spider.crawler.stats.set_value(f"wallet_screening/{wallet_source}/ranked_wallets", tot_num_wallets)
+    spider.crawler.stats.set_value(f"wallet_screening/{wallet_source}/screened_wallets", len(screened_wallet_counts))
+    spider.crawler.stats.set_value(f"wallet_screening/{wallet_source}/coverage_pct", coverage_pct)
+    spider.crawler.stats.set_value(f"wallet_screening/{wallet_source}/top_covered_wallets", num_top_covered)
@@ -0,0 +1,236 @@
+# Import packages
+import logging
+import re
+import sys
+from typing import Iterable, Mapping, Optional
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.stats import binom
+from chains import DEFAULT_CHAIN
+from feeds import iter_feed_items, write_feed_items
+from wallet_aggregation import helper_is_missing
+
+logger = logging.getLogger(__name__)
+
+# The age of an asset on DEX Screener (e.g., "27m", "14h", "3d", "2mo" or "1y") up to which its top traders count as early entries
+EARLY_ENTRY_MAX_AGE_HOURS = 24
+ASSET_AGE_UNIT_HOURS = {"m": 1 / 60, "h": 1, "d": 24, "mo": 24 * 30, "y": 24 * 365}
+ASSET_AGE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mo|m|h|d|y)\s*$")
+
+# A repeat winner made a profit on at least MIN_REPEAT_WINS top gainers, on at least MIN_HIT_RATE of the top gainers it traded,
+# and on more top gainers than a wallet that shows up at random would (a binomial p-value below MAX_REPEAT_WINNER_PVALUE)
+MIN_REPEAT_WINS = 3
+MIN_HIT_RATE = 0.6
+MAX_REPEAT_WINNER_PVALUE = 0.01
+
+# Two wallets are linked when they made a profit on at least MIN_SHARED_WINS of the same top gainers, and on mostly the same ones (the Jaccard similarity of their winning assets).
+# A cluster is a connected group of linked wallets (e.g., the wallets of one trader, or copy traders that follow one wallet)
+MIN_SHARED_WINS = 3
+MIN_JACCARD = 0.5
+
+## Helper functions
+def helper_parse_asset_age(value: Optional[str]) -> float:
+    # The age of an asset in hours, or NaN if it is missing or has an unknown format
+    match = ASSET_AGE_PATTERN.match(value) if isinstance(value, str) else None
+    return float(match.group(1)) * ASSET_AGE_UNIT_HOURS[match.group(2)] if match else np.nan
+
+def helper_row_sums(matrix: sparse.csr_matrix) -> np.ndarray:
+    return np.asarray(matrix.sum(axis=1)).ravel()
+
+class WalletAssetMatrix:
+    """
+    The positions of the top traders as sparse wallet x asset matrices: one row per wallet (keyed by its chain and address) and one column per asset (keyed by its URL).
+    Only the traders that both bought and sold an asset are kept, as in the wallet aggregation index, and a position that is added twice replaces the previous one.
+    """
+    def __init__(self, wallet_keys: list, asset_urls: list, traded: sparse.csr_matrix, pnl: sparse.csr_matrix, bought_usd: sparse.csr_matrix, asset_ages: np.ndarray):
+        self.wallet_keys = wallet_keys # (chain, wallet_address) of every row
+        self.asset_urls = asset_urls
+        self.traded = traded # 1 for every position, whatever its PnL
+        self.won = (pnl > 0).astype(np.int32) # 1 for the positions that made a profit
+        self.pnl = pnl
+        self.bought_usd = bought_usd
+        self.asset_ages = asset_ages # The age of every asset in hours when it was a top gainer (NaN if unknown)
+
+    @property
+    def shape(self) -> tuple:
+        return self.pnl.shape
+
+## Building the matrix
+def load_asset_ages(gainers: Optional[Iterable[Mapping]] = None, gainers_feed: str = "dex_screener_top_gainers") -> dict:
+    """
+    A function to return the age in hours of every top gainer (the youngest age it was seen at, if the watch mode polled it more than once).
+    """
+    asset_ages = {}
+    try:
+        for gainer in (iter_feed_items(feed_name=gainers_feed) if gainers is None else gainers):
+            asset_age = helper_parse_asset_age(gainer.get("asset_age"))
+            if not np.isnan(asset_age):
+                asset_ages[gainer["asset_url"]] = min(asset_age, asset_ages.get(gainer["asset_url"], np.inf))
+    except FileNotFoundError:
+        logger.warning(f"Could not find the {gainers_feed} feed, so no wallet is counted as an early entry")
+    return asset_ages
+
+def build_wallet_asset_matrix(traders: Optional[Iterable[Mapping]] = None, traders_feed: str = "dex_screener_top_traders", asset_ages: Optional[Mapping[str, float]] = None) -> WalletAssetMatrix:
+    """
+    A function to build the wallet x asset matrices from top traders rows, or by streaming the top traders feed if no rows are given.
+    """
+    wallet_ids, asset_ids, position_ids = {}, {}, {}
+    rows, cols, pnls, bought_usds = [], [], [], []
+    for trader in (iter_feed_items(feed_name=traders_feed) if traders is None else traders):
+        wallet_address = trader.get("wallet_address")
+        if helper_is_missing(wallet_address) or helper_is_missing(trader.get("trader_bought_usd")) or helper_is_missing(trader.get("trader_sold_usd")):
+            continue
+        row = wallet_ids.setdefault((trader.get("chain") or DEFAULT_CHAIN, wallet_address), len(wallet_ids))
+        col = asset_ids.setdefault(trader["asset_url"], len(asset_ids))
+        trader_pnl = 0 if helper_is_missing(trader.get("trader_pnl")) else float(trader["trader_pnl"])
+
+        position_id = position_ids.get((row, col))
+        if position_id is None:
+            position_ids[(row, col)] = len(rows)
+            rows.append(row)
+            cols.append(col)
+            pnls.append(trader_pnl)
+            bought_usds.append(float(trader["trader_bought_usd"]))
+        else:
+            pnls[position_id] = trader_pnl
+            bought_usds[position_id] = float(trader["trader_bought_usd"])
+
+    shape = (len(wallet_ids), len(asset_ids))
+    positions = (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))
+    asset_ages = {} if asset_ages is None else asset_ages
+    return WalletAssetMatrix(
+        wallet_keys=list(wallet_ids),
+        asset_urls=list(asset_ids),
+        traded=sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), positions), shape=shape),
+        pnl=sparse.csr_matrix((np.array(pnls, dtype=np.float64), positions), shape=shape),
+        bought_usd=sparse.csr_matrix((np.array(bought_usds, dtype=np.float64), positions), shape=shape),
+        asset_ages=np.array([asset_ages.get(asset_url, np.nan) for asset_url in asset_ids], dtype=np.float64)
+    )
+
+## Signals
+def compute_wallet_stats(matrix: WalletAssetMatrix) -> dict:
+    """
+    A function to compute the hit-rate statistics of every wallet, as arrays aligned with the rows of the matrix:
+    its number of top gainers traded, won and won early (i.e., on an asset younger than EARLY_ENTRY_MAX_AGE_HOURS), its hit rate and PnL, and whether it is a repeat winner.
+    The p-value is the chance that a wallet which makes a profit on every top gainer with the same probability as the average wallet wins on as many of them.
+    """
+    num_wallets, num_assets = matrix.shape
+    num_traded = helper_row_sums(matrix.traded)
+    num_wins = helper_row_sums(matrix.won)
+    is_early_asset = (matrix.asset_ages <= EARLY_ENTRY_MAX_AGE_HOURS).astype(np.int32) # NaN compares as False
+    tot_pnl = helper_row_sums(matrix.pnl)
+    tot_bought_usd = helper_row_sums(matrix.bought_usd)
+
+    win_probability = matrix.won.nnz / max(num_wallets * num_assets, 1)
+    repeat_winner_pvalue = binom.sf(num_wins - 1, num_assets, win_probability)
+    hit_rate = np.divide(num_wins, num_traded, out=np.zeros(num_wallets), where=num_traded > 0)
+    return {
+        "num_traded_assets": num_traded,
+        "num_winning_assets": num_wins,
+        "num_early_wins": matrix.won @ is_early_asset,
+        "hit_rate": hit_rate,
+        "tot_pnl": tot_pnl,
+        "pnl_per_usd": np.divide(tot_pnl, tot_bought_usd, out=np.full(num_wallets, np.nan), where=tot_bought_usd > 0),
+        "repeat_winner_pvalue": repeat_winner_pvalue,
+        "is_repeat_winner": (num_wins >= MIN_REPEAT_WINS) & (hit_rate >= MIN_HIT_RATE) & (repeat_winner_pvalue <= MAX_REPEAT_WINNER_PVALUE)
+    }
+
+def find_wallet_clusters(matrix: WalletAssetMatrix, min_shared_wins: int = MIN_SHARED_WINS, min_jaccard: float = MIN_JACCARD) -> tuple:
+    """
+    A function to group the wallets that keep winning on the same top gainers. The number of top gainers every pair of wallets won together is the product of the
+    winning positions matrix with its transpose, restricted to the wallets with at least min_shared_wins wins (the others cannot be linked), so it stays sparse.
+    Returns the cluster label of every wallet (-1 if it is not in a cluster) and the linked pairs as (wallet rows, wallet rows, shared wins, Jaccard similarity) arrays.
+    """
+    num_wallets = matrix.shape[0]
+    num_wins = helper_row_sums(matrix.won)
+    candidate_rows = np.flatnonzero(num_wins >= min_shared_wins)
+    labels = np.full(num_wallets, -1)
+    if len(candidate_rows) < 2:
+        return labels, (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]), np.array([]))
+
+    candidate_wins = matrix.won[candidate_rows]
+    shared_wins = sparse.triu(candidate_wins @ candidate_wins.T, k=1).tocoo() # Every pair once, without the diagonal
+    first, second, num_shared = shared_wins.row, shared_wins.col, shared_wins.data
+    jaccard = num_shared / (num_wins[candidate_rows[first]] + num_wins[candidate_rows[second]] - num_shared)
+    is_linked = (num_shared >= min_shared_wins) & (jaccard >= min_jaccard)
+    first, second, num_shared, jaccard = first[is_linked], second[is_linked], num_shared[is_linked], jaccard[is_linked]
+
+    # The clusters are the connected components of the graph of the linked wallets, leaving out the wallets that are not linked to any other
+    graph = sparse.coo_matrix((np.ones(len(first)), (first, second)), shape=(len(candidate_rows), len(candidate_rows)))
+    _, component_labels = connected_components(graph, directed=False)
+    component_sizes = np.bincount(component_labels)
+    in_cluster = component_sizes[component_labels] >= 2
+    _, cluster_labels = np.unique(component_labels[in_cluster], return_inverse=True) # Renumber the clusters from 0
+    labels[candidate_rows[in_cluster]] = cluster_labels
+    return labels, (candidate_rows[first], candidate_rows[second], num_shared, jaccard)
+
+## Writing the signals
+def iter_repeat_winners(matrix: WalletAssetMatrix, stats: Mapping[str, np.ndarray], labels: np.ndarray):
+    """
+    A function to yield the repeat winners, the ones with the most early wins first, then the most wins, then the highest PnL.
+    """
+    rows = np.flatnonzero(stats["is_repeat_winner"])
+    rows = rows[np.lexsort((-stats["tot_pnl"][rows], -stats["num_winning_assets"][rows], -stats["num_early_wins"][rows]))]
+    for row in rows:
+        chain, wallet_address = matrix.wallet_keys[row]
+        yield {
+            "chain": chain,
+            "wallet_address": wallet_address,
+            "num_traded_assets": int(stats["num_traded_assets"][row]),
+            "num_winning_assets": int(stats["num_winning_assets"][row]),
+            "num_early_wins": int(stats["num_early_wins"][row]),
+            "hit_rate": round(float(stats["hit_rate"][row]), 4),
+            "tot_pnl": round(float(stats["tot_pnl"][row]), 2),
+            "pnl_per_usd": None if np.isnan(stats["pnl_per_usd"][row]) else round(float(stats["pnl_per_usd"][row]), 4),
+            "repeat_winner_pvalue": float(f"{stats['repeat_winner_pvalue'][row]:.3g}"),
+            "cluster_id": None if labels[row] < 0 else int(labels[row])
+        }
+
+def iter_wallet_clusters(matrix: WalletAssetMatrix, stats: Mapping[str, np.ndarray], labels: np.ndarray, pairs: tuple):
+    """
+    A function to yield the wallet clusters, the largest first, with the top gainers that all their wallets won on.
+    """
+    first, _, _, jaccard = pairs
+    num_clusters = labels.max(initial=-1) + 1 # No cluster when no wallet both bought and sold a top gainer
+    cluster_sizes = np.bincount(labels[labels >= 0], minlength=num_clusters)
+    cluster_pnls = np.bincount(labels[labels >= 0], weights=stats["tot_pnl"][labels >= 0], minlength=num_clusters)
+    mean_jaccards = np.bincount(labels[first], weights=jaccard, minlength=num_clusters) / np.maximum(np.bincount(labels[first], minlength=num_clusters), 1)
+
+    rows_by_label = np.argsort(labels, kind="stable")
+    rows_by_label = rows_by_label[labels[rows_by_label] >= 0]
+    cluster_rows = np.split(rows_by_label, np.cumsum(cluster_sizes)[:-1])
+    for cluster_id in sorted(range(num_clusters), key=lambda label: (-cluster_sizes[label], -cluster_pnls[label])):
+        rows = cluster_rows[cluster_id]
+        shared_cols = np.flatnonzero(helper_row_sums(matrix.won[rows].T) == len(rows))
+        yield {
+            "cluster_id": int(cluster_id),
+            "chain": matrix.wallet_keys[rows[0]][0],
+            "num_wallets": int(cluster_sizes[cluster_id]),
+            "wallet_addresses": [matrix.wallet_keys[row][1] for row in rows],
+            "num_repeat_winners": int(stats["is_repeat_winner"][rows].sum()),
+            "num_shared_wins": len(shared_cols),
+            "shared_asset_urls": [matrix.asset_urls[col] for col in shared_cols],
+            "mean_jaccard": round(float(mean_jaccards[cluster_id]), 4),
+            "tot_pnl": round(float(cluster_pnls[cluster_id]), 2)
+        }
+
+def write_wallet_signals(matrix: WalletAssetMatrix, signals_feed: str = "wallet_repeat_winners", clusters_feed: str = "wallet_clusters") -> tuple:
+    """
+    A function to compute the signals of a wallet x asset matrix and write the repeat winners and the wallet clusters to two feeds in the configured feed format. Returns the paths of the feeds.
+    """
+    stats = compute_wallet_stats(matrix=matrix)
+    labels, pairs = find_wallet_clusters(matrix=matrix)
+    return (
+        write_feed_items(feed_name=signals_feed, items=iter_repeat_winners(matrix=matrix, stats=stats, labels=labels)),
+        write_feed_items(feed_name=clusters_feed, items=iter_wallet_clusters(matrix=matrix, stats=stats, labels=labels, pairs=pairs))
+    )
+
+if __name__ == "__main__":
+    # Usage: python wallet_signals.py [top traders feed name] [top gainers feed name]
+    logging.basicConfig(level=logging.INFO)
+    traders_feed_name = sys.argv[1] if len(sys.argv) > 1 else "dex_screener_top_traders"
+    gainers_feed_name = sys.argv[2] if len(sys.argv) > 2 else "dex_screener_top_gainers"
+    wallet_asset_matrix = build_wallet_asset_matrix(traders_feed=traders_feed_name, asset_ages=load_asset_ages(gainers_feed=gainers_feed_name))
+    signals_path, clusters_path = write_wallet_signals(matrix=wallet_asset_matrix)
+    print(f"Wrote the signals of {wallet_asset_matrix.shape[0]:,} wallets x {wallet_asset_matrix.shape[1]:,} assets to {signals_path} and {clusters_path}")